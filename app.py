@@ -11,6 +11,7 @@ from datetime import datetime
 import plotly.express as px
 from PIL import Image
 import logging
+import os
 from services.auth.social_interface import SocialMediaInterface
 from services.auth.post_viewing_interface import PostViewingInterface
 
@@ -30,6 +31,8 @@ st.set_page_config(
 # Define constants
 BACKEND_URL = "http://127.0.0.1:8000/"  # Update with your actual backend URL
 USER_AGENT = "TouristSpotFinder/1.0"
+# Points per /weather/batch request; must not exceed the backend's WEATHER_BATCH_MAX
+WEATHER_BATCH_MAX = int(os.getenv("WEATHER_BATCH_MAX", 1000))
 
 # Initialize social media interface
 social_interface = SocialMediaInterface(backend_url=BACKEND_URL)
@@ -44,6 +47,8 @@ if 'spot_description' not in st.session_state:
     st.session_state.spot_description = ""
 if 'weather_data' not in st.session_state:
     st.session_state.weather_data = None
+if 'spot_weather' not in st.session_state:
+    st.session_state.spot_weather = {}
 if 'user_location' not in st.session_state:
     st.session_state.user_location = None
 if 'question_history' not in st.session_state:
@@ -91,68 +96,81 @@ def get_google_search_url(query):
     encoded_query = urllib.parse.quote_plus(query)
     return f"https://www.google.com/search?q={encoded_query}"
 
-def search_tourist_spots(location, radius):
-    try:
-        # Step 1: Get coordinates for the location using Nominatim
-        nominatim_url = f"https://nominatim.openstreetmap.org/search?q={location}&format=json"
-        response = requests.get(nominatim_url, headers={'User-Agent': USER_AGENT}, timeout=10)
-        
-        if response.status_code != 200:
-            st.error(f"Failed to fetch coordinates: {response.status_code} - {response.text}")
-            return [], None, None
+def read_search_stream(response, progress):
+    """
+    Read an NDJSON search stream from the backend, drawing spots on a preview map as they arrive
 
-        data = response.json()
-        if not data:
-            st.warning(f"No location found for '{location}'.")
-            return [], None, None
+    Returns:
+        (spots, center_lat, center_lon, error message or None)
+    """
+    spots = []
+    center_lat = center_lon = None
+    last_render = 0.0
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json.loads(line)
+        if event["type"] == "center":
+            center_lat, center_lon = event["lat"], event["lon"]
+        elif event["type"] == "spot":
+            spots.append(event["spot"])
+            # Draw the first marker right away, then refresh a few times per second
+            if len(spots) == 1 or time.monotonic() - last_render > 0.5:
+                with progress.container():
+                    st.caption(f"📍 {len(spots)} places found so far...")
+                    st.map(pd.DataFrame([{"lat": spot["lat"], "lon": spot["lon"]} for spot in spots]))
+                last_render = time.monotonic()
+        elif event["type"] == "error":
+            return spots, center_lat, center_lon, event.get("detail", "Unknown error")
+    return spots, center_lat, center_lon, None
 
-        # Extract coordinates from Nominatim response
-        center_lat = float(data[0]['lat'])
-        center_lon = float(data[0]['lon'])
-        
-        # Step 2: Search for tourist spots using the backend API
-        url = f"{BACKEND_URL}/search"
+def search_tourist_spots(location, radius):
+    try:
+        # The backend geocodes the location and streams the center first, then spots as they are found
+        url = f"{BACKEND_URL}/search/stream"
         payload = {"location": location, "radius": radius}
         
+        progress = st.empty()
         with st.spinner(f"🔍 Searching for tourist spots near {location}..."):
-            response = requests.post(url, json=payload, timeout=30)
+            with requests.post(url, json=payload, stream=True, timeout=30) as response:
+                if response.status_code != 200:
+                    st.error(f"Failed to search for tourist spots: Error: {response.status_code}")
+                    return [], None, None
+                spots, center_lat, center_lon, error_msg = read_search_stream(response, progress)
+        progress.empty()
             
-        if response.status_code == 200:
-            spots = response.json()
-            if spots:
-                st.session_state.tourist_spots = spots
-                
-                # Prepare map request payload
-                map_payload = {
-                    "spots": spots,
-                    "center_lat": center_lat,
-                    "center_lon": center_lon,
-                    "radius": radius
-                }
-                
-                # Get map from backend
-                map_response = requests.post(f"{BACKEND_URL}/map/all", json=map_payload)
-                
-                if map_response.status_code == 200:
-                    st.session_state.all_spots_map_html = map_response.text
-                else:
-                    st.error(f"Failed to fetch map: {map_response.status_code}")
-                
-                st.session_state.map_created = True
-                st.session_state.last_search = {"location": location, "radius": radius}
-                return spots, center_lat, center_lon
+        if error_msg:
+            if center_lat is None and "No location found" in error_msg:
+                st.warning(error_msg)
+            else:
+                st.error(f"Failed to search for tourist spots: {error_msg}")
+            return [], None, None
+
+        if spots:
+            st.session_state.tourist_spots = spots
+            st.session_state.spot_weather = get_spots_weather(spots)
+            
+            # Prepare map request payload
+            map_payload = {
+                "spots": spots,
+                "center_lat": center_lat,
+                "center_lon": center_lon,
+                "radius": radius
+            }
+            
+            # Get map from backend
+            map_response = requests.post(f"{BACKEND_URL}/map/all", json=map_payload)
+            
+            if map_response.status_code == 200:
+                st.session_state.all_spots_map_html = map_response.text
             else:
-                st.warning(f"No tourist spots found near {location} within {radius} km radius.")
-                return [], None, None
+                st.error(f"Failed to fetch map: {map_response.status_code}")
+            
+            st.session_state.map_created = True
+            st.session_state.last_search = {"location": location, "radius": radius}
+            return spots, center_lat, center_lon
         else:
-            error_msg = f"Error: {response.status_code}"
-            try:
-                error_data = response.json()
-                if "detail" in error_data:
-                    error_msg = error_data["detail"]
-            except:
-                pass
-            st.error(f"Failed to search for tourist spots: {error_msg}")
+            st.warning(f"No tourist spots found near {location} within {radius} km radius.")
             return [], None, None
     except Exception as e:
         st.error(f"Error connecting to backend: {str(e)}")
@@ -161,52 +179,51 @@ def search_tourist_spots(location, radius):
 def search_tourist_spots_with_current_location(lat, lon, radius):
     """Search for tourist spots using current location coordinates"""
     try:
-        url = f"{BACKEND_URL}/search_with_current_location"
+        url = f"{BACKEND_URL}/search_with_current_location/stream"
         params = {
             "lat": lat,
             "lon": lon,
             "radius": radius
         }
         
+        progress = st.empty()
         with st.spinner(f"🔍 Searching for tourist spots near your location..."):
-            response = requests.get(url, params=params, timeout=30)
+            with requests.get(url, params=params, stream=True, timeout=30) as response:
+                if response.status_code != 200:
+                    st.error(f"Failed to search for tourist spots: Error: {response.status_code}")
+                    return [], None, None
+                spots, _, _, error_msg = read_search_stream(response, progress)
+        progress.empty()
             
-        if response.status_code == 200:
-            spots = response.json()
-            if spots:
-                st.session_state.tourist_spots = spots
-                
-                # Prepare map request payload
-                map_payload = {
-                    "spots": spots,
-                    "center_lat": lat,
-                    "center_lon": lon,
-                    "radius": radius
-                }
-                
-                # Get map from backend
-                map_response = requests.post(f"{BACKEND_URL}/map/all", json=map_payload)
-                
-                if map_response.status_code == 200:
-                    st.session_state.all_spots_map_html = map_response.text
-                else:
-                    st.error(f"Failed to fetch map: {map_response.status_code}")
-                
-                st.session_state.map_created = True
-                st.session_state.last_search = {"location": "Your Location", "radius": radius}
-                return spots, lat, lon
+        if error_msg:
+            st.error(f"Failed to search for tourist spots: {error_msg}")
+            return [], None, None
+
+        if spots:
+            st.session_state.tourist_spots = spots
+            st.session_state.spot_weather = get_spots_weather(spots)
+            
+            # Prepare map request payload
+            map_payload = {
+                "spots": spots,
+                "center_lat": lat,
+                "center_lon": lon,
+                "radius": radius
+            }
+            
+            # Get map from backend
+            map_response = requests.post(f"{BACKEND_URL}/map/all", json=map_payload)
+            
+            if map_response.status_code == 200:
+                st.session_state.all_spots_map_html = map_response.text
             else:
-                st.warning(f"No tourist spots found near your location within {radius} km radius.")
-                return [], None, None
+                st.error(f"Failed to fetch map: {map_response.status_code}")
+            
+            st.session_state.map_created = True
+            st.session_state.last_search = {"location": "Your Location", "radius": radius}
+            return spots, lat, lon
         else:
-            error_msg = f"Error: {response.status_code}"
-            try:
-                error_data = response.json()
-                if "detail" in error_data:
-                    error_msg = error_data["detail"]
-            except:
-                pass
-            st.error(f"Failed to search for tourist spots: {error_msg}")
+            st.warning(f"No tourist spots found near your location within {radius} km radius.")
             return [], None, None
     except Exception as e:
         st.error(f"Error connecting to backend: {str(e)}")
@@ -224,35 +241,80 @@ def get_weather_data(lat, lon):
         st.error(f"Error getting weather data: {str(e)}")
         return None
 
-def generate_spot_description(spot, location, country, weather_data=None):
-    """Generate a description for a selected tourist spot"""
+def get_spots_weather(spots):
+    """Get weather data for every spot of a result set in batches of up to WEATHER_BATCH_MAX, keyed by spot id"""
+    weather_by_id = {}
+    for start in range(0, len(spots), WEATHER_BATCH_MAX):
+        chunk = spots[start:start + WEATHER_BATCH_MAX]
+        try:
+            points = [{"lat": spot["lat"], "lon": spot["lon"]} for spot in chunk]
+            response = requests.post(f"{BACKEND_URL}/weather/batch", json={"points": points})
+            if response.status_code != 200:
+                logger.warning(f"Weather batch failed ({response.status_code}): {read_error_detail(response, '')}")
+                continue
+            weather_by_id.update((spot["id"], weather) for spot, weather in zip(chunk, response.json()) if weather)
+        except Exception as e:
+            # Weather of these spots is fetched per spot on selection instead
+            logger.warning(f"Weather batch failed: {str(e)}")
+    return weather_by_id
+
+def read_token_stream(response, placeholder):
+    """
+    Read an SSE answer stream from the backend, rendering the text in a placeholder as tokens arrive
+
+    Returns:
+        (text, error message or None)
+    """
+    text = ""
+    for line in response.iter_lines():
+        line = line.decode("utf-8")
+        if not line.startswith("data: "):
+            continue
+        event = json.loads(line[len("data: "):])
+        if event["type"] == "token":
+            text += event["text"]
+            placeholder.markdown(text + " ▌")
+        elif event["type"] == "error":
+            return text, event.get("detail", "Unknown error")
+    return text, None
+
+def read_error_detail(response, default):
+    """The 'detail' of an error response, or the default"""
     try:
-        url = f"{BACKEND_URL}/generate_description"
+        return response.json().get("detail", default)
+    except Exception:
+        return default
+
+def generate_spot_description(spot, location, country, weather_data=None, fresh=False):
+    """Generate a description for a selected tourist spot (fresh bypasses the backend's description cache)"""
+    try:
+        # The backend streams the description token by token, so it is shown while it is written
+        url = f"{BACKEND_URL}/generate_description/stream"
         payload = {
             "spot_id": spot["id"],
             "spot_name": spot["name"],
             "spot_category": spot["category"],
             "location": location,
             "country": country,
-            "weather_data": weather_data
+            "weather_data": weather_data,
+            "fresh": fresh
         }
         
-        with st.spinner("✨ Generating spot description..."):
-            response = requests.post(url, json=payload)
+        placeholder = st.empty()
+        placeholder.caption("✨ Generating spot description...")
+        with requests.post(url, json=payload, stream=True, timeout=60) as response:
+            if response.status_code == 200:
+                description, error_msg = read_token_stream(response, placeholder)
+            else:
+                description, error_msg = None, read_error_detail(response, "Failed to generate description")
+        # The description tab shows the finished text
+        placeholder.empty()
             
-        if response.status_code == 200:
-            description = response.text.strip('"')  # Remove quotes if present
+        if description and not error_msg:
             st.session_state.spot_description = description
             return description
         else:
-            error_msg = "Failed to generate description"
-            try:
-                error_data = response.json()
-                if "detail" in error_data:
-                    error_msg = error_data["detail"]
-            except:
-                pass
-            st.error(f"{error_msg}")
+            st.error(f"{error_msg or 'Failed to generate description'}")
             return None
     except Exception as e:
         st.error(f"Error generating description: {str(e)}")
@@ -261,7 +323,7 @@ def generate_spot_description(spot, location, country, weather_data=None):
 def ask_question_about_spot(spot, location, country, question, weather_data=None):
     """Ask a question about a tourist spot"""
     try:
-        url = f"{BACKEND_URL}/ask_question"
+        url = f"{BACKEND_URL}/ask_question/stream"
         payload = {
             "spot_id": spot["id"],
             "spot_name": spot["name"],
@@ -275,11 +337,17 @@ def ask_question_about_spot(spot, location, country, question, weather_data=None
         # Debug: Log the payload
         logger.info(f"Payload sent to backend: {payload}")
         
-        with st.spinner("🤔 Thinking about your question..."):
-            response = requests.post(url, json=payload)
+        placeholder = st.empty()
+        placeholder.caption("🤔 Thinking about your question...")
+        with requests.post(url, json=payload, stream=True, timeout=60) as response:
+            if response.status_code == 200:
+                answer, error_msg = read_token_stream(response, placeholder)
+            else:
+                answer, error_msg = None, read_error_detail(response, "Failed to get an answer")
+        # The question history shows the finished answer
+        placeholder.empty()
             
-        if response.status_code == 200:
-            answer = response.text.strip('"')  # Remove quotes if present
+        if answer and not error_msg:
             # Add to question history
             st.session_state.question_history.append({
                 "question": question,
@@ -288,14 +356,7 @@ def ask_question_about_spot(spot, location, country, question, weather_data=None
             })
             return answer
         else:
-            error_msg = "Failed to get an answer"
-            try:
-                error_data = response.json()
-                if "detail" in error_data:
-                    error_msg = error_data["detail"]
-            except:
-                pass
-            st.error(f"{error_msg}")
+            st.error(f"{error_msg or 'Failed to get an answer'}")
             return None
     except Exception as e:
         st.error(f"Error asking question: {str(e)}")
@@ -337,6 +398,8 @@ def create_weather_widget(weather_data):
         
         # Rain forecast
         if 'forecast' in weather_data:
+            if 'max_temperature' in weather_data['forecast']['day1']:
+                st.markdown(f"🌡️ High today: {weather_data['forecast']['day1']['max_temperature']}°C")
             if weather_data['forecast']['day1']['rain_chance']:
                 st.markdown("🌧️ **Rain expected in next 24h**")
             else:
@@ -414,7 +477,7 @@ def main():
                 st.session_state.selected_spot = spot
                 
                 # Get weather data for the spot
-                weather_data = get_weather_data(spot["lat"], spot["lon"])
+                weather_data = st.session_state.spot_weather.get(spot["id"]) or get_weather_data(spot["lat"], spot["lon"])
                 st.session_state.weather_data = weather_data
                 
                 # Generate description
@@ -523,13 +586,16 @@ def main():
                     st.markdown(f"<div class='card'>", unsafe_allow_html=True)
                     st.markdown(f"### {spot['name']}")
                     st.markdown(f"**Category:** {spot['category']}")
+                    spot_weather = st.session_state.spot_weather.get(spot["id"])
+                    if spot_weather:
+                        st.markdown(f"**Weather:** {spot_weather['temperature']}°C, {spot_weather['description']}")
                     
                     # Button to view details
                     if st.button(f"View Details", key=f"view_{spot['id']}"):
                         st.session_state.selected_spot = spot
                         
                         # Get weather data for the spot
-                        weather_data = get_weather_data(spot["lat"], spot["lon"])
+                        weather_data = st.session_state.spot_weather.get(spot["id"]) or get_weather_data(spot["lat"], spot["lon"])
                         st.session_state.weather_data = weather_data
                         
                         # Generate description if not already generated
@@ -586,6 +652,11 @@ def main():
                 st.markdown("### About This Place")
                 st.markdown(st.session_state.spot_description)
                 st.markdown("</div>", unsafe_allow_html=True)
+                if st.button("🔄 New description", key="regenerate_description"):
+                    location = st.session_state.last_search.get("location", "")
+                    country = location.split(",")[-1].strip() if "," in location else location
+                    generate_spot_description(spot, location, country, st.session_state.weather_data, fresh=True)
+                    st.rerun()
             
             # External links
             st.markdown("### External Links")
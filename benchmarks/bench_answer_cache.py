@@ -0,0 +1,65 @@
+"""
+Lookup latency of the semantic answer cache as the number of cached Q&A pairs grows.
+
+The cache is filled with --entries answers spread over spots with --per-spot
+questions each (the pairs are synthetic, only their count matters), then
+--lookups reworded questions are looked up, half of them for cached spots.
+Lookups only scan one spot's vectors, so their latency should stay flat
+however many pairs are cached.
+
+    python benchmarks/bench_answer_cache.py --entries 1000000 --per-spot 16
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+TOPICS = ["opening hours", "ticket price", "parking", "wheelchair access", "dogs allowed", "guided tours",
+          "best time to visit", "toilets", "cafe", "photography", "dress code", "lockers", "audio guide",
+          "student discount", "queue length", "nearest metro"]
+TEMPLATES = ["What about {}?", "Tell me about {}", "{}?", "Any info on {} here?"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--per-spot", type=int, default=16)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    from services.utils.semantic_cache import SemanticCache
+
+    rng = random.Random(0)
+    spots = args.entries // args.per_spot
+    cache = SemanticCache(max_entries=args.entries, max_per_scope=args.per_spot)
+
+    start = time.perf_counter()
+    for spot in range(spots):
+        for topic in TOPICS[:args.per_spot]:
+            cache.set(f"node/{spot}", topic, f"Answer about {topic}")
+    fill = time.perf_counter() - start
+    vector_bytes = sum(scope.vectors.nbytes for scope in cache._scopes.values())
+
+    latencies = []
+    hits = 0
+    for _ in range(args.lookups):
+        spot = rng.randrange(spots * 2)
+        question = rng.choice(TEMPLATES).format(rng.choice(TOPICS[:args.per_spot]))
+        before = time.perf_counter()
+        hits += cache.get(f"node/{spot}", question) is not None
+        latencies.append(time.perf_counter() - before)
+
+    latencies.sort()
+    print(f"{len(cache)} cached pairs over {spots} spots, filled in {fill:.1f} s")
+    print(f"vector memory      {vector_bytes / 2 ** 20:8.1f} MiB ({vector_bytes / len(cache):.0f} B per pair)")
+    print(f"lookups            {args.lookups:8d} ({hits} hits)")
+    print(f"p50 lookup         {statistics.median(latencies) * 1000:8.3f} ms")
+    print(f"p99 lookup         {latencies[int(len(latencies) * 0.99)] * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Forecast summarization of a weather batch: per-hour Python passes vs. the NumPy summary.
+
+"legacy" summarizes next_48h, day1 and day2 of each location with the
+generator expressions parse_forecast used to run (rain only). "python" computes
+the current summary (next_48h and day1-3; rain, probability bands and max
+temperature) the same way, location by location. "vectorized" is
+weather_service.summarize_forecasts over the whole batch.
+
+    python benchmarks/bench_forecast_summary.py --locations 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+RAIN_CODES = [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82, 95, 96, 99]
+
+
+def make_locations(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "current": {"temperature_2m": 20.0, "weather_code": 3},
+        "hourly": {
+            "precipitation": [rng.choice([0.0, 0.0, 0.0, 0.2, 1.4]) for _ in range(72)],
+            "weather_code": [rng.choice([0, 1, 2, 3, 61, 80]) for _ in range(72)],
+            "temperature_2m": [rng.uniform(5, 30) for _ in range(72)],
+            "precipitation_probability": [rng.randrange(0, 101, 5) for _ in range(72)],
+        },
+    } for _ in range(count)]
+
+
+def legacy_summary(location):
+    precipitation = location["hourly"]["precipitation"][:48]
+    codes = location["hourly"]["weather_code"][:48]
+    summary = {}
+    for name, window in (("next_48h", slice(0, 48)), ("day1", slice(0, 24)), ("day2", slice(24, 48))):
+        summary[name] = {
+            "rain_chance": any(p > 0.1 for p in precipitation[window]) or any(code in RAIN_CODES for code in codes[window]),
+            "rain_hours": sum(1 for p in precipitation[window] if p > 0.1),
+            "max_precipitation": float(max(precipitation[window])) if precipitation[window] else 0.0,
+        }
+    return summary
+
+
+def python_summary(location, windows):
+    hourly = location["hourly"]
+    summary = {}
+    for name, first, end in windows:
+        precipitation = hourly["precipitation"][first:end]
+        codes = hourly["weather_code"][first:end]
+        probability = hourly["precipitation_probability"][first:end]
+        summary[name] = {
+            "rain_chance": any(p > 0.1 for p in precipitation) or any(code in RAIN_CODES for code in codes),
+            "rain_hours": sum(1 for p in precipitation if p > 0.1),
+            "max_precipitation": float(max(precipitation)) if precipitation else 0.0,
+            "possible_rain_hours": sum(1 for p in probability if 30 <= p < 70),
+            "likely_rain_hours": sum(1 for p in probability if p >= 70),
+            "max_rain_probability": max(probability) if probability else 0,
+            "max_temperature": max(hourly["temperature_2m"][first:end]),
+        }
+    return summary
+
+
+def timed(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from services.spot_searching_page.weather_service import forecast_windows, summarize_forecasts
+
+    locations = make_locations(args.locations)
+    windows = forecast_windows(3)
+    _, legacy_time = timed(lambda: [legacy_summary(location) for location in locations], args.repeat)
+    python_result, python_time = timed(lambda: [python_summary(location, windows) for location in locations], args.repeat)
+    vectorized_result, vectorized_time = timed(lambda: summarize_forecasts(locations, windows), args.repeat)
+    for expected, summary in zip(python_result, vectorized_result):
+        for name, window in expected.items():
+            assert summary[name] == window, (summary[name], window)
+
+    print(f"{args.locations} locations, 72 hourly values each")
+    print(f"{'path':<12}{'time (ms)':>11}")
+    print(f"{'legacy':<12}{legacy_time * 1000:>11.2f}")
+    print(f"{'python':<12}{python_time * 1000:>11.2f}")
+    print(f"{'vectorized':<12}{vectorized_time * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
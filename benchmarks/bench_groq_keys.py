@@ -0,0 +1,82 @@
+"""
+Load test of the Groq key pool against a local fake Groq API that rate-limits each key.
+
+N completions are started at once across K keys. Each key gets --rate requests
+per second, and the first key is down with 429s during the --outage window.
+The test reports the wall time against the fastest the limits allow, the 429s
+the pool ran into, how the completions spread over the keys, and the longest
+the event loop went without running a 10 ms ticker (after one warm-up
+completion, which pays the client's one-off setup).
+
+    python benchmarks/bench_groq_keys.py --completions 200 --keys 4 --rate 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from fake_groq_server import FakeGroqServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--completions", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--rate", type=int, default=20, help="requests per second per key")
+    parser.add_argument("--delay", type=float, default=0.05, help="fake API latency per request (s)")
+    parser.add_argument("--outage", default="0.2,1.0", help="start,end (s) of scheduled 429s on the first key")
+    args = parser.parse_args()
+
+    from api_manager.api_manager import GroqKeyManager
+
+    keys = [f"key-{i}" for i in range(args.keys)]
+    outage = tuple(float(value) for value in args.outage.split(","))
+    with FakeGroqServer(delay=args.delay, requests_per_window=args.rate, window=1.0, outages={keys[0]: [outage]}) as server:
+        pool = GroqKeyManager(keys, base_url=server.base_url, queue_timeout=120)
+        messages = [{"role": "user", "content": "Describe the Eiffel Tower in one sentence."}]
+
+        async def run():
+            # Pay the one-off client setup (SSL context, SDK models) before measuring
+            await pool.chat_completion(messages, model="fake", max_tokens=20)
+            lag = 0.0
+            done = False
+
+            async def ticker():
+                nonlocal lag
+                while not done:
+                    before = time.perf_counter()
+                    await asyncio.sleep(0.01)
+                    lag = max(lag, time.perf_counter() - before - 0.01)
+
+            ticking = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            results = await asyncio.gather(*(pool.chat_completion(messages, model="fake", max_tokens=20)
+                                             for _ in range(args.completions)), return_exceptions=True)
+            elapsed = time.perf_counter() - start
+            done = True
+            await ticking
+            return results, elapsed, lag
+
+        results, elapsed, lag = asyncio.run(run())
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    # Fixed one-second windows: the first window is already open when the run starts
+    floor = max(0.0, (args.completions / (args.keys * args.rate)) - 1)
+    print(f"{args.completions} completions, {args.keys} keys x {args.rate} req/s, key 0 down {outage[0]:g}-{outage[1]:g}s")
+    print(f"wall time          {elapsed:8.2f} s (rate limits allow ~{floor:.2f} s)")
+    print(f"failed             {len(failures):8d}")
+    print(f"429s               {sum(server.rate_limited.values()):8d}")
+    print(f"max in flight      {server.max_in_flight:8d}")
+    print(f"max loop lag       {lag * 1000:8.1f} ms")
+    for state in pool.keys:
+        print(f"key {state.index}: {server.request_counts.get(state.key, 0):4d} completions, {state.rate_limited:3d} rate-limited")
+    if failures:
+        print(f"first failure: {failures[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Latency a reader waits for before seeing an answer: whole completions vs. streamed ones.
+
+N completions run C at a time through the key pool against a local fake Groq
+API that writes one word every --token-delay seconds. For whole completions the
+wait is the full request; for streams it is the time to the first token, with
+the full stream time shown next to it. --drop makes the first key break every
+stream off after that many chunks, to show what mid-stream failover costs.
+
+    python benchmarks/bench_llm_ttft.py --completions 40 --concurrency 8 --token-delay 0.02
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from fake_groq_server import FakeGroqServer
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--completions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.05, help="fake API latency before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake API time per word (s)")
+    parser.add_argument("--drop", type=int, default=None, help="chunks after which streams on the first key break off")
+    args = parser.parse_args()
+
+    from api_manager.api_manager import GroqKeyManager
+
+    keys = [f"key-{i}" for i in range(args.keys)]
+    drops = {keys[0]: args.drop} if args.drop is not None else None
+    messages = [{"role": "user", "content": "When does the gallery open?"}]
+    with FakeGroqServer(delay=args.delay, token_delay=args.token_delay, requests_per_window=10000, stream_drops=drops) as server:
+        pool = GroqKeyManager(keys, base_url=server.base_url, queue_timeout=120)
+
+        async def whole():
+            start = time.perf_counter()
+            await pool.chat_completion(messages, model="fake", max_tokens=100)
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed
+
+        async def streamed():
+            start = time.perf_counter()
+            first_token = None
+            async for _ in pool.stream_completion(messages, model="fake", max_tokens=100):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+            return first_token, time.perf_counter() - start
+
+        async def run(completion):
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def limited():
+                async with semaphore:
+                    return await completion()
+            # Pay the one-off client setup before measuring
+            await pool.chat_completion(messages, model="fake", max_tokens=100)
+            return await asyncio.gather(*(limited() for _ in range(args.completions)))
+
+        results = {"whole": asyncio.run(run(whole)), "streamed": asyncio.run(run(streamed))}
+
+    print(f"{args.completions} completions, {args.concurrency} at a time, {args.delay * 1000:.0f} ms + "
+          f"{args.token_delay * 1000:.0f} ms/word" + (f", key 0 drops streams after {args.drop} chunks" if drops else ""))
+    print(f"{'':10s} {'wait p50':>10s} {'wait p95':>10s} {'total p50':>10s}")
+    for name, samples in results.items():
+        waits = [wait for wait, _ in samples]
+        totals = [total for _, total in samples]
+        print(f"{name:10s} {statistics.median(waits) * 1000:8.0f} ms {percentile(waits, 0.95) * 1000:7.0f} ms "
+              f"{statistics.median(totals) * 1000:8.0f} ms")
+    print(f"stream failovers   {pool.stats()['stream_failovers']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Duplicate checking when merging secondary Overpass results into the primary ones.
+
+"legacy" is the old per-element any(spot.id == ...) scan over the spots listed so
+far; "indexed" is ElementIndex. Both payloads are synthetic and half of the
+secondary elements repeat primary ones. A second run gives the payloads only
+--names distinct names (like OSM's many "Parking" or "Viewpoint"), which
+exercises the near-duplicate check on every element.
+
+    python benchmarks/bench_merge_dedupe.py --elements 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import make_elements
+
+
+def legacy_merge(primary, secondary):
+    from models.models import TouristSpot
+    spots = [TouristSpot(id=str(e['id']), name=e['tags']['name'], category="x", lat=0, lon=0, tags={}) for e in primary]
+    start = time.perf_counter()
+    merged = 0
+    for element in secondary:
+        if not any(spot.id == str(element.get('id', '')) for spot in spots):
+            merged += 1
+    return time.perf_counter() - start, merged
+
+
+def indexed_merge(primary, secondary):
+    from services.spot_searching_page.overpass_service import ElementIndex
+    start = time.perf_counter()
+    seen = ElementIndex()
+    for element in primary:
+        seen.add(element)
+    merged = sum(1 for element in secondary if seen.add(element))
+    return time.perf_counter() - start, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=20000, help="elements per Overpass payload")
+    parser.add_argument("--skip-legacy", action="store_true", help="the legacy scan is quadratic and slow")
+    parser.add_argument("--names", type=int, default=50, help="distinct names of the repeated-name run")
+    args = parser.parse_args()
+    for repeated in (False, True):
+        run(args, repeated)
+
+
+def run(args, repeated):
+
+    primary = make_elements(args.elements, spread=0.5, seed=1)
+    secondary = primary[: args.elements // 2] + make_elements(args.elements // 2, spread=0.5, seed=2)
+    for i, element in enumerate(secondary[args.elements // 2:]):
+        element['id'] = 10_000_000 + i
+        element['tags']['name'] = f"Secondary {i}"
+    if repeated:
+        for element in primary + secondary:
+            element['tags'] = dict(element['tags'], name=f"Viewpoint {element['id'] % args.names}")
+
+    names = f"{args.names} names" if repeated else "unique names"
+    print(f"primary: {len(primary)} elements, secondary: {len(secondary)} elements, {names}")
+    print(f"{'mode':<9}{'time (ms)':>12}{'merged':>8}")
+    if not args.skip_legacy:
+        elapsed, merged = legacy_merge(primary, secondary)
+        print(f"{'legacy':<9}{elapsed * 1000:>12.1f}{merged:>8}")
+    elapsed, merged = indexed_merge(primary, secondary)
+    print(f"{'indexed':<9}{elapsed * 1000:>12.1f}{merged:>8}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Query latency of the offline POI index built from a synthetic city-sized GeoJSON extract.
+
+    python benchmarks/bench_offline_index.py --features 200000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import make_elements
+
+
+def write_extract(path, features, spread):
+    """Synthetic extract around Paris in the osmtogeojson layout"""
+    collection = {"type": "FeatureCollection", "bbox": [2.3522 - spread, 48.8566 - spread, 2.3522 + spread, 48.8566 + spread], "features": []}
+    for element in make_elements(features, spread=spread):
+        position = element.get("center") or element
+        collection["features"].append({
+            "type": "Feature",
+            "id": f"{element['type']}/{element['id']}",
+            "properties": element["tags"],
+            "geometry": {"type": "Point", "coordinates": [position["lon"], position["lat"]]},
+        })
+    with open(path, "w") as f:
+        json.dump(collection, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=0.5, help="half-width of the extract in degrees")
+    parser.add_argument("--radius", type=float, default=10, help="search radius (km)")
+    args = parser.parse_args()
+
+    from services.spot_searching_page.offline_index import OfflinePoiIndex
+
+    handle, path = tempfile.mkstemp(suffix=".geojson")
+    os.close(handle)
+    try:
+        write_extract(path, args.features, args.spread)
+        index = OfflinePoiIndex()
+        start = time.perf_counter()
+        index.load(path)
+        load_time = time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+    rng = random.Random(1)
+    latencies, counts = [], []
+    for _ in range(args.queries):
+        lat = 48.8566 + rng.uniform(-args.spread / 2, args.spread / 2)
+        lon = 2.3522 + rng.uniform(-args.spread / 2, args.spread / 2)
+        start = time.perf_counter()
+        found = sum(1 for tier in ("primary", "secondary") for _ in index.query(tier, lat, lon, args.radius))
+        latencies.append(time.perf_counter() - start)
+        counts.append(found)
+
+    print(f"{index.elements} indexed POIs, loaded in {load_time:.1f} s")
+    print(f"{args.queries} queries of {args.radius:g} km: median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms, median {statistics.median(counts):.0f} POIs per search")
+
+
+if __name__ == "__main__":
+    main()
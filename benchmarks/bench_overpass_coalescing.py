@@ -0,0 +1,60 @@
+"""
+Upstream Overpass requests for a burst of concurrent searches around one trending destination.
+
+Tile caching is disabled, so every saved request comes from in-flight coalescing:
+searches arriving while a fetch of their tiles is running share it.
+
+    python benchmarks/bench_overpass_coalescing.py --searches 50 --delay 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer, make_elements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.5, help="stub latency per Overpass request (s)")
+    parser.add_argument("--window", type=float, default=0.4, help="searches arrive uniformly over this many seconds")
+    args = parser.parse_args()
+
+    os.environ["POI_TILE_TTL"] = "0"
+    with StubOSMServer(delay=args.delay, elements=make_elements(500)) as server:
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+
+        from services.spot_searching_page import overpass_service
+        from services.utils.http_client import close_http_client
+
+        rng = random.Random(0)
+
+        async def search():
+            await asyncio.sleep(rng.uniform(0, args.window))
+            # Users a few hundred meters apart mostly land on the same tiles
+            await overpass_service.fetch_pois("primary", 48.8566 + rng.uniform(-0.003, 0.003), 2.3522 + rng.uniform(-0.003, 0.003), 5, 25)
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*[search() for _ in range(args.searches)])
+            elapsed = time.perf_counter() - start
+            await close_http_client()
+            return elapsed
+
+        elapsed = asyncio.run(run())
+        upstream = server.request_counts["interpreter"]
+
+    stats = overpass_service.overpass_flights.stats()
+    print(f"{args.searches} searches over {args.window * 1000:.0f} ms, {args.delay * 1000:.0f} ms per Overpass request")
+    print(f"upstream requests: {upstream} (without coalescing: {args.searches})")
+    print(f"coalesced: {stats['coalesced']}, wall time {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
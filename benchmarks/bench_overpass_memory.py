@@ -0,0 +1,100 @@
+"""
+Peak memory of parsing a large Overpass response: materialized vs. streaming.
+
+"materialized" is the old path (read the whole body, response.json(), then drop
+unnamed elements); "streaming" feeds the same body in 64 KB chunks through the
+incremental parser used by stream_overpass_elements. Peaks are tracemalloc
+peaks while parsing; the synthetic body is generated lazily so it is only ever
+fully in memory when the materialized path joins it. Times include generating
+the body, which dominates both.
+
+    python benchmarks/bench_overpass_memory.py --megabytes 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+CHUNK_SIZE = 64 * 1024
+
+
+def generate_body(megabytes, seed=0):
+    """Yield a pretty-printed Overpass JSON body of roughly the given size in chunks"""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    pending = '{\n  "version": 0.6,\n  "generator": "Overpass API",\n  "elements": [\n'
+    produced = 0
+    i = 0
+    while produced < target:
+        element = {"type": "way" if i % 2 else "node", "id": i}
+        if i % 2:
+            element["center"] = {"lat": 48 + rng.random(), "lon": 2 + rng.random()}
+            # Forest outlines: long node id lists
+            element["nodes"] = [rng.randrange(10**9) for _ in range(60)]
+        else:
+            element["lat"] = 48 + rng.random()
+            element["lon"] = 2 + rng.random()
+        tags = {"natural": "forest", "source": "survey"}
+        if i % 3 == 0:
+            tags["name"] = f"Forest {i}"
+        element["tags"] = tags
+        text = ("    ,\n" if i else "    ") + json.dumps(element, indent=2).replace("\n", "\n    ") + "\n"
+        pending += text
+        produced += len(text)
+        i += 1
+        while len(pending) >= CHUNK_SIZE:
+            yield pending[:CHUNK_SIZE].encode("utf-8")
+            pending = pending[CHUNK_SIZE:]
+    pending += '  ]\n}\n'
+    yield pending.encode("utf-8")
+
+
+def materialized(chunks):
+    body = b"".join(chunks)
+    data = json.loads(body)
+    return [e for e in data.get("elements", []) if "name" in e.get("tags", {})]
+
+
+def streaming(chunks):
+    from services.spot_searching_page.overpass_service import _compact_element
+    from services.utils.json_stream import JsonArrayStream
+    parser = JsonArrayStream("elements")
+    kept = []
+    for chunk in chunks:
+        for element in parser.feed(chunk):
+            element = _compact_element(element)
+            if element is not None:
+                kept.append(element)
+    kept.extend(e for e in map(_compact_element, parser.close()) if e is not None)
+    return kept
+
+
+def measure(parse, megabytes):
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = parse(generate_body(megabytes))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.megabytes} MB synthetic Overpass body, 1/3 of elements named")
+    print(f"{'mode':<14}{'peak (MB)':>11}{'time (s)':>10}{'kept':>9}")
+    for mode, parse in (("materialized", materialized), ("streaming", streaming)):
+        peak, elapsed, kept = measure(parse, args.megabytes)
+        print(f"{mode:<14}{peak / 1024 / 1024:>11.1f}{elapsed:>10.2f}{kept:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Large-radius search over a dense area: one Overpass query vs. planned ring sub-queries.
+
+The stub answers each query with the elements inside its bbox filters and takes
+--transfer seconds per 1000 elements returned. "first page" stops after --page
+spots, as a paginated or streaming client does; "full" reads everything.
+
+    python benchmarks/bench_query_planner.py --elements 40000 --radius 50 --page 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer, make_elements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=40000)
+    parser.add_argument("--radius", type=int, default=50, help="search radius (km)")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub latency per request (s)")
+    parser.add_argument("--transfer", type=float, default=0.1, help="stub transfer time per 1000 elements (s)")
+    args = parser.parse_args()
+
+    os.environ["OVERPASS_SPECULATIVE_SECONDARY"] = "false"
+    elements = make_elements(args.elements, spread=args.radius / 111)
+    with StubOSMServer(delay=args.delay, elements=elements, transfer_time=args.transfer, filter_bbox=True) as server:
+        os.environ["NOMINATIM_URL"] = server.base_url
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+
+        from services.spot_searching_page import overpass_service, poi_engine, query_planner
+        from services.utils.http_client import close_http_client
+
+        center = poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+        async def measure(limit):
+            overpass_service.poi_tile_cache.clear()
+            requests_before, bytes_before = server.request_counts["interpreter"], server.bytes_sent
+            start = time.perf_counter()
+            spots = await poi_engine.search_pois(center, args.radius, limit)
+            elapsed = time.perf_counter() - start
+            # Let cancelled sub-queries wind down before reading the counters
+            await asyncio.sleep(0.2)
+            return elapsed, len(spots), server.request_counts["interpreter"] - requests_before, server.bytes_sent - bytes_before
+
+        async def run():
+            results = {}
+            for mode, target in (("one query", 10 ** 9), ("planned", None)):
+                query_planner.OVERPASS_SUBQUERY_TARGET = target or int(os.getenv("OVERPASS_SUBQUERY_TARGET", 2000))
+                for scope, limit in (("first page", args.page), ("full", None)):
+                    results[(mode, scope)] = await measure(limit)
+            await close_http_client()
+            return results
+
+        results = asyncio.run(run())
+
+    print(f"{args.elements} elements within {args.radius} km, {args.delay * 1000:.0f} ms + {args.transfer * 1000:.0f} ms/1000 elements")
+    print(f"{'mode':<11}{'scope':<12}{'time (ms)':>10}{'spots':>8}{'requests':>10}{'MB sent':>9}")
+    for (mode, scope), (elapsed, spots, requests, sent) in results.items():
+        print(f"{mode:<11}{scope:<12}{elapsed * 1000:>10.0f}{spots:>8}{requests:>10}{sent / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
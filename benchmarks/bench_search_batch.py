@@ -0,0 +1,86 @@
+"""
+An itinerary of N destinations: sequential /search calls vs. concurrent ones vs. one /search/batch.
+
+Each destination has its own cluster of spots; the stub answers a query with the
+elements inside its bbox filters after --delay seconds. All three modes return
+the first ranked page of every destination, starting from cold caches.
+
+    python benchmarks/bench_search_batch.py --destinations 10 --radius 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer, make_elements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destinations", type=int, default=10)
+    parser.add_argument("--radius", type=int, default=5, help="search radius (km)")
+    parser.add_argument("--spots", type=int, default=300, help="spots around each destination")
+    parser.add_argument("--delay", type=float, default=0.3, help="stub latency per request (s)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    # Destinations a few hundred km apart, as along a road trip
+    cities = [(44.0 + rng.uniform(0, 5), 0.0 + rng.uniform(0, 6)) for _ in range(args.destinations)]
+    elements = []
+    for i, (lat, lon) in enumerate(cities):
+        for element in make_elements(args.spots, lat=lat, lon=lon, spread=args.radius / 111, seed=i):
+            element["id"] += i * args.spots
+            elements.append(element)
+
+    with StubOSMServer(delay=args.delay, elements=elements, filter_bbox=True) as server:
+        os.environ["NOMINATIM_URL"] = server.base_url
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+
+        from models.models import SearchRequest1
+        from services.spot_searching_page import overpass_service, poi_engine
+        from services.spot_searching_page.geocode_service import reverse_geocode_cache
+        from services.utils.http_client import close_http_client
+
+        requests = [SearchRequest1(lat=lat, lon=lon, radius=args.radius) for lat, lon in cities]
+        front_end = poi_engine.center_from_coordinates
+
+        async def sequential():
+            return [(await poi_engine.search_page(request, front_end)).total for request in requests]
+
+        async def concurrent():
+            pages = await asyncio.gather(*(poi_engine.search_page(request, front_end) for request in requests))
+            return [page.total for page in pages]
+
+        async def batch():
+            return [result.page.total for result in await poi_engine.search_batch(requests, front_end)]
+
+        async def run():
+            results = {}
+            for name, search in (("sequential", sequential), ("concurrent", concurrent), ("batch", batch)):
+                overpass_service.poi_tile_cache.clear()
+                poi_engine.ranked_results.clear()
+                reverse_geocode_cache.clear()
+                counts_before = dict(server.request_counts)
+                start = time.perf_counter()
+                totals = await search()
+                elapsed = time.perf_counter() - start
+                counts = {endpoint: server.request_counts[endpoint] - counts_before[endpoint] for endpoint in counts_before}
+                results[name] = (elapsed, sum(totals), counts["interpreter"], counts["reverse"])
+            await close_http_client()
+            return results
+
+        results = asyncio.run(run())
+
+    print(f"{args.destinations} destinations, {args.radius} km radius, {args.delay * 1000:.0f} ms per request")
+    print(f"{'mode':<12}{'time (ms)':>10}{'spots':>8}{'overpass':>10}{'reverse':>9}")
+    for name, (elapsed, spots, overpass, reverse) in results.items():
+        print(f"{name:<12}{elapsed * 1000:>10.0f}{spots:>8}{overpass:>10}{reverse:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Concurrent-search throughput benchmark against the local stub Nominatim/Overpass server.
+
+"before" reproduces the old code path (blocking requests.get/requests.post inside an
+async handler), "after" runs search_tourist_spots through the shared async client.
+
+    python benchmarks/bench_search_concurrency.py --concurrency 20 --delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer
+
+
+async def blocking_search(base_url, location):
+    """The pre-async search: two blocking calls that hold the event loop"""
+    response = requests.get(f"{base_url}/search", params={"q": location, "format": "json"},
+                            headers={'User-Agent': 'TouristApp/1.0'}, timeout=10)
+    data = response.json()
+    lat, lon = float(data[0]['lat']), float(data[0]['lon'])
+    query = f"[out:json];node(around:5000,{lat},{lon});out body center;"
+    response = requests.post(f"{base_url}/api/interpreter", data={"data": query}, timeout=60)
+    return response.json().get('elements', [])
+
+
+async def run_batch(make_call, concurrency):
+    start = time.perf_counter()
+    await asyncio.gather(*(make_call(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub server latency per request (s)")
+    args = parser.parse_args()
+
+    with StubOSMServer(delay=args.delay) as server:
+        os.environ["NOMINATIM_URL"] = server.base_url
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+        # Measure the transport, not the caches: every lookup goes upstream
+        os.environ["GEOCODE_CACHE_TTL"] = "0"
+        os.environ["POI_TILE_TTL"] = "0"
+
+        from models.models import SearchRequest
+        from services.spot_searching_page.search_service import search_tourist_spots
+        from services.utils.http_client import close_http_client
+
+        async def after():
+            elapsed = await run_batch(
+                lambda i: search_tourist_spots(SearchRequest(location=f"City {i}", radius=5)),
+                args.concurrency)
+            await close_http_client()
+            return elapsed
+
+        before_elapsed = asyncio.run(run_batch(
+            lambda i: blocking_search(server.base_url, f"City {i}"), args.concurrency))
+        after_elapsed = asyncio.run(after())
+
+    print(f"{args.concurrency} concurrent searches, {args.delay * 1000:.0f} ms upstream latency")
+    print(f"{'mode':<8}{'wall (s)':>10}{'searches/s':>14}")
+    for mode, elapsed in (("before", before_elapsed), ("after", after_elapsed)):
+        print(f"{mode:<8}{elapsed:>10.2f}{args.concurrency / elapsed:>14.1f}")
+    print(f"speedup: {before_elapsed / after_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
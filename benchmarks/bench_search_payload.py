@@ -0,0 +1,66 @@
+"""
+Response size and serialization time of a large search: the full spot list vs. one ranked page.
+
+"full list" is what /search used to return (every spot, with tags, through the
+response_model); "page" is the default first page (50 spots, no tags) including
+the ranking of the whole result set.
+
+    python benchmarks/bench_search_payload.py --spots 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import make_elements
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spots", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+    from models.models import TouristSpot
+    from services.spot_searching_page import poi_engine
+    from services.spot_searching_page.ranking import rank_spots
+
+    elements = make_elements(args.spots, spread=0.2)
+    # Real OSM spots carry more tags than the synthetic ones
+    for element in elements:
+        element["tags"].update({"addr:street": "Rue de Rivoli", "opening_hours": "Mo-Su 09:00-18:00", "website": "https://example.org", "wheelchair": "yes"})
+    spots = [poi_engine.parse_element(element, "primary") for element in elements]
+
+    def full_list():
+        validated = [TouristSpot.model_validate(spot.to_dict()) for spot in spots]
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+    def first_page():
+        ranked = rank_spots(spots, 48.8566, 2.3522, 25)
+        include = set(poi_engine.DEFAULT_FIELDS)
+        return json.dumps([spot.to_dict(include) for spot, _ in ranked[:poi_engine.SEARCH_PAGE_SIZE]]).encode("utf-8")
+
+    full_body, full_time = timed(full_list, args.repeat)
+    page_body, page_time = timed(first_page, args.repeat)
+
+    print(f"{args.spots} spots")
+    print(f"{'response':<12}{'bytes':>10}{'time (ms)':>11}")
+    print(f"{'full list':<12}{len(full_body):>10}{full_time * 1000:>11.1f}")
+    print(f"{'page':<12}{len(page_body):>10}{page_time * 1000:>11.1f}")
+    print(f"payload {len(full_body) / len(page_body):.0f}x smaller, serialization {full_time / page_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Time to first result of the streaming search vs. the time the buffered search takes to answer.
+
+The stub trickles its Overpass body over --transfer seconds, like a large real
+response. "cold" searches start from an empty tile cache; "partly warm" ones
+follow a 1 km search at the same spot, so the center tiles are cached and the
+outer ring still has to be fetched.
+
+    python benchmarks/bench_search_ttfr.py --searches 10 --delay 0.3 --transfer 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer, make_elements
+
+
+async def time_buffered(poi_engine, request):
+    start = time.perf_counter()
+    await poi_engine.search_spots(request, poi_engine.center_from_coordinates)
+    return time.perf_counter() - start
+
+
+async def time_streamed(poi_engine, request):
+    """(seconds to the first spot line, seconds to the end of the stream)"""
+    start = time.perf_counter()
+    first = None
+    async for line in poi_engine.stream_spots(request, poi_engine.center_from_coordinates):
+        if first is None and json.loads(line)["type"] == "spot":
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--elements", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.3, help="stub latency before the body starts (s)")
+    parser.add_argument("--transfer", type=float, default=1.0, help="time the stub spends sending the body (s)")
+    args = parser.parse_args()
+
+    with StubOSMServer(delay=args.delay, elements=make_elements(args.elements), transfer_time=args.transfer) as server:
+        os.environ["NOMINATIM_URL"] = server.base_url
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+
+        from models.models import SearchRequest1
+        from services.spot_searching_page import overpass_service, poi_engine
+        from services.utils.http_client import close_http_client
+
+        request = SearchRequest1(lat=48.8566, lon=2.3522, radius=5)
+        warmup = SearchRequest1(lat=48.8566, lon=2.3522, radius=1)
+
+        async def run():
+            results = {}
+            await poi_engine.center_from_coordinates(request)  # cache the country lookup
+            for scenario in ("cold", "partly warm"):
+                buffered, first, streamed = [], [], []
+                for _ in range(args.searches):
+                    for mode in ("buffered", "streamed"):
+                        overpass_service.poi_tile_cache.clear()
+                        if scenario == "partly warm":
+                            await poi_engine.search_spots(warmup, poi_engine.center_from_coordinates)
+                        if mode == "buffered":
+                            buffered.append(await time_buffered(poi_engine, request))
+                        else:
+                            first_spot, total = await time_streamed(poi_engine, request)
+                            first.append(first_spot)
+                            streamed.append(total)
+                results[scenario] = (buffered, first, streamed)
+            await close_http_client()
+            return results
+
+        results = asyncio.run(run())
+
+    print(f"{args.searches} searches x {args.elements} elements, {args.delay * 1000:.0f} ms latency + {args.transfer * 1000:.0f} ms transfer")
+    print(f"{'scenario':<13}{'buffered (ms)':>15}{'first spot (ms)':>17}{'stream end (ms)':>17}")
+    for scenario, (buffered, first, streamed) in results.items():
+        print(f"{scenario:<13}{statistics.median(buffered) * 1000:>15.0f}"
+              f"{statistics.median(first) * 1000:>17.0f}{statistics.median(streamed) * 1000:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
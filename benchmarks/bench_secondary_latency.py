@@ -0,0 +1,69 @@
+"""
+Sparse-area search latency with the secondary Overpass query run after vs. alongside the primary.
+
+The stub returns fewer than MIN_PRIMARY_RESULTS spots, so every search needs the
+secondary query; caches are disabled so each search pays the full round-trips.
+
+    python benchmarks/bench_secondary_latency.py --searches 40 --delay 0.2 --jitter 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import StubOSMServer, make_elements
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(searches, fetch):
+    latencies = []
+    for i in range(searches):
+        start = time.perf_counter()
+        await fetch(48.8566 + i * 0.5, 2.3522, 5, 25)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.2, help="base stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="extra uniform random latency (s)")
+    args = parser.parse_args()
+
+    with StubOSMServer(delay=args.delay, jitter=args.jitter, elements=make_elements(5)) as server:
+        os.environ["OVERPASS_URL"] = f"{server.base_url}/api/interpreter"
+        os.environ["POI_TILE_TTL"] = "0"
+
+        from services.spot_searching_page import overpass_service
+        from services.utils.http_client import close_http_client
+
+        results = {}
+        for mode, speculative in (("sequential", False), ("speculative", True)):
+            overpass_service.SPECULATIVE_SECONDARY = speculative
+
+            async def run():
+                latencies = await measure(args.searches, overpass_service.fetch_primary_and_secondary)
+                await close_http_client()
+                return latencies
+
+            results[mode] = asyncio.run(run())
+
+    print(f"{args.searches} sparse-area searches, {args.delay * 1000:.0f} ms + 0-{args.jitter * 1000:.0f} ms per Overpass call")
+    print(f"{'mode':<13}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for mode, latencies in results.items():
+        print(f"{mode:<13}{statistics.median(latencies) * 1000:>10.0f}{percentile(latencies, 95) * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Distance filtering and sorting of a search result set: per-spot Python haversine vs. the NumPy kernel.
+
+"scalar" computes each spot's distance with haversine_km, drops spots outside
+the radius and sorts the rest, as rank_spots used to. "vectorized" is
+ranking.sort_by_distance, including reading coordinates from and setting
+distance_km on the Spot objects. "kernel" is the same haversine, radius filter
+and sort on coordinate arrays that already exist.
+
+    python benchmarks/bench_spot_distance.py --spots 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import make_elements
+
+CENTER = (48.8566, 2.3522)
+
+
+def timed(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spots", type=int, default=10000)
+    parser.add_argument("--radius", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    import numpy as np
+    from services.spot_searching_page.poi_engine import parse_element
+    from services.spot_searching_page.ranking import sort_by_distance
+    from services.utils.geo import haversine_km, haversine_km_array
+
+    spots = [parse_element(element, "primary") for element in make_elements(args.spots, spread=0.25)]
+    lats = np.array([spot.lat for spot in spots])
+    lons = np.array([spot.lon for spot in spots])
+
+    def scalar():
+        within = []
+        for spot in spots:
+            distance = haversine_km(CENTER[0], CENTER[1], spot.lat, spot.lon)
+            if distance <= args.radius:
+                within.append((distance, spot.id, spot))
+        within.sort(key=lambda entry: entry[:2])
+        return [spot for _, _, spot in within]
+
+    def vectorized():
+        return sort_by_distance(spots, CENTER[0], CENTER[1], args.radius)
+
+    def kernel():
+        distances = haversine_km_array(CENTER[0], CENTER[1], lats, lons)
+        inside = np.flatnonzero(distances <= args.radius)
+        return inside[np.argsort(distances[inside], kind="stable")]
+
+    scalar_result, scalar_time = timed(scalar, args.repeat)
+    vectorized_result, vectorized_time = timed(vectorized, args.repeat)
+    kernel_result, kernel_time = timed(kernel, args.repeat)
+    assert [spot.id for spot in scalar_result] == [spot.id for spot in vectorized_result]
+    assert [spots[i].id for i in kernel_result] == [spot.id for spot in vectorized_result]
+
+    print(f"{args.spots} spots, {len(vectorized_result)} within {args.radius:g} km")
+    print(f"{'path':<12}{'time (ms)':>11}")
+    print(f"{'scalar':<12}{scalar_time * 1000:>11.2f}")
+    print(f"{'vectorized':<12}{vectorized_time * 1000:>11.2f}")
+    print(f"{'kernel':<12}{kernel_time * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Memory per 10k spots and parse time: pydantic TouristSpot per element vs. the compact Spot record.
+
+"pydantic" is the previous parse_element: a TouristSpot with its own copy of the
+tags dict, plus the location_details dict it built and pydantic dropped.
+"compact" is the current parse_element. Elements are decoded from one JSON body,
+like an Overpass response, and stay alive (as they do in the tile cache), so
+only the spots themselves are measured.
+
+    python benchmarks/bench_spot_memory.py --spots 10000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stub_osm_server import make_elements
+
+
+def pydantic_parse(element, tier, country="France"):
+    from models.models import TouristSpot
+    from services.spot_searching_page.overpass_service import element_coordinates
+    from services.spot_searching_page.poi_catalog import CLASSIFIERS
+
+    tags = element.get('tags')
+    if not tags or 'name' not in tags:
+        return None
+    coordinates = element_coordinates(element)
+    if coordinates is None:
+        return None
+    location_details = {
+        'street': tags.get('addr:street', ''),
+        'city': tags.get('addr:city', ''),
+        'state': tags.get('addr:state', ''),
+        'country': tags.get('addr:country', country)
+    }
+    return TouristSpot(
+        id=str(element.get('id', '')), name=tags['name'], category=CLASSIFIERS[tier](tags),
+        lat=coordinates[0], lon=coordinates[1], tags=tags, location_details=location_details
+    )
+
+
+def measure(parse, elements):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    spots = [parse(element, "primary") for element in elements]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del spots
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spots", type=int, default=10000)
+    args = parser.parse_args()
+
+    from services.spot_searching_page.poi_engine import parse_element
+
+    elements = make_elements(args.spots)
+    # Typical extra OSM tags of a tourist spot
+    for i, element in enumerate(elements):
+        element["tags"].update({"addr:street": f"Street {i % 300}", "opening_hours": "Mo-Su 09:00-18:00",
+                                "wheelchair": "yes", "website": f"https://example.org/{i}"})
+    elements = json.loads(json.dumps(elements))
+
+    # Untimed warm-up so imports and first-call costs are not measured
+    measure(pydantic_parse, elements[:100])
+    measure(parse_element, elements[:100])
+
+    results = {"pydantic": measure(pydantic_parse, elements), "compact": measure(parse_element, elements)}
+
+    print(f"{args.spots} spots")
+    print(f"{'model':<10}{'MB / 10k spots':>16}{'parse (ms)':>12}")
+    for name, (size, elapsed) in results.items():
+        print(f"{name:<10}{size / 1e6 * 10000 / args.spots:>16.2f}{elapsed * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Local stand-in for the Groq chat completions API used by the key pool load test.
+
+Each API key gets `requests_per_window` requests and `tokens_per_window`
+tokens per fixed `window` of seconds, reported in Groq's x-ratelimit-*
+headers; past either limit the key gets a 429 with retry-after until the
+window rolls over. `outages` adds scheduled 429s: {key: [(start, end), ...]}
+in seconds since the server started. Every answer takes `delay` seconds.
+
+Streamed requests ("stream": true) get `stream_text` as SSE chunks of one word,
+`token_delay` seconds apart, continuing after an assistant prefill when the
+last message is one; other requests wait as long as that stream would take
+before answering. `stream_drops` breaks streams off: {key: chunks} drops
+the connection of every stream on that key after that many chunks.
+"""
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+COMPLETION_TOKENS = 20
+STREAM_TEXT = "The gallery opens at nine and stays open until late on Fridays, so arrive early to beat the queue."
+
+
+class FakeGroqServer:
+    """Threaded HTTP server answering /openai/v1/chat/completions"""
+
+    def __init__(self, delay=0.05, requests_per_window=30, tokens_per_window=100000, window=1.0, outages=None,
+                 stream_text=STREAM_TEXT, token_delay=0.0, stream_drops=None, host="127.0.0.1", port=0):
+        self.delay = delay
+        self.stream_text = stream_text
+        self.token_delay = token_delay
+        self.stream_drops = stream_drops or {}
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.outages = outages or {}
+        self.request_counts = {}
+        self.rate_limited = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._usage = {}
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self, key, tokens):
+        """(status, headers) of a request by a key costing some tokens, charging it when admitted"""
+        now = time.monotonic() - self._started_at
+        window_start = math.floor(now / self.window) * self.window
+        reset = window_start + self.window - now
+        with self._lock:
+            started, requests, used_tokens = self._usage.get(key, (window_start, 0, 0))
+            if started != window_start:
+                requests, used_tokens = 0, 0
+            for start, end in self.outages.get(key, []):
+                if start <= now < end:
+                    self.rate_limited[key] = self.rate_limited.get(key, 0) + 1
+                    return 429, {"retry-after": f"{end - now:.3f}"}
+            if requests >= self.requests_per_window or used_tokens + tokens > self.tokens_per_window:
+                self.rate_limited[key] = self.rate_limited.get(key, 0) + 1
+                return 429, {"retry-after": f"{reset:.3f}"}
+            requests += 1
+            used_tokens += tokens
+            self._usage[key] = (window_start, requests, used_tokens)
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+        return 200, {
+            "x-ratelimit-limit-requests": str(self.requests_per_window),
+            "x-ratelimit-remaining-requests": str(self.requests_per_window - requests),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            "x-ratelimit-limit-tokens": str(self.tokens_per_window),
+            "x-ratelimit-remaining-tokens": str(self.tokens_per_window - used_tokens),
+            "x-ratelimit-reset-tokens": f"{reset:.3f}s",
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small SSE chunks would otherwise wait for the previous one's ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_stream(self, key, request, headers):
+                """SSE completion chunks in a chunked body, cut off without its terminator for stream_drops keys"""
+                messages = request.get("messages", [])
+                text = stub.stream_text
+                if messages and messages[-1].get("role") == "assistant":
+                    text = text[len(messages[-1].get("content") or ""):]
+                words = re.findall(r"\s*\S+", text)
+                drop_after = stub.stream_drops.get(key)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+
+                def chunk(delta, finish_reason=None):
+                    return {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": request.get("model", "fake"),
+                            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+                events = [chunk({"role": "assistant", "content": word}) for word in words]
+                events.append(chunk({}, "stop"))
+                try:
+                    for i, event in enumerate(events):
+                        if drop_after is not None and i >= drop_after:
+                            self.close_connection = True
+                            return
+                        data = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                        self.wfile.flush()
+                        time.sleep(stub.token_delay)
+                    data = b"data: [DONE]\n\n"
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if urlsplit(self.path).path != "/openai/v1/chat/completions":
+                    self.send_error(404)
+                    return
+                key = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                prompt_tokens = sum(len(message.get("content") or "") for message in request.get("messages", [])) // 4
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    status, headers = stub._admit(key, prompt_tokens + COMPLETION_TOKENS)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                if status == 429:
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}, headers)
+                    return
+                if request.get("stream"):
+                    self._send_stream(key, request, headers)
+                    return
+                time.sleep(stub.token_delay * len(re.findall(r"\s*\S+", stub.stream_text)))
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": f"Answer from {key}"}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": COMPLETION_TOKENS,
+                              "total_tokens": prompt_tokens + COMPLETION_TOKENS},
+                }, headers)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with FakeGroqServer() as server:
+        print(f"Fake Groq API listening on {server.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,180 @@
+"""
+Local stand-in for the Nominatim and Overpass APIs used by the search benchmarks.
+
+Every endpoint sleeps for a configurable delay before answering, so the
+benchmarks measure how well concurrent searches overlap rather than how fast
+the public services happen to be. With `transfer_time` set, Overpass bodies are
+written in chunks spread over that many seconds, like a large real response.
+With `filter_bbox` set, Overpass answers only with the elements inside the
+query's bbox filters (capped like `out ... qt N`), and `transfer_time` is then
+per 1000 elements returned.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+
+_BBOX = re.compile(r"\((-?[\d.]+),(-?[\d.]+),(-?[\d.]+),(-?[\d.]+)\)")
+_CAP = re.compile(r"out body center qt (\d+);")
+
+
+def make_elements(count, lat=48.8566, lon=2.3522, spread=0.05, seed=0):
+    """Build a synthetic Overpass 'elements' list around a center point"""
+    rng = random.Random(seed)
+    categories = [
+        ("tourism", "attraction"), ("tourism", "hotel"), ("tourism", "viewpoint"),
+        ("natural", "forest"), ("historic", "monument"), ("leisure", "park"),
+        ("tourism", "museum"),
+    ]
+    elements = []
+    for i in range(count):
+        key, value = categories[i % len(categories)]
+        element_type = "node" if i % 3 else "way"
+        element_lat = lat + rng.uniform(-spread, spread)
+        element_lon = lon + rng.uniform(-spread, spread)
+        tags = {key: value, "name": f"Spot {i}"}
+        if i % 5 == 0:
+            tags["wikidata"] = f"Q{i}"
+        if i % 4 == 0:
+            tags["addr:city"] = "Paris"
+        element = {"type": element_type, "id": 1000 + i, "tags": tags}
+        if element_type == "node":
+            element["lat"] = element_lat
+            element["lon"] = element_lon
+        else:
+            element["center"] = {"lat": element_lat, "lon": element_lon}
+        elements.append(element)
+    return elements
+
+
+class StubOSMServer:
+    """Threaded HTTP server answering /search, /reverse and /api/interpreter"""
+
+    def __init__(self, delay=0.2, elements=None, host="127.0.0.1", port=0, jitter=0.0, transfer_time=0.0, chunks=20,
+                 filter_bbox=False):
+        self.delay = delay
+        self.filter_bbox = filter_bbox
+        self.bytes_sent = 0
+        self.jitter = jitter
+        self.transfer_time = transfer_time
+        self.chunks = chunks
+        self.elements = elements if elements is not None else make_elements(50)
+        self.request_counts = {"search": 0, "reverse": 0, "interpreter": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _sleep(self):
+        time.sleep(self.delay + random.uniform(0, self.jitter))
+
+    def _answer(self, query):
+        """(elements, transfer time) of an Overpass query"""
+        if not self.filter_bbox:
+            return self.elements, self.transfer_time
+        boxes = [tuple(map(float, box)) for box in _BBOX.findall(query)]
+        selected = []
+        for element in self.elements:
+            position = element.get("center") or element
+            if any(s <= position["lat"] <= n and w <= position["lon"] <= e for s, w, n, e in boxes):
+                selected.append(element)
+        caps = [int(cap) for cap in _CAP.findall(query)]
+        if caps:
+            selected = selected[:sum(caps)]
+        return selected, self.transfer_time * len(selected) / 1000
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.request_counts[endpoint] += 1
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, transfer_time=0.0):
+                body = json.dumps(payload).encode("utf-8")
+                with stub._lock:
+                    stub.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                chunk_size = max(1, -(-len(body) // stub.chunks))
+                try:
+                    if transfer_time <= 0:
+                        self.wfile.write(body)
+                        return
+                    for offset in range(0, len(body), chunk_size):
+                        self.wfile.write(body[offset:offset + chunk_size])
+                        self.wfile.flush()
+                        time.sleep(transfer_time / stub.chunks)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the request mid-body
+                    pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = parse_qs(parts.query)
+                stub._sleep()
+                if parts.path == "/search":
+                    stub._count("search")
+                    self._send_json([{
+                        "lat": "48.8566", "lon": "2.3522",
+                        "display_name": f"{params.get('q', [''])[0]}, France",
+                    }])
+                elif parts.path == "/reverse":
+                    stub._count("reverse")
+                    self._send_json({"address": {"country": "France"}})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                query = unquote_plus(self.rfile.read(length).decode("utf-8"))
+                stub._sleep()
+                if urlsplit(self.path).path == "/api/interpreter":
+                    stub._count("interpreter")
+                    elements, transfer_time = stub._answer(query)
+                    self._send_json({"elements": elements}, transfer_time)
+                else:
+                    self.send_error(404)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with StubOSMServer() as server:
+        print(f"Stub Nominatim/Overpass listening on {server.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -1,20 +1,28 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
-from services.spot_searching_page.description_service import generate_description
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from services.spot_searching_page.description_service import generate_description, stream_description
 from services.spot_searching_page.location_weather_services import get_location_weather
+from services.spot_searching_page.offline_index import get_offline_index
+from services.spot_searching_page.overpass_service import POI_BACKEND
+from services.spot_searching_page.poi_engine import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, SearchPage
 from services.spot_searching_page.map_service import generate_map_all, generate_map_selected
-from services.spot_searching_page.question_service import ask_question
-from services.spot_searching_page.search_service import search_tourist_spots
-from services.spot_searching_page.search_spot_with_cu_location import search_tourist_spots_with_current_location
-from typing import List
-from services.spot_searching_page.weather_service import get_weather_data
+from services.spot_searching_page.question_service import ask_question, stream_question
+from services.spot_searching_page.search_service import search_tourist_spots_batch, search_tourist_spots_page, stream_tourist_spots
+from services.spot_searching_page.warmup import WARMUP_TOKEN, parse_destinations, warmup_scheduler
+from services.spot_searching_page.search_spot_with_cu_location import search_tourist_spots_with_current_location_page, stream_tourist_spots_with_current_location
+from typing import List, Optional
+from services.spot_searching_page.weather_service import WEATHER_BATCH_MAX, get_weather_batch, get_weather_data
+from services.utils.cache import get_cache_stats
+from services.utils.http_client import close_http_client
+from api_manager.api_manager import get_key_manager
 import logging
-from models.models import AskQuestionRequest, MapRequest, PlaceDescriptionRequest, SearchRequest, TouristSpot, SearchRequest1
+from models.models import AskQuestionRequest, BatchSearchRequest, MapRequest, PlaceDescriptionRequest, SearchRequest, SearchSpot, TouristSpot, SearchRequest1, WeatherBatchRequest
 from fastapi.responses import HTMLResponse
 import os
 import glob
+import hmac
 from services.auth.routes import router as auth_router
 from services.auth.social_routes import router as social_router
 from services.auth.media_routes import router as media_router
@@ -37,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Include authentication and social routes
@@ -156,13 +165,65 @@ class CustomStaticFiles(StaticFiles):
 # Mount static files directory for uploads with custom handler
 app.mount("/uploads", CustomStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
+@app.on_event("startup")
+async def load_offline_poi_index():
+    # Build the local POI index up front so the first search does not pay for it
+    if POI_BACKEND == "offline":
+        get_offline_index()
+
+@app.on_event("startup")
+async def init_groq_key_pool():
+    # One key pool for every service; fails startup when no GROQ_API_KEY is configured
+    get_key_manager()
+
+@app.on_event("startup")
+async def start_warmup_scheduler():
+    # Pre-populate the geocode and POI caches of hot destinations, now and every WARMUP_INTERVAL
+    if warmup_scheduler.enabled:
+        warmup_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_warmup_scheduler():
+    await warmup_scheduler.stop()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    # Release pooled keep-alive connections held by the shared HTTP client
+    await close_http_client()
+
 @app.get("/weather")
 async def get_location_weather(lat: float, lon: float):
-    weather_data = get_weather_data(lat, lon)
+    weather_data = await get_weather_data(lat, lon)
     if weather_data:
         return weather_data
     raise HTTPException(status_code=404, detail="Weather data unavailable")
 
+@app.post("/weather/batch")
+async def get_weather_batch_endpoint(request: WeatherBatchRequest):
+    # One entry per point, in request order; null where the forecast is unavailable
+    if len(request.points) > WEATHER_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {WEATHER_BATCH_MAX} points per batch")
+    return await get_weather_batch([(point.lat, point.lon) for point in request.points])
+
+@app.post("/warmup")
+async def run_warmup(destinations: Optional[str] = None, x_warmup_token: Optional[str] = Header(None)):
+    # Operator endpoint behind warmup.py; disabled unless WARMUP_TOKEN is set
+    if not WARMUP_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_warmup_token or not hmac.compare_digest(x_warmup_token.encode("utf-8"), WARMUP_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid warm-up token")
+    results = await warmup_scheduler.run_once(parse_destinations(destinations) if destinations else None)
+    return [
+        {"location": r.destination.location, "radius": r.destination.radius, "ok": r.ok,
+         "seconds": round(r.seconds, 3), "spots": r.spots, "detail": r.detail}
+        for r in results
+    ]
+
+@app.get("/metrics")
+async def get_metrics():
+    # Hit/miss counters of the in-process caches
+    return {"caches": get_cache_stats()}
+
 @app.post("/map/all", response_class=HTMLResponse)
 async def generate_map_all_endpoint(request: MapRequest):
     try:
@@ -179,27 +240,87 @@ async def generate_map_selected_endpoint(spot: TouristSpot):
         logger.error(f"Error generating selected map: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate selected map")
 
-@app.post("/search", response_model=List[TouristSpot])
-@app.get("/search")
-async def search_tourist_spots_endpoint(request: SearchRequest):
+# Paging headers of /search responses, for the OpenAPI schema
+SEARCH_PAGE_RESPONSES = {200: {"headers": {
+    "X-Total-Count": {"description": "Number of spots found", "schema": {"type": "integer"}},
+    "X-Next-Cursor": {"description": "Cursor of the next page, absent on the last page", "schema": {"type": "string"}},
+}}}
+
+def search_page_response(page: SearchPage) -> JSONResponse:
+    # The body stays a plain list of spots; paging details travel in headers
+    headers = {"X-Total-Count": str(page.total)}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return JSONResponse(content=page.items, headers=headers)
+
+@app.post("/search", response_model=List[SearchSpot], responses=SEARCH_PAGE_RESPONSES)
+@app.get("/search", response_model=List[SearchSpot], responses=SEARCH_PAGE_RESPONSES)
+async def search_tourist_spots_endpoint(request: SearchRequest, limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+                                        cursor: Optional[str] = None, fields: Optional[str] = None, sort: str = "rank"):
     try:
-        return await search_tourist_spots(request)
+        return search_page_response(await search_tourist_spots_page(request, limit, cursor, fields, sort))
+    except HTTPException as e:
+        if e.status_code == 400:
+            raise
+        logger.error(f"Error searching tourist spots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search tourist spots")
     except Exception as e:
         logger.error(f"Error searching tourist spots: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to search tourist spots")
     
 # In your FastAPI backend code
-@app.get("/search_with_current_location", response_model=List[TouristSpot])
-async def search_tourist_spots_with_current_location_endpoint(lat: float, lon: float, radius: int = 10):
+@app.get("/search_with_current_location", response_model=List[SearchSpot], responses=SEARCH_PAGE_RESPONSES)
+async def search_tourist_spots_with_current_location_endpoint(lat: float, lon: float, radius: int = 10,
+                                                              limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+                                                              cursor: Optional[str] = None, fields: Optional[str] = None, sort: str = "rank"):
     try:
         # Create SearchRequest without 'location'
         request = SearchRequest1(lat=lat, lon=lon, radius=radius)
-        spots = await search_tourist_spots_with_current_location(request)
-        return spots
+        page = await search_tourist_spots_with_current_location_page(request, limit, cursor, fields, sort)
+        return search_page_response(page)
+    except HTTPException as e:
+        if e.status_code == 400:
+            raise
+        logger.error(f"Error searching tourist spots: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching tourist spots: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/batch")
+async def search_tourist_spots_batch_endpoint(request: BatchSearchRequest, limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+                                              fields: Optional[str] = None, sort: str = "rank"):
+    try:
+        results = await search_tourist_spots_batch(request.searches, limit, fields, sort)
+    except HTTPException as e:
+        if e.status_code == 400:
+            raise
+        logger.error(f"Error in batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search tourist spots")
+    # One entry per destination, in request order; next_cursor pages on through /search
+    return [
+        {
+            "location": search.location,
+            "radius": search.radius,
+            "status_code": result.status_code,
+            "detail": result.detail,
+            "total": result.page.total if result.page else 0,
+            "next_cursor": result.page.next_cursor if result.page else None,
+            "spots": result.page.items if result.page else [],
+        }
+        for search, result in zip(request.searches, results)
+    ]
+
+@app.post("/search/stream")
+async def stream_tourist_spots_endpoint(request: SearchRequest):
+    # NDJSON: a 'center' line, one 'spot' line per spot as it is found, then 'done' (or 'error')
+    return StreamingResponse(stream_tourist_spots(request), media_type="application/x-ndjson")
+
+@app.get("/search_with_current_location/stream")
+async def stream_tourist_spots_with_current_location_endpoint(lat: float, lon: float, radius: int = 10):
+    request = SearchRequest1(lat=lat, lon=lon, radius=radius)
+    return StreamingResponse(stream_tourist_spots_with_current_location(request), media_type="application/x-ndjson")
+
 @app.post("/generate_description", response_model=str)
 async def generate_description_endpoint(request: PlaceDescriptionRequest):
     try:
@@ -215,6 +336,18 @@ async def ask_question_endpoint(request: AskQuestionRequest):
     except Exception as e:
         logger.error(f"Error answering question: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to answer question")
+
+@app.post("/generate_description/stream")
+async def stream_description_endpoint(request: PlaceDescriptionRequest):
+    # SSE: a 'token' event per chunk of the description as Groq generates it, then 'done' (or 'error')
+    return StreamingResponse(stream_description(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/ask_question/stream")
+async def stream_question_endpoint(request: AskQuestionRequest):
+    # SSE: a 'token' event per chunk of the answer as Groq generates it, then 'done' (or 'error')
+    return StreamingResponse(stream_question(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     
     
 # Run the app
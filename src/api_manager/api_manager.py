@@ -1,105 +1,440 @@
+import asyncio
+import hashlib
+import math
 import os
-from dotenv import load_dotenv
-from groq import Groq
+import re
+import threading
 import time
+import weakref
+from dotenv import load_dotenv
+import httpx
+from groq import APIError, APIStatusError, AsyncGroq, RateLimitError
 import logging
-from typing import Callable, Any, List, Dict
+from typing import AsyncIterator, Awaitable, Callable, Any, List, Dict, Optional, Tuple
+from services.utils.cache import SQLiteCache, register_cache
 
 # Set up logging
-logging.basicConfig(level=logging.INFO, 
+logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("GroqAPIManager")
 
 # Load environment variables
 load_dotenv()
 
+# Groq API base URL (the SDK default when unset); point it at a local fake server for load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", 30))
+# Completions in flight per key
+GROQ_KEY_CONCURRENCY = int(os.getenv("GROQ_KEY_CONCURRENCY", 8))
+# Seconds a completion may wait for a key with headroom before giving up
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", 60))
+# Seconds a key rests after a 429 that carries neither retry-after nor reset headers
+GROQ_RATE_LIMIT_COOLDOWN = float(os.getenv("GROQ_RATE_LIMIT_COOLDOWN", 2))
+# SQLite file of rate-limited keys shared by every worker process on the host, so a key that hit
+# a 429 in one worker is skipped by all of them; re-read at most every GROQ_COOLDOWN_SYNC seconds
+GROQ_COOLDOWN_PATH = os.getenv("GROQ_COOLDOWN_PATH")
+GROQ_COOLDOWN_SYNC = float(os.getenv("GROQ_COOLDOWN_SYNC", 1.0))
+# Longest a queued completion sleeps before looking again (completions finishing on another event loop do not wake it)
+QUEUE_POLL_INTERVAL = 0.25
+
+_RESET_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_RESET_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def load_api_keys() -> List[str]:
+    """GROQ_API_KEY followed by GROQ_API_KEY_1, GROQ_API_KEY_2, ... up to the first missing one"""
+    api_keys = []
+    main_key = os.getenv("GROQ_API_KEY")
+    if main_key:
+        api_keys.append(main_key)
+    i = 1
+    while os.getenv(f"GROQ_API_KEY_{i}"):
+        api_keys.append(os.getenv(f"GROQ_API_KEY_{i}"))
+        i += 1
+    return api_keys
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Groq reset header such as '2m59.56s', '7.66s' or '120ms'"""
+    if not value:
+        return None
+    parts = _RESET_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _RESET_UNITS[unit] for number, unit in parts)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int = 0) -> int:
+    """Rough token cost of a completion (~4 characters per prompt token) for scheduling"""
+    return sum(len(message.get("content") or "") for message in messages) // 4 + max_tokens
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    if isinstance(e, RateLimitError):
+        return True
+    error_message = str(e).lower()
+    return any(phrase in error_message for phrase in ["rate limit", "quota exceeded", "too many requests", "429"])
+
+
+def is_stream_failure(e: Exception) -> bool:
+    """A streamed completion broke off (dropped connection, error event, missing finish) rather than being refused"""
+    if isinstance(e, (httpx.TransportError, StreamInterrupted)):
+        return True
+    # The SDK raises a bare APIError for error events inside a stream; status errors are refusals
+    return isinstance(e, APIError) and not isinstance(e, APIStatusError)
+
+
+class KeyPoolTimeout(Exception):
+    """No key had headroom for a completion within the queue timeout"""
+
+
+class StreamInterrupted(Exception):
+    """A completion stream ended without a finish reason"""
+
+
+class KeyState:
+    """Rate-limit accounting of one API key, from the x-ratelimit-* headers of its responses"""
+
+    def __init__(self, index: int, key: str):
+        self.index = index
+        self.key = key
+        # Names the key in the shared cooldown table without storing it
+        self.fingerprint = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at: Optional[float] = None
+        self.tokens_reset_at: Optional[float] = None
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.reserved_tokens = 0
+        self.requests = 0
+        self.rate_limited = 0
+
+    def update(self, headers: httpx.Headers, now: float):
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.isdigit():
+            self.remaining_requests = int(remaining)
+            reset = parse_reset(headers.get("x-ratelimit-reset-requests"))
+            self.requests_reset_at = now + reset if reset is not None else None
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is not None and remaining.isdigit():
+            self.remaining_tokens = int(remaining)
+            reset = parse_reset(headers.get("x-ratelimit-reset-tokens"))
+            self.tokens_reset_at = now + reset if reset is not None else None
+
+    def headroom(self, now: float) -> Tuple[float, float]:
+        """(requests, tokens) this key can still take; unknown or past its reset counts as unlimited"""
+        requests = tokens = math.inf
+        if self.remaining_requests is not None and (self.requests_reset_at is None or now < self.requests_reset_at):
+            requests = self.remaining_requests - self.in_flight
+        if self.remaining_tokens is not None and (self.tokens_reset_at is None or now < self.tokens_reset_at):
+            tokens = self.remaining_tokens - self.reserved_tokens
+        return requests, tokens
+
+    def available(self, now: float, tokens: int, concurrency: int) -> bool:
+        if now < self.cooldown_until or self.in_flight >= concurrency:
+            return False
+        requests_left, tokens_left = self.headroom(now)
+        return requests_left >= 1 and tokens_left >= tokens
+
+    def ready_at(self, now: float, tokens: int) -> float:
+        """Earliest time the key may have headroom again without a completion finishing first"""
+        ready = max(now, self.cooldown_until)
+        requests_left, tokens_left = self.headroom(now)
+        if requests_left < 1:
+            ready = max(ready, self.requests_reset_at if self.requests_reset_at is not None else math.inf)
+        if tokens_left < tokens:
+            ready = max(ready, self.tokens_reset_at if self.tokens_reset_at is not None else math.inf)
+        return ready
+
+
 class GroqKeyManager:
-    def __init__(self):
-        """Initialize with multiple API keys from environment variables"""
-        # Get the main API key
-        self.api_keys = []
-        
-        # Add the main API key
-        main_key = os.getenv("GROQ_API_KEY")
-        if main_key:
-            self.api_keys.append(main_key)
-        
-        # Add additional numbered keys
-        i = 1
-        while True:
-            key_name = f"GROQ_API_KEY_{i}"
-            key = os.getenv(key_name)
-            if key:
-                self.api_keys.append(key)
-                i += 1
-            else:
-                break
-                
+    """
+    Async pool of Groq API keys
+
+    Every completion is scheduled onto the key with the most headroom left
+    (requests, then tokens, as reported by each key's x-ratelimit-* response
+    headers minus what is already in flight on it). When no key has room the
+    completion waits in a queue until one frees up or a reset time passes,
+    instead of sleeping. A 429 puts the key in cooldown for its retry-after
+    and the completion is retried on another key.
+
+    One pool is shared by the whole process (get_key_manager()); its key
+    state is guarded by a lock, so event loops in several threads can use it.
+    With a cooldown_path, cooldowns are also written to and read from a
+    SQLite table that every worker process of the host shares.
+    """
+
+    def __init__(self, api_keys: Optional[List[str]] = None, base_url: Optional[str] = GROQ_BASE_URL,
+                 concurrency: int = GROQ_KEY_CONCURRENCY, queue_timeout: float = GROQ_QUEUE_TIMEOUT,
+                 cooldown_path: Optional[str] = None, cooldown_sync: float = GROQ_COOLDOWN_SYNC,
+                 name: Optional[str] = None):
+        """Initialize with the given API keys, or the ones in the environment"""
+        self.api_keys = api_keys if api_keys is not None else load_api_keys()
         if not self.api_keys:
             raise ValueError("No Groq API keys found in environment variables")
-            
-        self.current_index = 0
-        self.clients = {key: Groq(api_key=key) for key in self.api_keys}
+
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.queue_timeout = queue_timeout
+        self.keys = [KeyState(i, key) for i, key in enumerate(self.api_keys)]
+        self.queued = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.stream_failovers = 0
+        self.cooldowns = SQLiteCache(cooldown_path, table="groq_cooldowns", ttl=GROQ_RATE_LIMIT_COOLDOWN) if cooldown_path else None
+        self.cooldown_sync = cooldown_sync
+        self._synced_at = -math.inf
+        self._keys_by_auth = {f"Bearer {state.key}": state for state in self.keys}
+        self._lock = threading.Lock()
+        # Per event loop: the condition queued completions wait on, and the HTTP client with one AsyncGroq per key
+        self._conditions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Condition]" = weakref.WeakKeyDictionary()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Dict[int, AsyncGroq]]]" = weakref.WeakKeyDictionary()
+        if name:
+            register_cache(name, self)
         logger.info(f"Initialized with {len(self.api_keys)} API keys")
-    
-    def get_current_key(self):
-        """Get the currently active API key"""
-        return self.api_keys[self.current_index]
-    
-    def get_current_client(self):
-        """Get the client for the currently active API key"""
-        return self.clients[self.get_current_key()]
-    
-    def rotate_key(self):
-        """Rotate to the next API key"""
-        old_index = self.current_index
-        self.current_index = (self.current_index + 1) % len(self.api_keys)
-        logger.info(f"Rotated from key index {old_index} to {self.current_index}")
-        return self.get_current_key()
-    
-    def execute_with_fallback(self, operation: Callable, messages: List[Dict[str, str]], max_retries=3):
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            condition = self._conditions.get(loop)
+            if condition is None:
+                condition = self._conditions[loop] = asyncio.Condition()
+            return condition
+
+    async def _record_headers(self, response: httpx.Response):
+        state = self._keys_by_auth.get(response.request.headers.get("authorization"))
+        if state is not None:
+            with self._lock:
+                state.update(response.headers, time.monotonic())
+
+    def get_client(self, state: KeyState) -> AsyncGroq:
+        """The key's client; the response hook keeps the key's rate-limit accounting current"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._clients:
+                # One connection pool for every key, bound to the running loop like the shared HTTP client
+                self._clients[loop] = (httpx.AsyncClient(timeout=GROQ_TIMEOUT, event_hooks={"response": [self._record_headers]}), {})
+            http_client, clients = self._clients[loop]
+            client = clients.get(state.index)
+            if client is None:
+                # The pool does the retrying, so the SDK's own retries (which back off on 429) are off
+                client = clients[state.index] = AsyncGroq(api_key=state.key, base_url=self.base_url, max_retries=0,
+                                                          timeout=GROQ_TIMEOUT, http_client=http_client)
+            return client
+
+    def _sync_cooldowns(self, now: float):
+        """Pick up the cooldowns other workers wrote to the shared table (at most every cooldown_sync seconds)"""
+        if self.cooldowns is None or now - self._synced_at < self.cooldown_sync:
+            return
+        self._synced_at = now
+        wall_now = time.time()
+        for state in self.keys:
+            try:
+                until = self.cooldowns.get(state.fingerprint)
+            except Exception as e:
+                logger.warning(f"Could not read Groq cooldown table: {str(e)}")
+                return
+            if until is not None and until > wall_now:
+                state.cooldown_until = max(state.cooldown_until, now + until - wall_now)
+
+    async def _acquire(self, tokens: int, exclude: Tuple[int, ...] = ()) -> KeyState:
+        """Reserve the key with the most headroom, skipping the indices in exclude unless that leaves none"""
+        condition = self._get_condition()
+        if len(set(exclude)) >= len(self.keys):
+            exclude = ()
+        deadline = time.monotonic() + self.queue_timeout
+        waited = False
+        async with condition:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    self._sync_cooldowns(now)
+                    candidates = [state for state in self.keys
+                                  if state.index not in exclude and state.available(now, tokens, self.concurrency)]
+                    if candidates:
+                        state = max(candidates, key=lambda s: (*s.headroom(now), -s.in_flight))
+                        state.in_flight += 1
+                        state.reserved_tokens += tokens
+                        state.requests += 1
+                        return state
+                    if now >= deadline:
+                        self.timeouts += 1
+                        raise KeyPoolTimeout(f"No Groq API key had headroom within {self.queue_timeout:g}s")
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    # Woken by a completion finishing, or when the first key's cooldown or reset passes
+                    wake_at = min([state.ready_at(now, tokens) for state in self.keys] + [deadline, now + QUEUE_POLL_INTERVAL])
+                    self.queued += 1
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=max(0.001, wake_at - now))
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._lock:
+                        self.queued -= 1
+
+    async def _release(self, state: KeyState, tokens: int):
+        condition = self._get_condition()
+        async with condition:
+            with self._lock:
+                state.in_flight -= 1
+                state.reserved_tokens -= tokens
+            condition.notify_all()
+
+    def _cool_down(self, state: KeyState, e: Exception):
+        now = time.monotonic()
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        wait = parse_reset(headers.get("retry-after"))
+        with self._lock:
+            if wait is None:
+                resets = [reset for reset in (state.requests_reset_at, state.tokens_reset_at) if reset is not None and reset > now]
+                wait = min(resets) - now if resets else GROQ_RATE_LIMIT_COOLDOWN
+            state.cooldown_until = max(state.cooldown_until, now + wait)
+            state.rate_limited += 1
+        logger.warning(f"Rate limit hit with key index {state.index}, cooling down for {wait:.2f}s")
+        if self.cooldowns is not None:
+            try:
+                until = time.time() + wait
+                # Keep a longer cooldown another worker already recorded
+                if until > (self.cooldowns.get(state.fingerprint) or 0):
+                    self.cooldowns.set(state.fingerprint, until, ttl=wait)
+            except Exception as e:
+                logger.warning(f"Could not write Groq cooldown table: {str(e)}")
+
+    async def execute_with_fallback(self, operation: Callable[[AsyncGroq, List[Dict[str, str]]], Awaitable[Any]],
+                                    messages: List[Dict[str, str]], max_retries: int = 3, tokens: int = 0):
         """
-        Execute an operation with automatic key rotation on rate limit errors
-        
+        Run an operation on the key with the most headroom, retrying rate-limited attempts on other keys
+
         Args:
-            operation: A callable that takes a client and messages and returns a response
+            operation: A callable that takes a client and messages and returns an awaitable response
             messages: The messages to pass to the operation
-            max_retries: Maximum number of retries across all keys
-            
+            max_retries: Maximum number of rate-limited attempts per key
+            tokens: Estimated token cost, reserved on the chosen key while the operation runs
+
         Returns:
             The response from the operation
         """
         attempts = 0
-        retry_delay = 1  # Start with 1 second retry delay
-        
-        while attempts < max_retries * len(self.api_keys):
-            current_client = self.get_current_client()
-            
+        while True:
+            state = await self._acquire(tokens)
             try:
-                logger.info(f"Attempting request with key index {self.current_index}")
-                return operation(current_client, messages)
-                
+                return await operation(self.get_client(state), messages)
             except Exception as e:
+                if not is_rate_limit_error(e):
+                    # For non-rate-limit errors, just log and re-raise
+                    logger.error(f"Non-rate-limit error occurred: {e}")
+                    raise
                 attempts += 1
-                error_message = str(e).lower()
-                
-                # Check for rate limit related errors
-                if any(phrase in error_message for phrase in ["rate limit", "quota exceeded", "too many requests", "429"]):
-                    logger.warning(f"Rate limit hit with key index {self.current_index}: {e}")
-                    
-                    # If we've tried all keys, implement exponential backoff
-                    if attempts % len(self.api_keys) == 0:
-                        wait_time = min(retry_delay * 2, 60)  # Cap at 60 seconds
-                        logger.info(f"All keys have been tried. Waiting {wait_time}s before retrying...")
-                        time.sleep(wait_time)
-                        retry_delay *= 2
-                    
-                    # Rotate to next key
-                    self.rotate_key()
+                self._cool_down(state, e)
+                if attempts >= max_retries * len(self.keys):
+                    raise Exception(f"Failed after {attempts} attempts across {len(self.keys)} API keys")
+            finally:
+                await self._release(state, tokens)
+
+    async def chat_completion(self, messages: List[Dict[str, str]], **params):
+        """Create a chat completion through the pool; params are those of chat.completions.create"""
+        return await self.execute_with_fallback(
+            lambda client, msgs: client.chat.completions.create(messages=msgs, **params),
+            messages,
+            tokens=estimate_tokens(messages, params.get("max_tokens") or 0),
+        )
+
+    async def stream_completion(self, messages: List[Dict[str, str]], max_retries: int = 3, **params) -> AsyncIterator[str]:
+        """
+        Stream a chat completion's text through the pool, as Groq produces it
+
+        Failing over works like execute_with_fallback, but also mid-stream: when a
+        stream breaks off, the completion continues on the other key with the most
+        headroom, with the text sent so far as an assistant prefill, so the caller
+        sees one uninterrupted answer. Each resumption lowers max_tokens by the
+        chunks already received.
+        """
+        max_tokens = params.pop("max_tokens", None)
+        text = ""
+        chunks = 0
+        attempts = 0
+        # Keys whose stream broke off are only used again when no other key is left
+        broken: Tuple[int, ...] = ()
+        while True:
+            attempt_messages = messages + [{"role": "assistant", "content": text}] if text else messages
+            attempt_max_tokens = max(1, max_tokens - chunks) if max_tokens else None
+            tokens = estimate_tokens(attempt_messages, attempt_max_tokens or 0)
+            state = await self._acquire(tokens, exclude=broken)
+            try:
+                if attempt_max_tokens:
+                    params["max_tokens"] = attempt_max_tokens
+                stream = await self.get_client(state).chat.completions.create(messages=attempt_messages, stream=True, **params)
+                finished = False
+                # Closes the response even when the caller stops reading early
+                async with stream:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        choice = chunk.choices[0]
+                        if choice.delta.content:
+                            text += choice.delta.content
+                            chunks += 1
+                            yield choice.delta.content
+                        finished = finished or choice.finish_reason is not None
+                if not finished:
+                    raise StreamInterrupted(f"Stream on key index {state.index} ended without a finish reason")
+                return
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self._cool_down(state, e)
+                elif is_stream_failure(e):
+                    logger.warning(f"Stream on key index {state.index} broke off after {chunks} chunks: {e!r}")
+                    broken += (state.index,)
+                    with self._lock:
+                        self.stream_failovers += 1
                 else:
-                    # For non-rate-limit errors, just log and re-raise
                     logger.error(f"Non-rate-limit error occurred: {e}")
                     raise
-        
-        # If we've exhausted all retries
-        raise Exception(f"Failed after {attempts} attempts across {len(self.api_keys)} API keys")
+                attempts += 1
+                if attempts >= max_retries * len(self.keys):
+                    raise Exception(f"Failed after {attempts} attempts across {len(self.keys)} API keys")
+            finally:
+                await self._release(state, tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        keys = []
+        with self._lock:
+            for state in self.keys:
+                requests_left, tokens_left = state.headroom(now)
+                keys.append({
+                    "index": state.index,
+                    "in_flight": state.in_flight,
+                    "remaining_requests": requests_left if math.isfinite(requests_left) else None,
+                    "remaining_tokens": tokens_left if math.isfinite(tokens_left) else None,
+                    "cooling_down": now < state.cooldown_until,
+                    "requests": state.requests,
+                    "rate_limited": state.rate_limited,
+                })
+            return {
+                "keys": keys,
+                "queued": self.queued,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "stream_failovers": self.stream_failovers,
+                "shared_cooldowns": self.cooldowns is not None,
+            }
+
+
+_key_manager: Optional[GroqKeyManager] = None
+_key_manager_lock = threading.Lock()
+
+
+def get_key_manager() -> GroqKeyManager:
+    """The process-wide key pool every service schedules its completions on, created on first use"""
+    global _key_manager
+    with _key_manager_lock:
+        if _key_manager is None:
+            _key_manager = GroqKeyManager(cooldown_path=GROQ_COOLDOWN_PATH, name="groq_keys")
+    return _key_manager
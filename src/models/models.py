@@ -15,6 +15,9 @@ class SearchRequest(BaseModel):
     location: str
     radius: int = 5  # Default to 5km
 
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest]  # One per destination of an itinerary
+
 class TouristSpot(BaseModel):
     id: str
     name: str
@@ -22,13 +25,32 @@ class TouristSpot(BaseModel):
     lat: float
     lon: float
     description: Optional[str] = None
-    tags: Dict[str, str]
+    tags: Dict[str, str] = {}
+    distance_km: Optional[float] = None
+
+class SearchSpot(BaseModel):
+    """A spot of a search page, holding only the fields asked for with `fields` (all but tags by default)"""
+    id: Optional[str] = None
+    name: Optional[str] = None
+    category: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    description: Optional[str] = None
+    tags: Optional[Dict[str, str]] = None
+    distance_km: Optional[float] = None
 
 class WeatherData(BaseModel):
     temperature: float
     description: str
     forecast: Dict[str, Dict[str, Union[bool, float, int]]]
 
+class Coordinates(BaseModel):
+    lat: float
+    lon: float
+
+class WeatherBatchRequest(BaseModel):
+    points: List[Coordinates]
+
 class PlaceDescriptionRequest(BaseModel):
     spot_id: str
     spot_name: str
@@ -36,6 +58,8 @@ class PlaceDescriptionRequest(BaseModel):
     location: str
     country: str
     weather_data: Optional[WeatherData] = None
+    # Skip the description cache and generate a new description
+    fresh: bool = False
 
 
 class AskQuestionRequest(BaseModel):
@@ -46,6 +70,8 @@ class AskQuestionRequest(BaseModel):
     country: str
     question: str
     weather_data: Optional[WeatherData] = None
+    # Skip the answer cache and ask the LLM again
+    fresh: bool = False
 
 
 class MapRequest(BaseModel):
@@ -3,8 +3,13 @@ from fastapi import FastAPI, HTTPException, Query, Depends
 from models.models import PlaceDescriptionRequest
 from fastapi.responses import HTMLResponse
 import folium
+import hashlib
+import json
 import logging
-from api_manager.api_manager import GroqKeyManager
+import math
+import os
+from api_manager.api_manager import get_key_manager
+from services.utils.cache import TTLCache, SQLiteCache, TieredCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -12,47 +17,129 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger("GroqAPIManager")
 
 
+from models.models import PlaceDescriptionRequest, WeatherData
+from typing import AsyncIterator, Optional
+from services.utils.sse import stream_latency
 
 
-key_manager = GroqKeyManager()
+DESCRIPTION_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+DESCRIPTION_PARAMS = {"model": DESCRIPTION_MODEL, "temperature": 0.3, "max_tokens": 200}
 
-from models.models import PlaceDescriptionRequest, WeatherData
-from typing import Optional
+# Descriptions only depend on the spot and a coarse weather bucket, so they can be reused for days
+DESCRIPTION_CACHE_SIZE = int(os.getenv("DESCRIPTION_CACHE_SIZE", 2048))
+DESCRIPTION_CACHE_TTL = float(os.getenv("DESCRIPTION_CACHE_TTL", 7 * 24 * 3600))
+# Optional SQLite file that keeps descriptions across restarts and workers, bounded to the most recently used entries
+DESCRIPTION_CACHE_PATH = os.getenv("DESCRIPTION_CACHE_PATH")
+DESCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("DESCRIPTION_CACHE_MAX_ENTRIES", 100000))
+# Width (°C) of the temperature bands descriptions are shared across
+DESCRIPTION_TEMPERATURE_BAND = int(os.getenv("DESCRIPTION_TEMPERATURE_BAND", 5))
 
+# Weather descriptions grouped into the few conditions a visitor tip depends on, checked in order
+WEATHER_CONDITIONS = [
+    ("thunderstorm", "stormy"), ("snow", "snowy"), ("freezing", "icy"), ("rain", "rainy"),
+    ("drizzle", "rainy"), ("fog", "foggy"), ("overcast", "cloudy"), ("cloudy", "cloudy"), ("clear", "clear"),
+]
 
-async def generate_description(request: PlaceDescriptionRequest):
-    try:
-        # Generate a description using the Groq API
-        prompt = f"""Create a concise, natural description (100 - 120 words) for this tourist spot:
-                - Name: '{request.spot_name}'
-                - Category: {request.spot_category.replace('_', ' ')}
-                - Location: {request.location}, {request.country}
+# Generated descriptions, keyed on a hash of the full prompt and model parameters
+description_cache = TieredCache(
+    TTLCache(max_size=DESCRIPTION_CACHE_SIZE, ttl=DESCRIPTION_CACHE_TTL),
+    SQLiteCache(DESCRIPTION_CACHE_PATH, table="descriptions", ttl=DESCRIPTION_CACHE_TTL,
+                max_entries=DESCRIPTION_CACHE_MAX_ENTRIES) if DESCRIPTION_CACHE_PATH else None,
+    name="descriptions",
+)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different spellings of a field share a prompt"""
+    return " ".join(text.split())
+
+
+def weather_bucket(weather_data: Optional[WeatherData]) -> str:
+    """Coarse weather for the prompt: a condition group and a temperature band, e.g. 'rainy, 10 to 15°C'"""
+    if weather_data is None:
+        return "unknown"
+    description = normalize_text(weather_data.description).lower()
+    condition = next((group for keyword, group in WEATHER_CONDITIONS if keyword in description), description or "unknown")
+    low = math.floor(weather_data.temperature / DESCRIPTION_TEMPERATURE_BAND) * DESCRIPTION_TEMPERATURE_BAND
+    return f"{condition}, {low} to {low + DESCRIPTION_TEMPERATURE_BAND}°C"
+
+
+def description_messages(request: PlaceDescriptionRequest):
+    """Chat messages asking for a description of a spot"""
+    prompt = f"""Create a concise, natural description (100 - 120 words) for this tourist spot:
+                - Name: '{normalize_text(request.spot_name)}'
+                - Category: {normalize_text(request.spot_category.replace('_', ' '))}
+                - Location: {normalize_text(request.location)}, {normalize_text(request.country)}
 
                 Focus only on:
                 1. What makes this place special or unique (be specific to the actual location if possible)
                 2. One activity visitors typically enjoy here (tailored to the type of location)
-                3. A practical tip based on the current weather: {request.weather_data.description if request.weather_data else 'unknown'}, {request.weather_data.temperature if request.weather_data else ''}°C
+                3. A practical tip based on the current weather: {weather_bucket(request.weather_data)}
 
                 Write as an experienced tour guide in simple, direct language. Avoid generic phrases like "worth visiting" or "popular destination."
                 """
-        
-        messages = [
-            {"role": "system", "content": "You are a knowledgeable local tour guide providing authentic information about tourist destinations. Your descriptions sound natural and engaging, like a real person talking."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        completion = key_manager.execute_with_fallback(
-            lambda client, msgs: client.chat.completions.create(
-                model="meta-llama/llama-4-maverick-17b-128e-instruct",
-                messages=msgs,
-                temperature=0.3,
-                max_tokens=200,
-            ),
-            messages
-        )
-        
-        return completion.choices[0].message.content
+
+    return [
+        {"role": "system", "content": "You are a knowledgeable local tour guide providing authentic information about tourist destinations. Your descriptions sound natural and engaging, like a real person talking."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def description_cache_key(messages, **params) -> str:
+    """Content address of a completion: the hash of its messages and model parameters"""
+    payload = json.dumps({"messages": messages, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def generate_description(request: PlaceDescriptionRequest):
+    try:
+        messages = description_messages(request)
+        params = DESCRIPTION_PARAMS
+        key = description_cache_key(messages, **params)
+        # fresh skips the lookup but still replaces the cached description
+        if not request.fresh:
+            description = description_cache.get(key)
+            if description is not None:
+                return description
+
+        # Generate a description using the Groq API
+        completion = await get_key_manager().chat_completion(messages, **params)
+
+        description = completion.choices[0].message.content
+        if description:
+            description_cache.set(key, description)
+        return description
 
     except Exception as e:
         logger.error(f"Error in generate_description: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+async def stream_description(request: PlaceDescriptionRequest) -> AsyncIterator[str]:
+    """
+    Server-Sent Events of generate_description: a 'token' event per chunk of text as
+    Groq produces it, then 'done'. A cached description arrives as a single token.
+    Failures after the response has started end the stream with an 'error' event.
+    """
+    timer = stream_latency.start("generate_description")
+    try:
+        messages = description_messages(request)
+        key = description_cache_key(messages, **DESCRIPTION_PARAMS)
+        description = None if request.fresh else description_cache.get(key)
+        if description is not None:
+            yield timer.token(description)
+            yield timer.done(generated=False)
+            return
+
+        parts = []
+        async for text in get_key_manager().stream_completion(messages, **DESCRIPTION_PARAMS):
+            parts.append(text)
+            yield timer.token(text)
+        description = "".join(parts)
+        if description:
+            description_cache.set(key, description)
+        yield timer.done(generated=True)
+
+    except Exception as e:
+        logger.error(f"Error in stream_description: {str(e)}", exc_info=True)
+        yield timer.error(500, f"Internal Server Error: {str(e)}")
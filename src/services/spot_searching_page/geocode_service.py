@@ -0,0 +1,90 @@
+from fastapi import HTTPException
+from services.utils.cache import TTLCache, SQLiteCache, TieredCache
+from services.utils.http_client import http_get
+from typing import Dict, Optional
+import logging
+import os
+import re
+import unicodedata
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+
+# Geocodes of place names practically never change, so entries can live for days
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 4096))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", 7 * 24 * 3600))
+# Optional SQLite file that keeps geocodes across restarts
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH")
+GEOCODE_CACHE_DISK_TTL = float(os.getenv("GEOCODE_CACHE_DISK_TTL", 30 * 24 * 3600))
+
+# Countries of nearby coordinates, keyed on a ~1 km grid cell
+reverse_geocode_cache = TTLCache(max_size=GEOCODE_CACHE_SIZE, ttl=GEOCODE_CACHE_TTL, name="reverse_geocode")
+
+geocode_cache = TieredCache(
+    TTLCache(max_size=GEOCODE_CACHE_SIZE, ttl=GEOCODE_CACHE_TTL),
+    SQLiteCache(GEOCODE_CACHE_PATH, table="geocode", ttl=GEOCODE_CACHE_DISK_TTL) if GEOCODE_CACHE_PATH else None,
+    name="geocode",
+)
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a free-text location so 'Paris, France' and ' paris   FRANCE' share a cache key"""
+    text = unicodedata.normalize("NFKC", location).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
+async def geocode_location(location: str) -> Optional[Dict]:
+    """
+    Resolve a free-text location to coordinates through the geocode cache, falling back to Nominatim
+
+    Returns:
+        A dict with 'lat', 'lon' and 'country', or None when Nominatim knows no such place
+    """
+    key = normalize_location(location)
+    cached = geocode_cache.get(key)
+    if cached is not None:
+        return cached
+
+    response = await http_get(f"{NOMINATIM_URL}/search", params={"q": location, "format": "json"}, timeout=10)
+
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch coordinates: {response.status_code} - {response.text}")
+        raise HTTPException(status_code=500, detail="Failed to fetch coordinates from Nominatim.")
+
+    data = response.json()
+    if not data:
+        return None
+
+    result = {
+        'lat': float(data[0]['lat']),
+        'lon': float(data[0]['lon']),
+        'country': data[0].get('display_name', '').split(',')[-1].strip(),
+    }
+    geocode_cache.set(key, result)
+    return result
+
+
+async def reverse_geocode_country(lat: float, lon: float) -> str:
+    """Country name at a point via Nominatim reverse geocoding; '' when it cannot be determined"""
+    key = (round(lat, 2), round(lon, 2))
+    cached = reverse_geocode_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await http_get(f"{NOMINATIM_URL}/reverse", params={"lat": lat, "lon": lon, "format": "json"}, timeout=10)
+
+        if response.status_code != 200:
+            logger.warning(f"Failed to get reverse geocoding information: {response.status_code}")
+            return ''
+        country = response.json().get('address', {}).get('country', '')
+    except Exception as e:
+        logger.warning(f"Error in reverse geocoding: {str(e)}")
+        return ''
+
+    reverse_geocode_cache.set(key, country)
+    return country
@@ -0,0 +1,277 @@
+from services.spot_searching_page.poi_catalog import matching_tiers
+from services.utils.cache import register_cache
+from services.utils.geo import circle_bounds, haversine_km
+from typing import Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+# Reading .osm.pbf extracts needs the optional 'osmium' package (pyosmium); GeoJSON needs nothing
+try:
+    import osmium
+    OSMIUM_AVAILABLE = True
+except ImportError:
+    OSMIUM_AVAILABLE = False
+
+# Extracts of the regions we operate in, separated by os.pathsep or commas
+POI_EXTRACT_PATHS = [path for path in re.split(rf"[,{re.escape(os.pathsep)}]", os.getenv("POI_EXTRACT_PATHS", "")) if path.strip()]
+# Grid cell size in degrees (~5.5 km of latitude)
+OFFLINE_INDEX_CELL_DEG = float(os.getenv("OFFLINE_INDEX_CELL_DEG", 0.05))
+
+# osmtogeojson ("node/123") and osmium export ("n123") feature ids
+_OSM_ID = re.compile(r"^(?:(node|way|relation)/|([nwr]))(\d+)$")
+_TYPE_LETTERS = {"n": "node", "w": "way", "r": "relation"}
+
+Bounds = Tuple[float, float, float, float]
+
+
+def _mean_position(coordinates) -> Optional[Tuple[float, float]]:
+    """(lat, lon) average of every [lon, lat] position in a GeoJSON coordinates array"""
+    total_lat = total_lon = 0.0
+    count = 0
+    stack = [coordinates]
+    while stack:
+        item = stack.pop()
+        if item and isinstance(item[0], (int, float)):
+            total_lon += item[0]
+            total_lat += item[1]
+            count += 1
+        else:
+            stack.extend(item)
+    if not count:
+        return None
+    return total_lat / count, total_lon / count
+
+
+def _synthetic_id(element_type: str, lat: float, lon: float, tags: Dict[str, str]) -> int:
+    """
+    Id of a feature without an OSM id, derived from its content so it is the same in every
+    extract; negative, like ids of objects not yet uploaded to OSM, so it never collides with one
+    """
+    content = json.dumps([element_type, round(lat, 7), round(lon, 7), tags], sort_keys=True)
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest()
+    return -(int.from_bytes(digest, "little") >> 1) - 1
+
+
+def _bounds_of(points: List[Tuple[float, float]]) -> Optional[Bounds]:
+    if not points:
+        return None
+    lats = [lat for lat, _ in points]
+    lons = [lon for _, lon in points]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+class OfflinePoiIndex:
+    """
+    Grid index of the POIs in local OSM extracts, answering the same tier queries as Overpass
+
+    Elements are stored in the compact Overpass form (type, id, tags and lat/lon or
+    center) under every query tier whose catalog categories match their tags, and
+    bucketed by grid cell. Each loaded extract also records the region it covers,
+    so callers can fall back to Overpass for searches reaching outside of it.
+    """
+
+    def __init__(self, cell_deg: float = OFFLINE_INDEX_CELL_DEG, name: Optional[str] = None):
+        self.cell_deg = cell_deg
+        self.regions: List[Bounds] = []
+        self._cells: Dict[str, Dict[Tuple[int, int], List[Dict]]] = {}
+        self.elements = 0
+        self.hits = 0
+        self.fallbacks = 0
+        if name:
+            register_cache(name, self)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, element_type: str, element_id: int, tags: Dict[str, str], lat: float, lon: float) -> bool:
+        """Index one OSM element; False when it is unnamed or no query tier would return it"""
+        if 'name' not in tags:
+            return False
+        tiers = matching_tiers(element_type, tags)
+        if not tiers:
+            return False
+
+        element = {"type": element_type, "id": element_id, "tags": tags}
+        if element_type == "node":
+            element["lat"] = lat
+            element["lon"] = lon
+        else:
+            element["center"] = {"lat": lat, "lon": lon}
+        cell = self._cell(lat, lon)
+        for tier in tiers:
+            self._cells.setdefault(tier, {}).setdefault(cell, []).append(element)
+        self.elements += 1
+        return True
+
+    def add_region(self, bounds: Bounds):
+        """Declare a (south, west, north, east) box as fully covered by the loaded extracts"""
+        self.regions.append(bounds)
+
+    def covers(self, lat: float, lon: float, radius_km: float) -> bool:
+        """Whether a search circle lies entirely inside one loaded extract"""
+        south, west, north, east = circle_bounds(lat, lon, radius_km)
+        return any(
+            region[0] <= south and region[1] <= west and north <= region[2] and east <= region[3]
+            for region in self.regions
+        )
+
+    def query(self, tier: str, lat: float, lon: float, radius_km: float) -> Iterator[Dict]:
+        """Elements of a query tier within radius_km of a point"""
+        cells = self._cells.get(tier)
+        if not cells:
+            return
+        south, west, north, east = circle_bounds(lat, lon, radius_km)
+        min_row, min_col = self._cell(south, west)
+        max_row, max_col = self._cell(north, east)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for element in cells.get((row, col), ()):
+                    coordinates = element.get("center") or element
+                    if haversine_km(lat, lon, coordinates["lat"], coordinates["lon"]) <= radius_km:
+                        yield element
+
+    def load_geojson(self, path: str) -> int:
+        """
+        Index the features of a GeoJSON extract (osmtogeojson or `osmium export` output)
+
+        Non-point geometries are indexed at the average of their positions. Features
+        without an OSM id get a negative id derived from their type, position and tags.
+        The covered region is the file's "bbox" when present, else the box of its features.
+
+        Returns:
+            The number of indexed elements
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        indexed = 0
+        points = []
+        for feature in data.get("features", []):
+            geometry = feature.get("geometry") or {}
+            properties = feature.get("properties") or {}
+            if geometry.get("type") == "Point":
+                lon, lat = geometry["coordinates"][:2]
+            else:
+                center = _mean_position(geometry.get("coordinates") or [])
+                if center is None:
+                    continue
+                lat, lon = center
+            points.append((lat, lon))
+
+            tags = properties.get("tags")
+            if not isinstance(tags, dict):
+                tags = {key: value for key, value in properties.items() if not key.startswith("@") and isinstance(value, str)}
+
+            match = _OSM_ID.match(str(feature.get("id") or properties.get("@id") or ""))
+            if match:
+                element_type = match.group(1) or _TYPE_LETTERS[match.group(2)]
+                element_id = int(match.group(3))
+            else:
+                element_type = "node" if geometry.get("type") == "Point" else "way"
+                element_id = _synthetic_id(element_type, lat, lon, tags)
+            if self.add(element_type, element_id, tags, lat, lon):
+                indexed += 1
+
+        bbox = data.get("bbox")
+        bounds = (bbox[1], bbox[0], bbox[3], bbox[2]) if bbox and len(bbox) == 4 else _bounds_of(points)
+        if bounds:
+            self.add_region(bounds)
+        return indexed
+
+    def load_pbf(self, path: str) -> int:
+        """
+        Index the nodes and ways of an .osm.pbf extract (requires pyosmium)
+
+        Ways are indexed at the average of their node locations; relations are
+        skipped since placing them needs their member geometries.
+
+        Returns:
+            The number of indexed elements
+        """
+        if not OSMIUM_AVAILABLE:
+            raise RuntimeError("Reading .osm.pbf extracts requires the 'osmium' package (pip install osmium)")
+
+        index = self
+        counts = {"indexed": 0}
+        points = []
+
+        class Handler(osmium.SimpleHandler):
+            def node(self, node):
+                if 'name' in node.tags and node.location.valid():
+                    tags = {tag.k: tag.v for tag in node.tags}
+                    points.append((node.location.lat, node.location.lon))
+                    if index.add("node", node.id, tags, node.location.lat, node.location.lon):
+                        counts["indexed"] += 1
+
+            def way(self, way):
+                if 'name' not in way.tags:
+                    return
+                locations = [(n.location.lat, n.location.lon) for n in way.nodes if n.location.valid()]
+                if not locations:
+                    return
+                lat = sum(location[0] for location in locations) / len(locations)
+                lon = sum(location[1] for location in locations) / len(locations)
+                tags = {tag.k: tag.v for tag in way.tags}
+                if index.add("way", way.id, tags, lat, lon):
+                    counts["indexed"] += 1
+
+        Handler().apply_file(path, locations=True)
+
+        box = osmium.io.Reader(path, osmium.osm.osm_entity_bits.NOTHING).header().box()
+        if box.valid():
+            self.add_region((box.bottom_left.lat, box.bottom_left.lon, box.top_right.lat, box.top_right.lon))
+        else:
+            bounds = _bounds_of(points)
+            if bounds:
+                self.add_region(bounds)
+        return counts["indexed"]
+
+    def load(self, path: str) -> int:
+        """Index an extract, picking the reader from its extension"""
+        start = time.perf_counter()
+        if path.endswith(".pbf"):
+            indexed = self.load_pbf(path)
+        else:
+            indexed = self.load_geojson(path)
+        logger.info(f"Indexed {indexed} POIs from {path} in {time.perf_counter() - start:.1f}s")
+        return indexed
+
+    def stats(self) -> Dict:
+        return {
+            "elements": self.elements,
+            "regions": len(self.regions),
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+_offline_index: Optional[OfflinePoiIndex] = None
+_offline_index_lock = threading.Lock()
+
+
+def get_offline_index() -> Optional[OfflinePoiIndex]:
+    """The index of the POI_EXTRACT_PATHS extracts, loaded on first use; None when none are configured"""
+    global _offline_index
+    if not POI_EXTRACT_PATHS:
+        return None
+    with _offline_index_lock:
+        if _offline_index is None:
+            index = OfflinePoiIndex(name="poi_offline")
+            for path in POI_EXTRACT_PATHS:
+                try:
+                    index.load(path.strip())
+                except Exception as e:
+                    logger.error(f"Failed to load POI extract {path}: {str(e)}")
+            _offline_index = index
+    return _offline_index
@@ -0,0 +1,622 @@
+from fastapi import HTTPException
+from services.spot_searching_page.offline_index import get_offline_index
+from services.spot_searching_page.poi_catalog import OVERPASS_QUERIES, POI_CATALOG, compile_selectors, matches_category
+from services.spot_searching_page.query_planner import SubQuery, Tile, TileRectangle, merge_subqueries, plan_subqueries
+from services.spot_searching_page.tile_cache import PoiTileCache
+from services.utils.cache import register_cache
+from services.utils.geo import haversine_km, lat_lon_to_tile, quadkey, tile_bounds, tile_distance_km, tiles_covering_circle
+from services.utils.http_client import stream
+from services.utils.json_stream import JsonArrayStream
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+import asyncio
+import logging
+import math
+import os
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+OVERPASS_URL = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+
+# "offline" answers searches inside the POI_EXTRACT_PATHS extracts locally; anything else uses Overpass
+POI_BACKEND = os.getenv("POI_BACKEND", "overpass").lower()
+
+# Zoom 13 tiles are ~4.9 km wide at the equator (~3.4 km at 45°)
+POI_TILE_ZOOM = int(os.getenv("POI_TILE_ZOOM", 13))
+POI_TILE_TTL = float(os.getenv("POI_TILE_TTL", 24 * 3600))
+POI_TILE_CACHE_MB = float(os.getenv("POI_TILE_CACHE_MB", 256))
+
+# Ring sub-queries started ahead of the one being read (see query_planner)
+OVERPASS_RING_PREFETCH = int(os.getenv("OVERPASS_RING_PREFETCH", 1))
+
+# The secondary query only matters when the primary one finds fewer spots than this
+MIN_PRIMARY_RESULTS = 10
+# Launch the secondary query alongside the primary one instead of after it
+SPECULATIVE_SECONDARY = os.getenv("OVERPASS_SPECULATIVE_SECONDARY", "true").lower() in ("1", "true", "yes")
+
+# Same-named elements closer than this are one feature mapped twice (e.g. as node and way)
+NEAR_DUPLICATE_KM = float(os.getenv("NEAR_DUPLICATE_KM", 0.25))
+# Length of a degree of latitude
+KM_PER_DEGREE = 111.32
+
+poi_tile_cache = PoiTileCache(ttl=POI_TILE_TTL, max_bytes=int(POI_TILE_CACHE_MB * 1024 * 1024), name="poi_tiles")
+
+
+def build_overpass_query(query_name: str, area_filters: List[str], timeout_seconds: int, category_cap: Optional[int] = None) -> str:
+    """
+    Build the Overpass QL for one catalog tier restricted by one or more area filters
+
+    With a category_cap, each catalog category gets its own `out ... qt N` statement,
+    returning at most N elements of that category in quadtile (unsorted, faster) order.
+    """
+    if category_cap is None:
+        statements = "\n".join(
+            f"    {selector}{area_filter};" for selector in OVERPASS_QUERIES[query_name] for area_filter in area_filters
+        )
+        return f"[out:json][timeout:{timeout_seconds}];\n(\n{statements}\n);\nout body center;"
+
+    blocks = []
+    for category in POI_CATALOG[query_name]:
+        statements = "\n".join(
+            f"    {selector}{area_filter};" for selector in compile_selectors([category]) for area_filter in area_filters
+        )
+        blocks.append(f"(\n{statements}\n);\nout body center qt {category_cap};")
+    return f"[out:json][timeout:{timeout_seconds}];\n" + "\n".join(blocks)
+
+
+def _bbox_filter(rectangle: TileRectangle, zoom: int) -> str:
+    """Overpass (south,west,north,east) filter of a tile rectangle"""
+    min_x, min_y, max_x, max_y = rectangle
+    south, west, _, _ = tile_bounds(min_x, max_y, zoom)
+    _, _, north, east = tile_bounds(max_x, min_y, zoom)
+    return f"({south},{west},{north},{east})"
+
+
+async def stream_overpass_elements(query: str, timeout_seconds: int) -> AsyncIterator[Dict]:
+    """
+    Post a query to Overpass and yield its named, located elements as they come off the socket
+
+    The response is parsed incrementally, so the full JSON document is never held in
+    memory. Unnamed elements are dropped on arrival, and so are the node/member id
+    lists of ways and relations, which we never use.
+    """
+    async with stream("POST", OVERPASS_URL, data={"data": query}, timeout=timeout_seconds) as response:
+        if response.status_code != 200:
+            await response.aread()
+            logger.error(f"Failed to fetch tourist spots: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=500, detail="Failed to fetch tourist spots from Overpass API.")
+
+        parser = JsonArrayStream("elements")
+        async for chunk in response.aiter_bytes():
+            for element in parser.feed(chunk):
+                element = _compact_element(element)
+                if element is not None:
+                    yield element
+        for element in parser.close():
+            element = _compact_element(element)
+            if element is not None:
+                yield element
+
+        # Overpass reports server-side timeouts and memory exhaustion in a 'remark' next to partial results
+        if 'remark' in parser.fields:
+            logger.warning(f"Overpass remark: {parser.fields['remark']}")
+
+
+def element_coordinates(element: Dict) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a node, or the center of a way/relation"""
+    if element.get('type') == 'node':
+        if 'lat' in element and 'lon' in element:
+            return element['lat'], element['lon']
+        return None
+    center = element.get('center')
+    if center and 'lat' in center and 'lon' in center:
+        return center['lat'], center['lon']
+    return None
+
+
+def _compact_element(element: Dict) -> Optional[Dict]:
+    """The parts of an element we use, or None when it is unnamed or has no position"""
+    tags = element.get('tags')
+    if not tags or 'name' not in tags or element_coordinates(element) is None:
+        return None
+    compact = {'type': element.get('type'), 'id': element.get('id'), 'tags': tags}
+    if 'center' in element:
+        compact['center'] = element['center']
+    else:
+        compact['lat'] = element['lat']
+        compact['lon'] = element['lon']
+    return compact
+
+
+class ElementIndex:
+    """
+    Elements already merged into a result set, for O(1) duplicate checks.
+
+    Exact duplicates are keyed on (osm type, id), since node 42 and way 42 are
+    different features. Near duplicates are same-named elements within
+    NEAR_DUPLICATE_KM of each other. Elements are filed under (name, grid cell)
+    with cells NEAR_DUPLICATE_KM tall, so only the neighbouring cells are compared
+    (3x3 up to 60° of latitude, a little wider in longitude beyond): the check stays
+    constant time per element even for names repeated thousands of times, such as
+    "Parking" or "Viewpoint".
+    """
+
+    def __init__(self, near_duplicate_km: float = NEAR_DUPLICATE_KM):
+        self.near_duplicate_km = near_duplicate_km
+        self._cell_deg = near_duplicate_km / KM_PER_DEGREE
+        self._keys = set()
+        # First position of each name, None once the name has repeated and lives in _by_cell
+        self._first: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._by_cell: Dict[Tuple[str, int, int], List[Tuple[float, float]]] = {}
+        self.duplicates = 0
+        self.near_duplicates = 0
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_deg), math.floor(lon / self._cell_deg)
+
+    def _is_near_duplicate(self, name: str, lat: float, lon: float) -> bool:
+        # Most names are unique, so a name's first element is only filed into a cell once the name repeats
+        if name not in self._first:
+            self._first[name] = (lat, lon)
+            return False
+        first = self._first[name]
+        if first is not None:
+            self._first[name] = None
+            self._by_cell[(name, *self._cell(*first))] = [first]
+
+        row, col = self._cell(lat, lon)
+        # A degree of longitude shrinks with latitude, so NEAR_DUPLICATE_KM spans more longitude cells
+        # (capped at 89° so the reach stays bounded next to the poles)
+        lon_reach = math.ceil(1 / math.cos(math.radians(min(89.0, abs(lat) + self._cell_deg))))
+        for r in (row - 1, row, row + 1):
+            for c in range(col - lon_reach, col + lon_reach + 1):
+                for seen_lat, seen_lon in self._by_cell.get((name, r, c), ()):
+                    if haversine_km(seen_lat, seen_lon, lat, lon) <= self.near_duplicate_km:
+                        return True
+        self._by_cell.setdefault((name, row, col), []).append((lat, lon))
+        return False
+
+    def add(self, element: Dict) -> bool:
+        """Record an element; returns False when it duplicates one already added"""
+        key = (element.get('type'), element.get('id'))
+        if key in self._keys:
+            self.duplicates += 1
+            return False
+
+        name = element.get('tags', {}).get('name', '').strip().casefold()
+        coordinates = element_coordinates(element)
+        if name and coordinates is not None and self.near_duplicate_km > 0:
+            if self._is_near_duplicate(name, *coordinates):
+                self.near_duplicates += 1
+                return False
+
+        self._keys.add(key)
+        return True
+
+
+class OverpassFlight:
+    """
+    One Overpass sub-query, running in its own task
+
+    Elements are kept as they arrive, so a search joining late replays the ones it
+    missed and then follows the live stream. Once complete, every tile the
+    sub-query covers is written to the tile cache, unless a category cap cut the
+    results short. Searches claim the flights they read from; one nobody claims
+    any more is cancelled.
+    """
+
+    def __init__(self, query_name: str, subquery: SubQuery, timeout_seconds: int, zoom: int):
+        self.query_name = query_name
+        self.tiles = subquery.tiles
+        self.category_cap = subquery.category_cap
+        self.query = build_overpass_query(
+            query_name, [_bbox_filter(rectangle, zoom) for rectangle in subquery.rectangles], timeout_seconds, subquery.category_cap
+        )
+        self.timeout_seconds = timeout_seconds
+        self.zoom = zoom
+        self.elements: List[Tuple[Tile, Dict]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.claims = 0
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def claim(self):
+        self.claims += 1
+
+    def release(self):
+        self.claims -= 1
+        # Nobody wants the rest (e.g. a cancelled speculative query or a filled page): stop the upstream request
+        if self.claims == 0 and not self.done:
+            overpass_flights.finish(self)
+            self.task.cancel()
+
+    async def run(self):
+        buckets = {tile: [] for tile in self.tiles}
+        # An element matching several capped categories is returned once per category
+        seen = set()
+        category_counts = [0] * len(POI_CATALOG[self.query_name])
+        try:
+            async for element in stream_overpass_elements(self.query, self.timeout_seconds):
+                key = (element['type'], element['id'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                # Counted before the tile filter: ways and relations crossing the bbox edge use up the
+                # cap too, although their center lies outside the sub-query's tiles
+                if self.category_cap is not None:
+                    for i, category in enumerate(POI_CATALOG[self.query_name]):
+                        if matches_category(category, element['type'], element['tags']):
+                            category_counts[i] += 1
+                tile = lat_lon_to_tile(*element_coordinates(element), self.zoom)
+                bucket = buckets.get(tile)
+                if bucket is None:
+                    continue
+                bucket.append(element)
+                self.elements.append((tile, element))
+                self._notify()
+
+            if self.category_cap is not None and max(category_counts) >= self.category_cap:
+                logger.info(f"Overpass '{self.query_name}' sub-query reached its category cap; not caching its tiles")
+            else:
+                # Every tile the sub-query covers is now complete, so cache them all
+                for tile, elements in buckets.items():
+                    poi_tile_cache.set((self.query_name, quadkey(tile[0], tile[1], self.zoom)), elements)
+        except BaseException as e:
+            self.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self.done = True
+            overpass_flights.finish(self)
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Tuple[Tile, Dict]]:
+        """Yield (tile, element) for everything the fetch returns, from the start"""
+        position = 0
+        while True:
+            while position < len(self.elements):
+                yield self.elements[position]
+                position += 1
+            if self.done:
+                break
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class OverpassFlights:
+    """
+    Overpass fetches in progress, indexed by (query name, tile)
+
+    Concurrent searches that need a tile already being fetched subscribe to that
+    fetch instead of sending their own request (single-flight), so a burst of
+    identical or overlapping searches costs one upstream request.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self._tiles: Dict[Tuple[str, Tile], OverpassFlight] = {}
+        self.started = 0
+        self.coalesced = 0
+        if name:
+            register_cache(name, self)
+
+    def find(self, query_name: str, tile: Tile) -> Optional[OverpassFlight]:
+        return self._tiles.get((query_name, tile))
+
+    def start(self, query_name: str, subquery: SubQuery, timeout_seconds: int, zoom: int) -> OverpassFlight:
+        flight = OverpassFlight(query_name, subquery, timeout_seconds, zoom)
+        for tile in flight.tiles:
+            self._tiles.setdefault((query_name, tile), flight)
+        flight.task = asyncio.create_task(flight.run())
+        self.started += 1
+        return flight
+
+    def finish(self, flight: OverpassFlight):
+        """Stop routing new searches to a flight"""
+        for tile in flight.tiles:
+            key = (flight.query_name, tile)
+            if self._tiles.get(key) is flight:
+                del self._tiles[key]
+
+    def stats(self) -> Dict:
+        requests = self.started + self.coalesced
+        return {
+            "in_flight": len(set(self._tiles.values())),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+        }
+
+
+overpass_flights = OverpassFlights(name="overpass_flights")
+
+
+# Asked before each ring after the first with the distance (km) of the nearest element the remaining
+# rings can hold; True ends the search there
+EnoughWithin = Callable[[float], bool]
+
+
+async def iter_pois(query_name: str, lat: float, lon: float, radius_km: float, timeout_seconds: int,
+                    enough: Optional[EnoughWithin] = None) -> AsyncIterator[Dict]:
+    """
+    Yield the named Overpass elements of a query within radius_km of a point, through the tile cache
+
+    The circle is decomposed into the tiles covering it. Elements of warm tiles are
+    yielded first, straight from the cache. Cold tiles already being fetched for a
+    concurrent search are shared with it. The rest are fetched as planned by
+    plan_subqueries: one bbox query for a small or sparse search, or rings of
+    category-capped sub-queries, nearest first, for a large dense one, started a
+    few rings ahead of the one being read so a consumer that stops early never
+    sends the outer ones. Elements are yielded as they stream in and bucketed per tile for
+    the cache. Everything yielded is filtered to the exact radius.
+
+    With `enough`, a consumer that only needs the nearest elements ends the search
+    before a ring none of whose remaining elements could be nearer than those it has.
+
+    With POI_BACKEND=offline, searches inside the loaded extracts are answered by
+    the local index instead, without touching the network.
+    """
+    if POI_BACKEND == "offline":
+        offline_index = get_offline_index()
+        if offline_index is not None:
+            if offline_index.covers(lat, lon, radius_km):
+                offline_index.hits += 1
+                for element in offline_index.query(query_name, lat, lon, radius_km):
+                    yield element
+                return
+            offline_index.fallbacks += 1
+
+    zoom = POI_TILE_ZOOM
+    covering = tiles_covering_circle(lat, lon, radius_km, zoom)
+
+    cold = []
+    warm = {}
+    for tile in covering:
+        elements = poi_tile_cache.get((query_name, quadkey(tile[0], tile[1], zoom)))
+        if elements is None:
+            cold.append(tile)
+            continue
+        warm[tile] = elements
+        for element in elements:
+            element_lat, element_lon = element_coordinates(element)
+            if haversine_km(lat, lon, element_lat, element_lon) <= radius_km:
+                yield element
+
+    if not cold:
+        return
+
+    # Cold tiles another search is already fetching are taken from its flight
+    joined: Dict[OverpassFlight, Set[Tile]] = {}
+    orphans = []
+    for tile in cold:
+        flight = overpass_flights.find(query_name, tile)
+        if flight is None:
+            orphans.append(tile)
+        else:
+            joined.setdefault(flight, set()).add(tile)
+    overpass_flights.coalesced += len(joined)
+
+    # The rest is fetched in sub-queries sized by the density of the tiles cached so far
+    warm_counts = [len(elements) for elements in warm.values()]
+    density = sum(warm_counts) / len(warm_counts) if warm_counts else poi_tile_cache.mean_elements(query_name)
+    plan = plan_subqueries(lat_lon_to_tile(lat, lon, zoom), orphans, density, columns=1 << zoom) if orphans else []
+    logger.info(f"Overpass '{query_name}': {len(covering) - len(cold)} warm / {len(cold)} cold tiles"
+                f" ({len(cold) - len(orphans)} already in flight, {len(plan)} sub-queries)")
+
+    claimed = []
+
+    def claim(flight: OverpassFlight) -> OverpassFlight:
+        flight.claim()
+        claimed.append(flight)
+        return flight
+
+    try:
+        for flight in joined:
+            claim(flight)
+        # Nearest ring first; the next OVERPASS_RING_PREFETCH rings are started while one is read
+        ring_flights = [
+            claim(overpass_flights.start(query_name, subquery, timeout_seconds, zoom))
+            for subquery in plan[:1 + OVERPASS_RING_PREFETCH]
+        ]
+
+        for flight, tiles in joined.items():
+            async with aclosing(_read_flight(flight, tiles, lat, lon, radius_km)) as elements:
+                async for element in elements:
+                    yield element
+
+        own = set(orphans)
+        # Distance from the point to the nearest tile of each ring or any ring after it
+        beyond = [0.0] * len(plan)
+        if enough is not None:
+            nearest = math.inf
+            for i in reversed(range(len(plan))):
+                tiles = plan[i].tiles & own
+                nearest = min([nearest] + [tile_distance_km(lat, lon, x, y, zoom) for x, y in tiles])
+                beyond[i] = nearest
+        for i, subquery in enumerate(plan):
+            if enough is not None and i > 0 and enough(beyond[i]):
+                logger.info(f"Overpass '{query_name}': stopped before ring {i + 1} of {len(plan)}")
+                return
+            if len(ring_flights) < len(plan) and len(ring_flights) <= i + OVERPASS_RING_PREFETCH:
+                ring_flights.append(claim(overpass_flights.start(query_name, plan[len(ring_flights)], timeout_seconds, zoom)))
+            async with aclosing(_read_flight(ring_flights[i], subquery.tiles & own, lat, lon, radius_km)) as elements:
+                async for element in elements:
+                    yield element
+    finally:
+        for flight in claimed:
+            flight.release()
+
+
+async def _read_flight(flight: OverpassFlight, tiles: Set[Tile], lat: float, lon: float, radius_km: float) -> AsyncIterator[Dict]:
+    """Elements of a flight that lie in the given tiles and within radius_km of a point"""
+    async with aclosing(flight.subscribe()) as elements:
+        async for tile, element in elements:
+            # Warm tiles inside a fetched rectangle were already yielded from the cache
+            if tile not in tiles:
+                continue
+            element_lat, element_lon = element_coordinates(element)
+            if haversine_km(lat, lon, element_lat, element_lon) <= radius_km:
+                yield element
+
+
+@asynccontextmanager
+async def batch_flights(query_name: str, circles: List[Tuple[float, float, float]], timeout_seconds: int) -> AsyncIterator[List[OverpassFlight]]:
+    """
+    Fetch the cold tiles of several (lat, lon, radius_km) searches in shared Overpass requests
+
+    Every search small enough for a single bbox query is packed with the others
+    by merge_subqueries, and the merged requests are started at once. Searches run
+    inside the block find their tiles in flight and join those requests instead of
+    sending their own; large searches keep their own ring plans. The flights are
+    held until the block exits, so none is cancelled before its searches join it.
+    """
+    zoom = POI_TILE_ZOOM
+    offline_index = get_offline_index() if POI_BACKEND == "offline" else None
+    density = poi_tile_cache.mean_elements(query_name)
+    taken: Set[Tile] = set()
+    subqueries = []
+    for lat, lon, radius_km in circles:
+        if offline_index is not None and offline_index.covers(lat, lon, radius_km):
+            continue
+        cold = [
+            tile for tile in tiles_covering_circle(lat, lon, radius_km, zoom)
+            if tile not in taken
+            and overpass_flights.find(query_name, tile) is None
+            and not poi_tile_cache.contains((query_name, quadkey(tile[0], tile[1], zoom)))
+        ]
+        if not cold:
+            continue
+        plan = plan_subqueries(lat_lon_to_tile(lat, lon, zoom), cold, density, columns=1 << zoom)
+        if len(plan) == 1:
+            subqueries.append(plan[0])
+            taken.update(plan[0].tiles)
+
+    flights = []
+    try:
+        for subquery in merge_subqueries(subqueries, density):
+            flight = overpass_flights.start(query_name, subquery, timeout_seconds, zoom)
+            flight.claim()
+            flights.append(flight)
+        if flights:
+            logger.info(f"Overpass '{query_name}': {len(subqueries)} searches of a batch merged into {len(flights)} requests")
+        yield flights
+    finally:
+        for flight in flights:
+            flight.release()
+
+
+async def fetch_pois(query_name: str, lat: float, lon: float, radius_km: float, timeout_seconds: int) -> List[Dict]:
+    """All elements iter_pois yields, as a list"""
+    return [element async for element in iter_pois(query_name, lat, lon, radius_km, timeout_seconds)]
+
+
+async def _fetch_secondary(lat: float, lon: float, radius_km: float, timeout_seconds: int) -> List[Dict]:
+    """Secondary query results; failures only cost us the extra spots"""
+    try:
+        return await fetch_pois("secondary", lat, lon, radius_km, timeout_seconds)
+    except Exception as e:
+        logger.warning(f"Error in secondary query: {str(e)}")
+        return []
+
+
+async def iter_primary_and_secondary(lat: float, lon: float, radius_km: float, timeout_seconds: int,
+                                     enough: Optional[EnoughWithin] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Yield ('primary', element) pairs as they arrive and, when the primary query finds few spots,
+    ('secondary', element) pairs after them
+
+    In speculative mode both queries start at once, so a sparse area costs one
+    round-trip instead of two; the secondary task is cancelled as soon as the
+    primary one has produced MIN_PRIMARY_RESULTS elements. `enough` is passed to
+    the primary query (see iter_pois) once it has that many.
+    """
+    secondary_task = None
+    if SPECULATIVE_SECONDARY:
+        secondary_task = asyncio.create_task(_fetch_secondary(lat, lon, radius_km, timeout_seconds))
+
+    primary_count = 0
+
+    def primary_enough(within_km: float) -> bool:
+        # Stopping with fewer would run the secondary query
+        return primary_count >= MIN_PRIMARY_RESULTS and enough(within_km)
+
+    try:
+        elements = iter_pois("primary", lat, lon, radius_km, timeout_seconds, primary_enough if enough else None)
+        async with aclosing(elements):
+            async for element in elements:
+                primary_count += 1
+                if primary_count == MIN_PRIMARY_RESULTS and secondary_task is not None:
+                    secondary_task.cancel()
+                    secondary_task = None
+                yield "primary", element
+    except BaseException:
+        # The primary query failed or the consumer stopped early: nobody will await the secondary
+        if secondary_task is not None:
+            secondary_task.cancel()
+        raise
+
+    if primary_count >= MIN_PRIMARY_RESULTS:
+        return
+
+    if secondary_task is None:
+        logger.info(f"Few results found ({primary_count}), running secondary query")
+        secondary = await _fetch_secondary(lat, lon, radius_km, timeout_seconds)
+    else:
+        logger.info(f"Few results found ({primary_count}), merging speculative secondary query")
+        secondary = await secondary_task
+    for element in secondary:
+        yield "secondary", element
+
+
+async def fetch_primary_and_secondary(lat: float, lon: float, radius_km: float, timeout_seconds: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Get the primary elements and, when the primary query finds few spots, the secondary ones
+
+    Returns:
+        (primary elements, secondary elements); the second list is empty when not needed
+    """
+    results = {"primary": [], "secondary": []}
+    async for tier, element in iter_primary_and_secondary(lat, lon, radius_km, timeout_seconds):
+        results[tier].append(element)
+    return results["primary"], results["secondary"]
+
+
+async def fetch_primary_and_secondary_batch(
+        searches: List[Tuple[float, float, float, int]]) -> List[Union[Tuple[List[Dict], List[Dict]], BaseException]]:
+    """
+    fetch_primary_and_secondary for many (lat, lon, radius_km, timeout_seconds) searches at once
+
+    The primary queries of all searches are merged into shared requests by
+    batch_flights, then the secondary ones of the searches that found fewer than
+    MIN_PRIMARY_RESULTS spots: two rounds of requests for the whole batch instead
+    of one or two per search. The result of each search is its (primary,
+    secondary) element lists, or the exception its primary query failed with.
+    """
+    circles = [(lat, lon, radius_km) for lat, lon, radius_km, _ in searches]
+    timeout_seconds = max((timeout for *_, timeout in searches), default=0)
+    async with batch_flights("primary", circles, timeout_seconds):
+        primaries = await asyncio.gather(
+            *(fetch_pois("primary", lat, lon, radius_km, timeout) for lat, lon, radius_km, timeout in searches),
+            return_exceptions=True
+        )
+
+    sparse = [i for i, primary in enumerate(primaries) if isinstance(primary, list) and len(primary) < MIN_PRIMARY_RESULTS]
+    secondaries = {}
+    if sparse:
+        logger.info(f"Few results found for {len(sparse)} of {len(searches)} batch searches, running secondary queries")
+        async with batch_flights("secondary", [circles[i] for i in sparse], timeout_seconds):
+            fetched = await asyncio.gather(*(_fetch_secondary(*searches[i]) for i in sparse))
+        secondaries = dict(zip(sparse, fetched))
+
+    return [
+        primary if isinstance(primary, BaseException) else (primary, secondaries.get(i, []))
+        for i, primary in enumerate(primaries)
+    ]
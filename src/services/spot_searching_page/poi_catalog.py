@@ -0,0 +1,99 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class PoiCategory(NamedTuple):
+    """One kind of OSM feature we search for, e.g. tourism=hotel"""
+    key: str
+    value: Optional[str] = None  # None matches any value of the key
+    element_types: Tuple[str, ...] = ("node", "way")
+    required_tags: Tuple[str, ...] = ()
+
+
+# The Overpass query tiers and the categories each one asks for. The secondary
+# tier is only needed when the primary one finds few spots.
+POI_CATALOG: Dict[str, List[PoiCategory]] = {
+    "primary": [
+        PoiCategory("tourism", "attraction", ("node", "way", "relation")),
+        PoiCategory("tourism", "resort"),
+        PoiCategory("tourism", "hotel"),
+        PoiCategory("tourism", "viewpoint"),
+        PoiCategory("natural", "beach"),
+        PoiCategory("natural", "waterfall"),
+        PoiCategory("natural", "forest", ("node", "way", "relation")),
+        PoiCategory("landuse", "forest", ("node", "way", "relation")),
+    ],
+    "secondary": [
+        PoiCategory("historic", None, ("node", "way", "relation")),
+        PoiCategory("leisure", "park"),
+        PoiCategory("leisure", "water_park"),
+        PoiCategory("tourism", "museum"),
+        PoiCategory("tourism", "gallery"),
+        PoiCategory("amenity", "restaurant", required_tags=("cuisine",)),
+        PoiCategory("leisure", "nature_reserve"),
+        PoiCategory("boundary", "protected_area"),
+    ],
+}
+
+
+def compile_selectors(categories: List[PoiCategory]) -> List[str]:
+    """Overpass QL selectors for a list of categories; an area filter is appended to each"""
+    selectors = []
+    for category in categories:
+        condition = f'["{category.key}"="{category.value}"]' if category.value else f'["{category.key}"]'
+        condition += "".join(f'["{tag}"]' for tag in category.required_tags)
+        for element_type in category.element_types:
+            selectors.append(f"{element_type}{condition}")
+    return selectors
+
+
+def matches_category(category: PoiCategory, element_type: str, tags: Dict[str, str]) -> bool:
+    """Whether an element would be selected by a category's Overpass selector"""
+    if element_type not in category.element_types or category.key not in tags:
+        return False
+    if category.value is not None and tags[category.key] != category.value:
+        return False
+    return all(tag in tags for tag in category.required_tags)
+
+
+def matching_tiers(element_type: str, tags: Dict[str, str]) -> List[str]:
+    """The query tiers whose Overpass query would return an element"""
+    return [
+        tier for tier, categories in POI_CATALOG.items()
+        if any(matches_category(category, element_type, tags) for category in categories)
+    ]
+
+
+# Compiled once at import; the query builder only adds the area filter
+OVERPASS_QUERIES: Dict[str, List[str]] = {tier: compile_selectors(categories) for tier, categories in POI_CATALOG.items()}
+
+
+def classify_primary(tags: Dict[str, str]) -> str:
+    """Category of a primary-tier element"""
+    if 'tourism' in tags:
+        return tags['tourism']
+    if 'natural' in tags:
+        return tags['natural']
+    if 'amenity' in tags:
+        return tags['amenity']
+    return "other"
+
+
+def classify_secondary(tags: Dict[str, str]) -> str:
+    """Category of a secondary-tier element, with the more specific historic_/leisure_/restaurant_ prefixes"""
+    if 'tourism' in tags:
+        return tags['tourism']
+    if 'historic' in tags:
+        return f"historic_{tags['historic']}"
+    if 'leisure' in tags:
+        return f"leisure_{tags['leisure']}"
+    if 'amenity' in tags:
+        if tags.get('amenity') == 'restaurant' and 'cuisine' in tags:
+            return f"restaurant_{tags.get('cuisine')}"
+        return tags['amenity']
+    return "other"
+
+
+CLASSIFIERS = {
+    "primary": classify_primary,
+    "secondary": classify_secondary,
+}
@@ -0,0 +1,352 @@
+from contextlib import aclosing
+from fastapi import HTTPException
+from models.models import TouristSpot, SearchRequest, SearchRequest1
+from services.spot_searching_page.geocode_service import geocode_location, reverse_geocode_country
+from services.spot_searching_page.overpass_service import ElementIndex, element_coordinates, fetch_primary_and_secondary_batch, iter_primary_and_secondary
+from services.spot_searching_page.poi_catalog import CLASSIFIERS
+from services.spot_searching_page.ranking import SORT_ORDERS, rank_spots, sort_by_distance
+from services.spot_searching_page.search_log import search_log
+from services.spot_searching_page.spots import Spot
+from services.utils.cache import TTLCache
+from services.utils.geo import haversine_km
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+import logging
+import os
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 50))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", 500))
+# Ranked result sets are kept this long so later pages do not search and rank again
+SEARCH_RESULTS_TTL = float(os.getenv("SEARCH_RESULTS_TTL", 300))
+# Most destinations one batch search may ask for
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", 20))
+# Fields of a spot returned when the request does not ask for others; tags are the bulk of a spot
+DEFAULT_FIELDS = ("id", "name", "category", "lat", "lon", "description", "distance_km")
+
+ranked_results = TTLCache(max_size=256, ttl=SEARCH_RESULTS_TTL, name="search_results")
+
+
+class SearchCenter(NamedTuple):
+    """Where a search is centered, as resolved by a front-end"""
+    lat: float
+    lon: float
+    country: str
+
+
+# A front-end turns an incoming request into a SearchCenter
+FrontEnd = Callable[..., Awaitable[SearchCenter]]
+
+
+async def center_from_location(request: SearchRequest) -> SearchCenter:
+    """Geocoding front-end: the center of a free-text location"""
+    geocoded = await geocode_location(request.location)
+    if not geocoded:
+        logger.error(f"No location found for '{request.location}'.")
+        raise HTTPException(status_code=404, detail=f"No location found for '{request.location}'.")
+    # Popular destinations are kept warm by the warm-up scheduler
+    search_log.record(request.location, request.radius)
+    return SearchCenter(geocoded['lat'], geocoded['lon'], geocoded['country'])
+
+
+async def center_from_coordinates(request: SearchRequest1) -> SearchCenter:
+    """Reverse-geocoding front-end: the given coordinates, plus their country when Nominatim knows it"""
+    country = await reverse_geocode_country(request.lat, request.lon)
+    return SearchCenter(request.lat, request.lon, country)
+
+
+def overpass_timeout(radius: int) -> int:
+    """Overpass server-side timeout (seconds) for a search radius in km"""
+    return min(60, 20 + (radius // 10) * 5)
+
+
+def parse_element(element: Dict, tier: str) -> Optional[Spot]:
+    """Turn a named Overpass element into a Spot, classified by the rules of its query tier"""
+    tags = element.get('tags')
+    if not tags or 'name' not in tags:
+        return None
+    coordinates = element_coordinates(element)
+    if coordinates is None:
+        return None
+
+    return Spot.from_tags(
+        str(element.get('id', '')),
+        tags['name'],
+        CLASSIFIERS[tier](tags),
+        coordinates[0],
+        coordinates[1],
+        tags,
+    )
+
+
+def _new_spot(seen: ElementIndex, element: Dict, tier: str) -> Optional[Spot]:
+    """The spot of an element, or None when it duplicates one already in `seen` or cannot be parsed"""
+    if not seen.add(element):
+        return None
+    return parse_element(element, tier)
+
+
+async def iter_pois(center: SearchCenter, radius: int, limit: Optional[int] = None) -> AsyncIterator[Spot]:
+    """
+    Tourist spots within radius km of a center as they are found, primary-tier results first
+
+    Stops after `limit` spots, which also stops the Overpass sub-queries not started yet.
+    """
+    # (osm type, id) and same-name-nearby index of the spots yielded so far
+    seen = ElementIndex()
+    count = 0
+    elements = iter_primary_and_secondary(center.lat, center.lon, radius, overpass_timeout(radius))
+    async with aclosing(elements):
+        async for tier, element in elements:
+            spot = _new_spot(seen, element, tier)
+            if spot is None:
+                continue
+            yield spot
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+async def search_pois(center: SearchCenter, radius: int, limit: Optional[int] = None) -> List[Spot]:
+    """Tourist spots within radius km of a center, primary-tier results first"""
+    return [spot async for spot in iter_pois(center, radius, limit)]
+
+
+async def search_nearest_pois(center: SearchCenter, radius: int, count: int) -> Tuple[List[Spot], bool]:
+    """
+    Tourist spots within radius km of a center, stopping once the `count` nearest are known
+
+    Overpass rings that cannot hold a spot nearer than the count-th nearest one found
+    so far are not fetched. Returns the spots and whether the search ran to the end;
+    when it stopped early, only the `count` nearest are certain and more spots exist.
+    """
+    seen = ElementIndex()
+    spots = []
+    # Negated distances of the count nearest spots found so far (a max-heap)
+    nearest: List[float] = []
+    stopped = False
+
+    def enough(within_km: float) -> bool:
+        nonlocal stopped
+        stopped = len(nearest) == count and -nearest[0] <= within_km
+        return stopped
+
+    elements = iter_primary_and_secondary(center.lat, center.lon, radius, overpass_timeout(radius), enough)
+    async with aclosing(elements):
+        async for tier, element in elements:
+            spot = _new_spot(seen, element, tier)
+            if spot is None:
+                continue
+            spots.append(spot)
+            distance = -haversine_km(center.lat, center.lon, spot.lat, spot.lon)
+            if len(nearest) < count:
+                heapq.heappush(nearest, distance)
+            elif distance > nearest[0]:
+                heapq.heapreplace(nearest, distance)
+    return spots, not stopped
+
+
+async def search_spots(request, front_end: FrontEnd) -> List[TouristSpot]:
+    """Resolve the request's center with a front-end, then search around it; nearest spots first"""
+    center = await front_end(request)
+    spots = sort_by_distance(await search_pois(center, request.radius), center.lat, center.lon, request.radius)
+    return [spot.to_model() for spot in spots]
+
+
+def _event(event: Dict) -> str:
+    """One line of an NDJSON search stream"""
+    return json.dumps(event) + "\n"
+
+
+async def stream_spots(request, front_end: FrontEnd) -> AsyncIterator[str]:
+    """
+    Search like search_spots, but as NDJSON lines sent while the search runs
+
+    The stream is one 'center' event, a 'spot' event per tourist spot (cached tiles
+    first, then fresh Overpass results as they are parsed) and a closing 'done'
+    event with the count. Failures after the response has started cannot change
+    its status code, so they end the stream with an 'error' event instead.
+    """
+    try:
+        center = await front_end(request)
+        yield _event({"type": "center", "lat": center.lat, "lon": center.lon, "country": center.country})
+
+        count = 0
+        async for spot in iter_pois(center, request.radius):
+            count += 1
+            spot.distance_km = haversine_km(center.lat, center.lon, spot.lat, spot.lon)
+            yield _event({"type": "spot", "spot": spot.to_dict()})
+        yield _event({"type": "done", "count": count})
+    except HTTPException as e:
+        yield _event({"type": "error", "status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        logger.error(f"Error in streaming search: {str(e)}")
+        yield _event({"type": "error", "status_code": 500, "detail": f"Error searching tourist spots: {str(e)}"})
+
+
+class SearchPage(NamedTuple):
+    """One page of ranked search results"""
+    items: List[Dict]
+    next_cursor: Optional[str]
+    total: int
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """The spot fields a `fields=` parameter asks for; DEFAULT_FIELDS when it is empty"""
+    if not fields:
+        return DEFAULT_FIELDS
+    requested = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in requested if field not in TouristSpot.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def search_key(request, front_end: FrontEnd, sort: str) -> str:
+    """Identifies a search and its ordering, so cursors cannot be replayed against another search"""
+    payload = json.dumps(request.model_dump(), sort_keys=True)
+    return hashlib.sha1(f"{front_end.__name__}|{sort}|{payload}".encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(key: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": key, "o": offset}).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> int:
+    """Offset a cursor points at; 400 when it is malformed or belongs to another search"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+        cursor_key = data["k"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if cursor_key != key or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this search.")
+    return offset
+
+
+def _page_params(limit: int, fields: Optional[str], sort: str) -> Tuple[int, set]:
+    """Validated page size and included fields of a page request"""
+    if sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    return max(1, min(limit, SEARCH_MAX_PAGE_SIZE)), set(parse_fields(fields))
+
+
+def _page(ranked: List[Spot], key: str, offset: int, limit: int, include: set, complete: bool = True) -> SearchPage:
+    """A page of ranked spots; an incomplete result set (a search stopped early) always has a next page"""
+    page = ranked[offset:offset + limit]
+    next_offset = offset + len(page)
+    return SearchPage(
+        items=[spot.to_dict(include) for spot in page],
+        next_cursor=encode_cursor(key, next_offset) if next_offset < len(ranked) or not complete else None,
+        total=len(ranked),
+    )
+
+
+async def search_page(request, front_end: FrontEnd, limit: int = SEARCH_PAGE_SIZE, cursor: Optional[str] = None,
+                      fields: Optional[str] = None, sort: str = "rank") -> SearchPage:
+    """
+    One page of a search, ranked server-side and projected to the requested fields
+
+    The full result set is ranked once and kept in ranked_results, so following
+    the cursor returns the next page without searching again. Spots leave out
+    their tags unless `fields` asks for them.
+
+    Sorted by distance, the search stops once the spots up to the end of the page
+    are known (see search_nearest_pois). Such a partial result set is not kept:
+    the next page searches again, further out, mostly from the tiles cached by
+    this one, and `total` only counts the spots found so far.
+    """
+    limit, include = _page_params(limit, fields, sort)
+    key = search_key(request, front_end, sort)
+    offset = decode_cursor(cursor, key) if cursor else 0
+
+    ranked = ranked_results.get(key)
+    complete = True
+    if ranked is None:
+        center = await front_end(request)
+        if sort == "distance":
+            spots, complete = await search_nearest_pois(center, request.radius, offset + limit)
+        else:
+            spots = await search_pois(center, request.radius)
+        ranked = [spot for spot, _ in rank_spots(spots, center.lat, center.lon, request.radius, sort)]
+        if complete:
+            ranked_results.set(key, ranked)
+    return _page(ranked, key, offset, limit, include, complete)
+
+
+class BatchResult(NamedTuple):
+    """The first page of one destination of a batch search, or the error it failed with"""
+    page: Optional[SearchPage]
+    status_code: int = 200
+    detail: Optional[str] = None
+
+
+def _batch_error(error: BaseException) -> BatchResult:
+    if isinstance(error, HTTPException):
+        return BatchResult(None, error.status_code, error.detail)
+    logger.error(f"Error in batch search: {str(error)}")
+    return BatchResult(None, 500, f"Error searching tourist spots: {str(error)}")
+
+
+async def search_batch(requests: List, front_end: FrontEnd, limit: int = SEARCH_PAGE_SIZE,
+                       fields: Optional[str] = None, sort: str = "rank") -> List[BatchResult]:
+    """
+    The first page of each of several searches, in request order
+
+    All centers are resolved concurrently and the Overpass queries of every
+    destination are fetched together by fetch_primary_and_secondary_batch, so
+    nearby or small destinations share requests. Each ranked result set is kept
+    in ranked_results like search_page's, so its cursor pages on through /search.
+    A destination that fails gets an error entry without failing the others.
+    """
+    if len(requests) > SEARCH_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {SEARCH_BATCH_MAX} searches per batch.")
+    limit, include = _page_params(limit, fields, sort)
+    keys = [search_key(request, front_end, sort) for request in requests]
+    ranked: Dict[int, List[Spot]] = {}
+    results: Dict[int, BatchResult] = {}
+    pending = []
+    for i, key in enumerate(keys):
+        cached = ranked_results.get(key)
+        if cached is None:
+            pending.append(i)
+        else:
+            ranked[i] = cached
+
+    centers = await asyncio.gather(*(front_end(requests[i]) for i in pending), return_exceptions=True)
+    located = []
+    for i, center in zip(pending, centers):
+        if isinstance(center, BaseException):
+            results[i] = _batch_error(center)
+        else:
+            located.append((i, center))
+
+    fetched = await fetch_primary_and_secondary_batch([
+        (center.lat, center.lon, requests[i].radius, overpass_timeout(requests[i].radius)) for i, center in located
+    ])
+    for (i, center), elements in zip(located, fetched):
+        if isinstance(elements, BaseException):
+            results[i] = _batch_error(elements)
+            continue
+        primary, secondary = elements
+        seen = ElementIndex()
+        spots = [_new_spot(seen, element, "primary") for element in primary]
+        spots += [_new_spot(seen, element, "secondary") for element in secondary]
+        spots = [spot for spot in spots if spot is not None]
+        ranked[i] = [spot for spot, _ in rank_spots(spots, center.lat, center.lon, requests[i].radius, sort)]
+        ranked_results.set(keys[i], ranked[i])
+
+    for i in ranked:
+        results[i] = BatchResult(_page(ranked[i], keys[i], 0, limit, include))
+    return [results[i] for i in range(len(requests))]
@@ -0,0 +1,160 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import os
+
+Tile = Tuple[int, int]
+# (min_x, min_y, max_x, max_y), inclusive tile coordinates
+TileRectangle = Tuple[int, int, int, int]
+
+# Split a fetch into rings once it is expected to return more elements than this
+OVERPASS_SUBQUERY_TARGET = int(os.getenv("OVERPASS_SUBQUERY_TARGET", 2000))
+# Per-category element cap of each ring sub-query, so hotels cannot crowd out waterfalls
+OVERPASS_CATEGORY_CAP = int(os.getenv("OVERPASS_CATEGORY_CAP", 1000))
+# Expected size of one merged request of a batch search, summed over its destinations
+OVERPASS_BATCH_TARGET = int(os.getenv("OVERPASS_BATCH_TARGET", 8000))
+# Assumed elements per tile for a query none of whose tiles have been cached yet
+DEFAULT_TILE_DENSITY = 25.0
+
+
+class SubQuery(NamedTuple):
+    """One Overpass request of a plan: the tiles it completes and the boxes it asks for"""
+    tiles: Set[Tile]
+    rectangles: List[TileRectangle]
+    category_cap: Optional[int] = None
+
+
+def bounding_rectangle(tiles: Iterable[Tile]) -> TileRectangle:
+    tiles = list(tiles)
+    return (min(x for x, _ in tiles), min(y for _, y in tiles), max(x for x, _ in tiles), max(y for _, y in tiles))
+
+
+def rectangle_tiles(rectangle: TileRectangle) -> Set[Tile]:
+    min_x, min_y, max_x, max_y = rectangle
+    return {(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)}
+
+
+def ring_rectangles(center: Tile, inner: int, tiles: List[Tile]) -> List[TileRectangle]:
+    """
+    Cover the tiles of a square ring around a center tile with at most four rectangles
+
+    The ring holds tiles whose Chebyshev distance to the center is at least `inner`;
+    it is cut into top and bottom bands and left and right sides, each shrunk to the
+    tiles it actually has to fetch.
+    """
+    if inner == 0:
+        return [bounding_rectangle(tiles)]
+    cx, cy = center
+    parts: Dict[str, List[Tile]] = {"top": [], "bottom": [], "left": [], "right": []}
+    for x, y in tiles:
+        if y - cy <= -inner:
+            parts["top"].append((x, y))
+        elif y - cy >= inner:
+            parts["bottom"].append((x, y))
+        elif x < cx:
+            parts["left"].append((x, y))
+        else:
+            parts["right"].append((x, y))
+    return [bounding_rectangle(part) for part in parts.values() if part]
+
+
+def wrap_subquery(subquery: SubQuery, columns: int) -> SubQuery:
+    """
+    A sub-query planned on tile x coordinates past the edges of the map, brought back
+    onto the map of `columns` tiles per row; rectangles across the antimeridian are cut in two
+    """
+    rectangles = []
+    for min_x, min_y, max_x, max_y in subquery.rectangles:
+        if max_x - min_x + 1 >= columns:
+            rectangles.append((0, min_y, columns - 1, max_y))
+            continue
+        shift = (min_x // columns) * columns
+        min_x, max_x = min_x - shift, max_x - shift
+        if max_x < columns:
+            rectangles.append((min_x, min_y, max_x, max_y))
+        else:
+            rectangles += [(min_x, min_y, columns - 1, max_y), (0, min_y, max_x - columns, max_y)]
+    tiles = {(x % columns, y) for x, y in subquery.tiles}
+    return SubQuery(tiles, rectangles, subquery.category_cap)
+
+
+def plan_subqueries(center: Tile, tiles: List[Tile], tile_density: Optional[float],
+                    target: Optional[int] = None, category_cap: Optional[int] = None,
+                    columns: Optional[int] = None) -> List[SubQuery]:
+    """
+    Plan the Overpass requests fetching a set of cold tiles, nearest first
+
+    A fetch expected to stay under `target` elements is one bbox query, as before.
+    Larger ones are split into square rings around the center tile, each expected
+    to return about `target` elements and capped per category, so the first ring
+    answers quickly and later rings can be skipped once the caller has enough.
+    target and category_cap default to OVERPASS_SUBQUERY_TARGET and OVERPASS_CATEGORY_CAP.
+
+    With `columns` (tiles per row of the map), tiles across the antimeridian from the
+    center are planned as its neighbours and each sub-query is wrapped back onto the map.
+    """
+    if columns is not None:
+        cx = center[0]
+        # Each tile's x as seen from the center: at most half the map away on either side
+        unwrapped = [(cx + (x - cx + columns // 2) % columns - columns // 2, y) for x, y in tiles]
+        plan = plan_subqueries(center, unwrapped, tile_density, target, category_cap)
+        return [wrap_subquery(subquery, columns) for subquery in plan]
+    target = target if target is not None else OVERPASS_SUBQUERY_TARGET
+    category_cap = category_cap if category_cap is not None else OVERPASS_CATEGORY_CAP
+    density = tile_density if tile_density is not None else DEFAULT_TILE_DENSITY
+    if len(tiles) * density <= target:
+        rectangle = bounding_rectangle(tiles)
+        return [SubQuery(rectangle_tiles(rectangle), [rectangle])]
+
+    cx, cy = center
+    by_distance: Dict[int, List[Tile]] = {}
+    for x, y in tiles:
+        by_distance.setdefault(max(abs(x - cx), abs(y - cy)), []).append((x, y))
+
+    plan = []
+    ring: List[Tile] = []
+    inner = None
+    for distance in sorted(by_distance):
+        if inner is None:
+            inner = distance
+        ring.extend(by_distance[distance])
+        if len(ring) * density >= target:
+            plan.append(ring_subquery(center, inner, ring, category_cap))
+            ring, inner = [], None
+    if ring:
+        plan.append(ring_subquery(center, inner, ring, category_cap))
+    return plan
+
+
+def ring_subquery(center: Tile, inner: int, tiles: List[Tile], category_cap: int) -> SubQuery:
+    rectangles = ring_rectangles(center, inner, tiles)
+    covered = set()
+    for rectangle in rectangles:
+        covered |= rectangle_tiles(rectangle)
+    return SubQuery(covered, rectangles, category_cap)
+
+
+def merge_subqueries(subqueries: List[SubQuery], tile_density: Optional[float], target: Optional[int] = None) -> List[SubQuery]:
+    """
+    Pack the single-box sub-queries of several searches into shared requests
+
+    Each merged request asks for the union of its boxes and is expected to return
+    at most `target` elements (default OVERPASS_BATCH_TARGET); a sub-query larger
+    than that keeps a request of its own. Category-capped ring sub-queries are
+    never merged, since one search's spots would count against another's cap.
+    """
+    target = target if target is not None else OVERPASS_BATCH_TARGET
+    density = tile_density if tile_density is not None else DEFAULT_TILE_DENSITY
+    merged = []
+    tiles: Set[Tile] = set()
+    rectangles: List[TileRectangle] = []
+    for subquery in subqueries:
+        if subquery.category_cap is not None:
+            merged.append(subquery)
+            continue
+        if rectangles and len(tiles | subquery.tiles) * density > target:
+            merged.append(SubQuery(tiles, rectangles))
+            tiles, rectangles = set(), []
+        tiles = tiles | subquery.tiles
+        rectangles = rectangles + subquery.rectangles
+    if rectangles:
+        merged.append(SubQuery(tiles, rectangles))
+    return merged
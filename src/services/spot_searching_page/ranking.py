@@ -0,0 +1,117 @@
+from services.spot_searching_page.spots import Spot
+from services.utils.geo import haversine_km_array
+from typing import Dict, List, Tuple
+import numpy as np
+
+# How worth visiting a category is, 0..1; unlisted categories fall back on their prefix, then DEFAULT
+CATEGORY_WEIGHTS: Dict[str, float] = {
+    "attraction": 1.0,
+    "viewpoint": 0.9,
+    "museum": 0.9,
+    "waterfall": 0.9,
+    "gallery": 0.8,
+    "beach": 0.8,
+    "historic_castle": 0.9,
+    "historic_monument": 0.85,
+    "historic_ruins": 0.8,
+    "leisure_nature_reserve": 0.7,
+    "leisure_water_park": 0.6,
+    "leisure_park": 0.55,
+    "resort": 0.5,
+    "forest": 0.4,
+    "hotel": 0.3,
+}
+PREFIX_WEIGHTS: Dict[str, float] = {
+    "historic_": 0.7,
+    "leisure_": 0.5,
+    "restaurant_": 0.35,
+}
+DEFAULT_CATEGORY_WEIGHT = 0.2
+
+# Tags that mark a well-documented, notable place
+RICH_TAGS: Dict[str, float] = {
+    "wikipedia": 0.4,
+    "wikidata": 0.3,
+    "website": 0.1,
+    "image": 0.1,
+    "opening_hours": 0.05,
+    "heritage": 0.05,
+}
+
+# Share of the score given to each signal
+PROXIMITY_WEIGHT = 0.4
+CATEGORY_WEIGHT = 0.35
+RICHNESS_WEIGHT = 0.25
+
+SORT_ORDERS = ("rank", "distance")
+
+
+def category_weight(category: str) -> float:
+    if category in CATEGORY_WEIGHTS:
+        return CATEGORY_WEIGHTS[category]
+    for prefix, weight in PREFIX_WEIGHTS.items():
+        if category.startswith(prefix):
+            return weight
+    return DEFAULT_CATEGORY_WEIGHT
+
+
+def tag_richness(tag_keys: Tuple[str, ...]) -> float:
+    """0..1: wikipedia/wikidata links and other notable tags, plus a little for tag count"""
+    score = sum(weight for tag, weight in RICH_TAGS.items() if tag in tag_keys)
+    return min(1.0, score + min(len(tag_keys), 20) / 200)
+
+
+def spot_score(spot: Spot, distance_km: float, radius_km: float) -> float:
+    """Ranking score of a spot, higher is better"""
+    proximity = max(0.0, 1.0 - distance_km / radius_km) if radius_km > 0 else 1.0
+    return (PROXIMITY_WEIGHT * proximity
+            + CATEGORY_WEIGHT * category_weight(spot.category)
+            + RICHNESS_WEIGHT * tag_richness(spot.tag_keys))
+
+
+def spot_distances(spots: List[Spot], lat: float, lon: float) -> np.ndarray:
+    """Distance in km from a point to every spot, in one vectorized pass"""
+    lats = np.fromiter((spot.lat for spot in spots), dtype=np.float64, count=len(spots))
+    lons = np.fromiter((spot.lon for spot in spots), dtype=np.float64, count=len(spots))
+    return haversine_km_array(lat, lon, lats, lons)
+
+
+def rank_spots(spots: List[Spot], lat: float, lon: float, radius_km: float, sort: str = "rank") -> List[Tuple[Spot, float]]:
+    """
+    Order the spots within radius_km of a point for paging, as (spot, distance in km) pairs
+
+    "rank" orders by spot_score, "distance" nearest first; ties are broken by
+    distance, then id, so the order is stable between page requests. Spots
+    outside the radius (Overpass bounding box overshoot) are dropped and the
+    others get their distance_km set.
+    """
+    if not spots:
+        return []
+    distances = spot_distances(spots, lat, lon)
+    inside = np.flatnonzero(distances <= radius_km)
+    spots = [spots[i] for i in inside.tolist()]
+    distances = distances[inside]
+
+    if sort == "rank":
+        proximity = np.clip(1.0 - distances / radius_km, 0.0, 1.0) if radius_km > 0 else np.ones(len(spots))
+        weights = np.fromiter((CATEGORY_WEIGHT * category_weight(spot.category) + RICHNESS_WEIGHT * tag_richness(spot.tag_keys)
+                               for spot in spots), dtype=np.float64, count=len(spots))
+        scores = PROXIMITY_WEIGHT * proximity + weights
+        order = np.lexsort((np.array([spot.id for spot in spots]), distances, -scores))
+    else:
+        order = np.argsort(distances, kind="stable")
+        # Ids only decide between spots at exactly the same distance, which is rare
+        if np.any(np.diff(distances[order]) == 0):
+            order = np.lexsort((np.array([spot.id for spot in spots]), distances))
+
+    ranked = []
+    for i, distance in zip(order.tolist(), distances[order].tolist()):
+        spot = spots[i]
+        spot.distance_km = distance
+        ranked.append((spot, distance))
+    return ranked
+
+
+def sort_by_distance(spots: List[Spot], lat: float, lon: float, radius_km: float) -> List[Spot]:
+    """The spots within radius_km of a point, nearest first, with distance_km set"""
+    return [spot for spot, _ in rank_spots(spots, lat, lon, radius_km, sort="distance")]
@@ -0,0 +1,127 @@
+from collections import Counter, deque
+from services.spot_searching_page.geocode_service import normalize_location
+from typing import Deque, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+# NDJSON file the search log is appended to, so the top destinations survive a restart or deploy
+SEARCH_LOG_PATH = os.getenv("SEARCH_LOG_PATH")
+# Searches older than this no longer count towards the top destinations
+SEARCH_LOG_WINDOW = float(os.getenv("SEARCH_LOG_WINDOW", 7 * 24 * 3600))
+SEARCH_LOG_MAX_ENTRIES = 100000
+DEFAULT_RADIUS = 5
+
+
+class Destination(NamedTuple):
+    """A location and search radius (km)"""
+    location: str
+    radius: int = DEFAULT_RADIUS
+
+
+class SearchLog:
+    """
+    Recent geocoded searches, for picking the destinations worth warming
+
+    Kept in memory and, with a path, in an NDJSON file that is read back once
+    and compacted to the current window by compact(). record() runs on the event
+    loop for every geocoded search, so it only buffers: entries reach the file
+    when flush() or compact() runs, which the warm-up scheduler does off the loop.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: float = SEARCH_LOG_WINDOW, max_entries: int = SEARCH_LOG_MAX_ENTRIES):
+        self.path = path
+        self.window = window
+        self._entries: Deque[Tuple[float, str, int]] = deque(maxlen=max_entries)
+        # Recorded but not yet in the file
+        self._pending: Deque[Tuple[float, str, int]] = deque(maxlen=max_entries)
+        # Entries of this process already in the file
+        self._written = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def record(self, location: str, radius: int):
+        entry = (time.time(), normalize_location(location), radius)
+        with self._lock:
+            self._entries.append(entry)
+            if self.path:
+                self._pending.append(entry)
+
+    def flush(self):
+        """Append the entries recorded since the last flush to the file"""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        if not pending or not self.path:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for ts, location, radius in pending:
+                    f.write(json.dumps({"ts": ts, "location": location, "radius": radius}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not append to search log {self.path}: {str(e)}")
+            return
+        with self._lock:
+            self._written += len(pending)
+
+    def load(self):
+        """Read the entries of the log file still inside the window (once)"""
+        if self._loaded or not self.path:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        cutoff = time.time() - self.window
+        loaded = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    entry = (float(data["ts"]), str(data["location"]), int(data["radius"]))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if entry[0] >= cutoff:
+                    loaded.append(entry)
+        with self._lock:
+            # Searches of this process already flushed are in the file, after the ones loaded here
+            if self._written:
+                loaded = loaded[:-self._written]
+            self._entries = deque(loaded + list(self._entries), maxlen=self._entries.maxlen)
+
+    def compact(self):
+        """Drop entries older than the window, in memory and in the file (which then holds every entry)"""
+        self.load()
+        cutoff = time.time() - self.window
+        with self._lock:
+            while self._entries and self._entries[0][0] < cutoff:
+                self._entries.popleft()
+            entries = list(self._entries)
+            self._pending.clear()
+            self._written = len(entries)
+        if self.path:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for ts, location, radius in entries:
+                    f.write(json.dumps({"ts": ts, "location": location, "radius": radius}) + "\n")
+            os.replace(temp_path, self.path)
+
+    def top(self, n: int) -> List[Destination]:
+        """The n most searched (location, radius) pairs of the window"""
+        self.load()
+        cutoff = time.time() - self.window
+        with self._lock:
+            counts = Counter((location, radius) for ts, location, radius in self._entries if ts >= cutoff)
+        return [Destination(location, radius) for (location, radius), _ in counts.most_common(n)]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+search_log = SearchLog(SEARCH_LOG_PATH)
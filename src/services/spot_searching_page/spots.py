@@ -0,0 +1,85 @@
+from models.models import TouristSpot
+from typing import Dict, Iterable, Optional, Tuple
+import sys
+
+# Identical tag key tuples (e.g. ('tourism', 'name')) are stored once and shared by every spot using them
+_key_tables: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+MAX_KEY_TABLES = 65536
+# Short values repeat across spots ('attraction', 'yes', 'Paris'); longer ones are mostly unique
+MAX_INTERNED_VALUE_LENGTH = 24
+
+
+def key_table(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """The shared instance of a tuple of tag keys"""
+    table = _key_tables.get(keys)
+    if table is None:
+        table = tuple(sys.intern(key) for key in keys)
+        if len(_key_tables) < MAX_KEY_TABLES:
+            _key_tables[table] = table
+    return table
+
+
+def _intern_value(value: str) -> str:
+    return sys.intern(value) if len(value) <= MAX_INTERNED_VALUE_LENGTH else value
+
+
+class Spot:
+    """
+    Compact internal form of a tourist spot, used from parsing through ranking and caching.
+
+    Tags are kept as a shared key table plus a tuple of values instead of a dict per
+    spot, and categories are interned. Convert with to_model() or to_dict() only
+    when building a response.
+    """
+
+    __slots__ = ("id", "name", "category", "lat", "lon", "tag_keys", "tag_values", "description", "distance_km")
+
+    def __init__(self, id: str, name: str, category: str, lat: float, lon: float,
+                 tag_keys: Tuple[str, ...] = (), tag_values: Tuple[str, ...] = (), description: Optional[str] = None,
+                 distance_km: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.category = sys.intern(category)
+        self.lat = lat
+        self.lon = lon
+        self.tag_keys = tag_keys
+        self.tag_values = tag_values
+        self.description = description
+        # Distance from the search center, set once the spot is ranked or streamed
+        self.distance_km = distance_km
+
+    @classmethod
+    def from_tags(cls, id: str, name: str, category: str, lat: float, lon: float, tags: Dict[str, str]) -> "Spot":
+        return cls(id, name, category, lat, lon, key_table(tuple(tags)), tuple(_intern_value(value) for value in tags.values()))
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        return dict(zip(self.tag_keys, self.tag_values))
+
+    def has_tag(self, key: str) -> bool:
+        return key in self.tag_keys
+
+    def to_dict(self, include: Optional[Iterable[str]] = None) -> Dict:
+        """The spot as a TouristSpot-shaped dict, optionally limited to some fields"""
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "lat": self.lat,
+            "lon": self.lon,
+            "description": self.description,
+            "distance_km": self.distance_km,
+        }
+        if include is None:
+            data["tags"] = self.tags
+            return data
+        include = set(include)
+        if "tags" in include:
+            data["tags"] = self.tags
+        return {field: value for field, value in data.items() if field in include}
+
+    def to_model(self) -> TouristSpot:
+        return TouristSpot(**self.to_dict())
+
+    def __repr__(self):
+        return f"Spot(id={self.id!r}, name={self.name!r}, category={self.category!r})"
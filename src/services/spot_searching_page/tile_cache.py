@@ -0,0 +1,109 @@
+from services.utils.cache import register_cache
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+import threading
+import time
+
+
+def estimate_element_size(element: Dict) -> int:
+    """Rough number of bytes an Overpass element dict keeps alive"""
+    size = 400  # dict, id, type and coordinates
+    for key, value in element.get('tags', {}).items():
+        size += 120 + len(key) + len(value)
+    return size
+
+
+class PoiTileCache:
+    """
+    Overpass elements cached per map tile, evicted by TTL and by a total memory budget.
+
+    Keys are (query name, quadkey) pairs; values are the named elements whose
+    coordinates fall inside the tile. Empty tiles are cached as well, since
+    knowing a tile has nothing is as valuable as knowing what it has.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, name: Optional[str] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._tiles: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        # Query name -> [tiles, elements] of the cached tiles, for density estimates
+        self._totals: Dict[Hashable, List[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: Hashable) -> Optional[List[Dict]]:
+        """Get the elements of a tile, or None when the tile is cold"""
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                elements, expires_at, size = entry
+                if expires_at > time.monotonic():
+                    self._tiles.move_to_end(key)
+                    self.hits += 1
+                    return elements
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def contains(self, key: Hashable) -> bool:
+        """Whether a tile is warm, without counting a lookup or refreshing its recency"""
+        with self._lock:
+            entry = self._tiles.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def set(self, key: Hashable, elements: List[Dict]):
+        """Store the elements of a tile, evicting least recently used tiles beyond the memory budget"""
+        size = 200 + sum(estimate_element_size(element) for element in elements)
+        with self._lock:
+            if key in self._tiles:
+                self._remove(key)
+            self._tiles[key] = (elements, time.monotonic() + self.ttl, size)
+            self.bytes += size
+            totals = self._totals.setdefault(key[0], [0, 0])
+            totals[0] += 1
+            totals[1] += len(elements)
+            while self.bytes > self.max_bytes and len(self._tiles) > 1:
+                oldest = next(iter(self._tiles))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        elements, _, size = self._tiles.pop(key)
+        self.bytes -= size
+        totals = self._totals[key[0]]
+        totals[0] -= 1
+        totals[1] -= len(elements)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._totals.clear()
+            self.bytes = 0
+
+    def mean_elements(self, query_name: Hashable) -> Optional[float]:
+        """Average number of elements in the cached tiles of a query, or None when none are cached"""
+        tiles, elements = self._totals.get(query_name, (0, 0))
+        return elements / tiles if tiles else None
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "tiles": len(self._tiles),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "tile_hits": self.hits,
+            "tile_misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,177 @@
+from services.spot_searching_page.geocode_service import geocode_location, normalize_location
+from services.spot_searching_page import poi_engine
+from services.spot_searching_page.search_log import Destination, SearchLog, search_log
+from services.spot_searching_page.weather_service import get_weather_data
+from services.utils.cache import register_cache
+from typing import Dict, List, NamedTuple, Optional
+import asyncio
+import logging
+import os
+import time
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("GroqAPIManager")
+
+# Destinations always warmed, as "location[:radius]" separated by ';', e.g. "Paris, France:10;Rome"
+WARMUP_DESTINATIONS = os.getenv("WARMUP_DESTINATIONS", "")
+# Also warm the N most searched destinations of the search log
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", 0))
+# Seconds between warm-up runs; keep it under POI_TILE_TTL so hot tiles are refetched before users hit them cold
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", 6 * 3600))
+# Destinations warmed at once, and destinations started per second, to stay within Nominatim/Overpass fair use
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 2))
+WARMUP_RATE = float(os.getenv("WARMUP_RATE", 1.0))
+# Shared secret of the POST /warmup endpoint (and warmup.py); the endpoint is off while unset
+WARMUP_TOKEN = os.getenv("WARMUP_TOKEN")
+
+
+def parse_destinations(spec: str) -> List[Destination]:
+    """Destinations of a WARMUP_DESTINATIONS-style spec: "location[:radius]" separated by ';'"""
+    destinations = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        location, _, radius = part.rpartition(":")
+        if location and radius.strip().isdigit():
+            destinations.append(Destination(location.strip(), int(radius)))
+        else:
+            destinations.append(Destination(part))
+    return destinations
+
+
+class WarmupResult(NamedTuple):
+    """How warming one destination went"""
+    destination: Destination
+    ok: bool
+    seconds: float
+    spots: int = 0
+    detail: Optional[str] = None
+
+
+class WarmupScheduler:
+    """
+    Keeps the geocode, POI tile and weather caches warm for hot destinations
+
+    A run geocodes each destination (the fixed list plus the search log's top N),
+    runs its POI search, which leaves its tiles in the tile cache, and fetches the
+    weather of its center, with at most `concurrency` destinations in progress
+    and at most `rate` started per second. start() runs one pass right away and
+    then every `interval` seconds.
+    """
+
+    def __init__(self, destinations: Optional[List[Destination]] = None, top_n: int = WARMUP_TOP_N,
+                 interval: float = WARMUP_INTERVAL, concurrency: int = WARMUP_CONCURRENCY, rate: float = WARMUP_RATE,
+                 log: Optional[SearchLog] = None, name: Optional[str] = None):
+        self.destinations = destinations if destinations is not None else parse_destinations(WARMUP_DESTINATIONS)
+        self.top_n = top_n
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.log = log if log is not None else search_log
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.warmed = 0
+        self.failures = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_seconds: Optional[float] = None
+        if name:
+            register_cache(name, self)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.destinations) or self.top_n > 0
+
+    def plan(self) -> List[Destination]:
+        """The destinations of the next run: the fixed list, then the top searched ones not in it"""
+        planned = list(self.destinations)
+        if self.top_n > 0:
+            known = {(normalize_location(d.location), d.radius) for d in planned}
+            planned += [d for d in self.log.top(self.top_n) if (d.location, d.radius) not in known]
+        return planned
+
+    async def warm(self, destination: Destination) -> WarmupResult:
+        start = time.perf_counter()
+        try:
+            geocoded = await geocode_location(destination.location)
+            if not geocoded:
+                return WarmupResult(destination, False, time.perf_counter() - start, detail="Location not found")
+            center = poi_engine.SearchCenter(geocoded['lat'], geocoded['lon'], geocoded['country'])
+            spots = await poi_engine.search_pois(center, destination.radius)
+            await get_weather_data(center.lat, center.lon)
+            return WarmupResult(destination, True, time.perf_counter() - start, len(spots))
+        except Exception as e:
+            logger.warning(f"Warm-up of '{destination.location}' failed: {str(e)}")
+            return WarmupResult(destination, False, time.perf_counter() - start, detail=str(e))
+
+    async def run_once(self, destinations: Optional[List[Destination]] = None) -> List[WarmupResult]:
+        """Warm every planned (or the given) destination once"""
+        if self.log.path:
+            # The log file is read (once) and written off the event loop
+            await asyncio.to_thread(self.log.load)
+        destinations = destinations if destinations is not None else self.plan()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started_at = time.perf_counter()
+
+        async def warm_in_turn(i: int, destination: Destination) -> WarmupResult:
+            # Start times are spaced 1 / rate seconds apart
+            if self.rate > 0:
+                await asyncio.sleep(max(0.0, started_at + i / self.rate - time.perf_counter()))
+            async with semaphore:
+                return await self.warm(destination)
+
+        results = await asyncio.gather(*(warm_in_turn(i, d) for i, d in enumerate(destinations)))
+        self.runs += 1
+        self.warmed += sum(result.ok for result in results)
+        self.failures += sum(not result.ok for result in results)
+        self.last_run_at = time.time()
+        self.last_run_seconds = time.perf_counter() - started_at
+        logger.info(f"Warm-up: {sum(result.ok for result in results)}/{len(results)} destinations in {self.last_run_seconds:.1f}s")
+        if self.log.path:
+            try:
+                await asyncio.to_thread(self.log.compact)
+            except OSError as e:
+                logger.warning(f"Could not compact search log {self.log.path}: {str(e)}")
+        return results
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Warm-up run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Run in the background: once now, then every interval seconds"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.log.path:
+            await asyncio.to_thread(self.log.flush)
+
+    def stats(self) -> Dict:
+        return {
+            "destinations": len(self.destinations),
+            "top_n": self.top_n,
+            "running": self.task is not None and not self.task.done(),
+            "runs": self.runs,
+            "warmed": self.warmed,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": round(self.last_run_seconds, 3) if self.last_run_seconds is not None else None,
+            "search_log_entries": len(self.log),
+        }
+
+
+warmup_scheduler = WarmupScheduler(name="warmup")
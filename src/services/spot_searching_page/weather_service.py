@@ -1,8 +1,16 @@
+import asyncio
+import httpx
 import logging
-import requests
+import math
+import numpy as np
+import os
+import random
 import time
-from typing import Optional, NamedTuple, Dict, Any
+from typing import Optional, NamedTuple, Dict, Any, List, Set, Tuple, Union
 from models.models import WeatherData
+from services.utils.cache import StaleWhileRevalidateCache
+from services.utils.circuit_breaker import CircuitBreaker
+from services.utils.http_client import http_get
 
 
 # Set up logging
@@ -10,80 +18,329 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("GroqAPIManager")
 
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
 
+# Weather is cached per grid cell of this many degrees (~5.5 km of latitude), so nearby spots share a forecast
+WEATHER_CELL_DEG = float(os.getenv("WEATHER_CELL_DEG", 0.05))
+# Open-Meteo's hourly forecast changes at most hourly: a cached forecast is fresh until this
+# many seconds past the next full hour, then served stale while it is refreshed in the background
+WEATHER_REFRESH_GRACE = float(os.getenv("WEATHER_REFRESH_GRACE", 300))
+WEATHER_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", 6 * 3600))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", 4096))
+# Locations per multi-location Open-Meteo request of a weather batch, and points accepted by /weather/batch
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", 100))
+WEATHER_BATCH_MAX = int(os.getenv("WEATHER_BATCH_MAX", 1000))
+# Attempts per Open-Meteo request, with full-jitter exponential backoff (base and cap in seconds) between them
+WEATHER_MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", 3))
+WEATHER_RETRY_DELAY = float(os.getenv("WEATHER_RETRY_DELAY", 1.0))
+WEATHER_RETRY_MAX_DELAY = float(os.getenv("WEATHER_RETRY_MAX_DELAY", 8.0))
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", 10))
+# Consecutive failed Open-Meteo attempts that open the circuit breaker, and seconds it stays open before one probe
+WEATHER_BREAKER_THRESHOLD = int(os.getenv("WEATHER_BREAKER_THRESHOLD", 5))
+WEATHER_BREAKER_RESET = float(os.getenv("WEATHER_BREAKER_RESET", 30))
 
-def get_weather_data(lat: float, lon: float, max_retries: int = 3, retry_delay: int = 2) -> Optional[WeatherData]:
-    retries = 0
-    while retries < max_retries:
+WEATHER_CODES = {
+    0: "clear sky", 1: "mainly clear", 2: "partly cloudy", 3: "overcast",
+    45: "fog", 48: "depositing rime fog", 51: "light drizzle", 53: "moderate drizzle",
+    55: "dense drizzle", 56: "light freezing drizzle", 57: "dense freezing drizzle",
+    61: "slight rain", 63: "moderate rain", 65: "heavy rain",
+    66: "light freezing rain", 67: "heavy freezing rain", 71: "slight snow fall",
+    73: "moderate snow fall", 75: "heavy snow fall", 77: "snow grains",
+    80: "slight rain showers", 81: "moderate rain showers", 82: "violent rain showers",
+    85: "slight snow showers", 86: "heavy snow showers", 95: "thunderstorm",
+    96: "thunderstorm with slight hail", 99: "thunderstorm with heavy hail"
+}
+RAIN_WEATHER_CODES = frozenset([51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82, 95, 96, 99])
+# WMO codes are 0-99: a lookup table turns a whole array of codes into a rain mask in one indexing step
+_RAIN_CODE_MASK = np.zeros(100, dtype=bool)
+_RAIN_CODE_MASK[list(RAIN_WEATHER_CODES)] = True
+# An hour is wet above this much precipitation (mm)
+RAIN_THRESHOLD = 0.1
+
+# Days of hourly forecast fetched and summarized (day1, day2, ...) alongside the next_48h window
+WEATHER_FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", 3))
+# Hourly precipitation probability (%) from which rain is counted as possible / likely
+WEATHER_POSSIBLE_RAIN_PROBABILITY = int(os.getenv("WEATHER_POSSIBLE_RAIN_PROBABILITY", 30))
+WEATHER_LIKELY_RAIN_PROBABILITY = int(os.getenv("WEATHER_LIKELY_RAIN_PROBABILITY", 70))
+
+weather_cache = StaleWhileRevalidateCache(max_size=WEATHER_CACHE_SIZE, name="weather")
+weather_breaker = CircuitBreaker(WEATHER_BREAKER_THRESHOLD, WEATHER_BREAKER_RESET, name="weather_breaker")
+# Background refreshes in flight (the event loop only keeps weak references to tasks)
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def forecast_params(lats: List[float], lons: List[float]) -> Dict[str, str]:
+    """Query parameters of an Open-Meteo forecast request for one or more locations"""
+    return {
+        "latitude": ",".join(str(lat) for lat in lats),
+        "longitude": ",".join(str(lon) for lon in lons),
+        "current": "temperature_2m,weather_code",
+        "hourly": "precipitation,weather_code,temperature_2m,precipitation_probability",
+        "forecast_days": str(WEATHER_FORECAST_DAYS),
+    }
+
+
+def weather_cell(lat: float, lon: float) -> Tuple[int, int]:
+    """Grid cell of a point"""
+    return round(lat / WEATHER_CELL_DEG), round(lon / WEATHER_CELL_DEG)
+
+
+def cell_center(cell: Tuple[int, int]) -> Tuple[float, float]:
+    """The point a cell's forecast is fetched for, so every point of the cell gets the same one"""
+    return round(cell[0] * WEATHER_CELL_DEG, 4), round(cell[1] * WEATHER_CELL_DEG, 4)
+
+
+def forecast_fresh_until(now: Optional[float] = None) -> float:
+    """Wall-clock time a forecast fetched now stops being fresh: the next full hour plus the grace period"""
+    now = time.time() if now is None else now
+    return math.floor(now / 3600 + 1) * 3600 + WEATHER_REFRESH_GRACE
+
+
+def _cache_weather(cell: Tuple[int, int], weather: WeatherData):
+    fresh_until = forecast_fresh_until()
+    weather_cache.set(cell, weather, fresh_until, fresh_until + WEATHER_STALE_TTL)
+
+
+def _start_refresh(coroutine):
+    task = asyncio.create_task(coroutine)
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def _refresh_weather(cell: Tuple[int, int]):
+    try:
+        weather = await fetch_weather_data(*cell_center(cell))
+        if weather is not None:
+            _cache_weather(cell, weather)
+    finally:
+        weather_cache.end_refresh(cell)
+
+
+async def get_weather_data(lat: float, lon: float) -> Optional[WeatherData]:
+    """
+    Current weather and rain/temperature forecast of the grid cell of a point, through the weather cache
+
+    A stale forecast is returned at once while one background task fetches
+    the new one; only a missing forecast waits for Open-Meteo. When that
+    fails, or the circuit breaker is open, the last forecast the cache still
+    holds for the cell is returned, however old.
+    """
+    cell = weather_cell(lat, lon)
+    weather, fresh = weather_cache.get(cell)
+    if weather is not None:
+        if not fresh and weather_cache.start_refresh(cell):
+            _start_refresh(_refresh_weather(cell))
+        return weather
+
+    weather = await fetch_weather_data(*cell_center(cell))
+    if weather is not None:
+        _cache_weather(cell, weather)
+        return weather
+    return weather_cache.last_known(cell)
+
+
+def forecast_windows(days: Optional[int] = None) -> List[Tuple[str, int, int]]:
+    """(name, first hour, end hour) of the summarized windows: next_48h, then day1, day2, ..."""
+    days = WEATHER_FORECAST_DAYS if days is None else days
+    return [("next_48h", 0, 48)] + [(f"day{day + 1}", day * 24, (day + 1) * 24) for day in range(days)]
+
+
+def _hourly_matrix(locations: List[Dict[str, Any]], variable: str, hours: int) -> np.ndarray:
+    """(locations, hours) float array of one hourly variable; NaN where it is missing or null"""
+    rows = []
+    for location in locations:
+        values = (location.get('hourly', {}).get(variable) or [])[:hours]
+        rows.append(values if len(values) == hours else values + [None] * (hours - len(values)))
+    # One conversion for the whole batch; None becomes NaN
+    return np.array(rows, dtype=float).reshape(len(locations), hours)
+
+
+def summarize_forecasts(locations: List[Dict[str, Any]],
+                        windows: Optional[List[Tuple[str, int, int]]] = None) -> List[Dict[str, Dict[str, Union[bool, float, int]]]]:
+    """
+    Rain and temperature summary of each window of each location's hourly forecast
+
+    The hourly arrays of all locations are stacked into (locations, hours)
+    matrices and every statistic of a window is one reduction over its
+    columns, so a batch of hundreds of locations costs about as much as one.
+    Per window: rain_chance (a wet hour or a rain weather code), rain_hours,
+    max_precipitation, possible/likely_rain_hours (hourly precipitation
+    probability in the WEATHER_*_RAIN_PROBABILITY bands), max_rain_probability
+    and max_temperature (omitted when Open-Meteo sent no temperatures).
+    """
+    windows = forecast_windows() if windows is None else windows
+    hours = max((end for _, _, end in windows), default=0)
+    precipitation = np.nan_to_num(_hourly_matrix(locations, 'precipitation', hours), nan=0.0)
+    codes = np.nan_to_num(_hourly_matrix(locations, 'weather_code', hours), nan=-1).astype(int)
+    temperature = _hourly_matrix(locations, 'temperature_2m', hours)
+    probability = np.nan_to_num(_hourly_matrix(locations, 'precipitation_probability', hours), nan=0.0)
+
+    wet = precipitation > RAIN_THRESHOLD
+    rainy = wet | ((codes >= 0) & _RAIN_CODE_MASK[np.clip(codes, 0, 99)])
+    possible = (probability >= WEATHER_POSSIBLE_RAIN_PROBABILITY) & (probability < WEATHER_LIKELY_RAIN_PROBABILITY)
+    likely = probability >= WEATHER_LIKELY_RAIN_PROBABILITY
+
+    summaries = [{} for _ in locations]
+    for name, first, end in windows:
+        window = slice(first, end)
+        columns = {
+            'rain_chance': rainy[:, window].any(axis=1),
+            'rain_hours': wet[:, window].sum(axis=1),
+            'max_precipitation': precipitation[:, window].max(axis=1, initial=0.0),
+            'possible_rain_hours': possible[:, window].sum(axis=1),
+            'likely_rain_hours': likely[:, window].sum(axis=1),
+            'max_rain_probability': probability[:, window].max(axis=1, initial=0.0).astype(int),
+        }
+        # fmax skips NaN hours; a window without any temperature stays at -inf
+        max_temperature = np.fmax.reduce(temperature[:, window], axis=1, initial=-np.inf)
+        keys = list(columns)
+        rows = zip(*(values.tolist() for values in columns.values()), max_temperature.tolist(),
+                   np.isfinite(max_temperature).tolist())
+        for summary, (*values, window_max_temperature, has_temperature) in zip(summaries, rows):
+            summary[name] = dict(zip(keys, values))
+            if has_temperature:
+                summary[name]['max_temperature'] = window_max_temperature
+    return summaries
+
+
+def parse_forecasts(locations: List[Dict[str, Any]]) -> List[WeatherData]:
+    """WeatherData of each location of an Open-Meteo forecast response"""
+    return [
+        WeatherData(
+            temperature=location['current']['temperature_2m'],
+            description=WEATHER_CODES.get(location['current']['weather_code'], "unknown weather"),
+            forecast=forecast,
+        )
+        for location, forecast in zip(locations, summarize_forecasts(locations))
+    ]
+
+
+def parse_forecast(data: Dict[str, Any]) -> WeatherData:
+    """WeatherData of one location of an Open-Meteo forecast response"""
+    return parse_forecasts([data])[0]
+
+
+def backoff_delay(attempt: int, retry_delay: Optional[float] = None) -> float:
+    """Seconds to wait after a failed attempt: full jitter over an exponentially growing, capped window"""
+    retry_delay = WEATHER_RETRY_DELAY if retry_delay is None else retry_delay
+    return random.uniform(0, min(WEATHER_RETRY_MAX_DELAY, retry_delay * 2 ** (attempt - 1)))
+
+
+async def request_forecast(lats: List[float], lons: List[float], max_retries: Optional[int] = None,
+                           retry_delay: Optional[float] = None) -> Optional[Any]:
+    """
+    JSON of an Open-Meteo forecast request; None when it failed or the circuit breaker is open
+
+    Timeouts, connection errors, 429 and 5xx answers are retried after
+    backoff_delay() without blocking the event loop, and each one counts
+    towards opening weather_breaker. Other answers are not retried.
+    """
+    max_retries = WEATHER_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(1, max_retries + 1):
+        if not weather_breaker.allow():
+            logger.warning("Weather API circuit open, not calling Open-Meteo")
+            return None
         try:
-            url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,weather_code&hourly=precipitation,weather_code&forecast_days=3"
-            response = requests.get(url, timeout=10)
+            response = await http_get(OPEN_METEO_URL, params=forecast_params(lats, lons), timeout=WEATHER_TIMEOUT)
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {str(e)}"
+        except asyncio.CancelledError:
+            # Not Open-Meteo's fault, but a half-open breaker must not wait for this probe forever
+            weather_breaker.release()
+            raise
+        except Exception:
+            weather_breaker.record_failure()
+            raise
+        else:
             if response.status_code == 200:
-                data = response.json()
-                weather_codes = {
-                    0: "clear sky", 1: "mainly clear", 2: "partly cloudy", 3: "overcast",
-                    45: "fog", 48: "depositing rime fog", 51: "light drizzle", 53: "moderate drizzle",
-                    55: "dense drizzle", 56: "light freezing drizzle", 57: "dense freezing drizzle",
-                    61: "slight rain", 63: "moderate rain", 65: "heavy rain",
-                    66: "light freezing rain", 67: "heavy freezing rain", 71: "slight snow fall",
-                    73: "moderate snow fall", 75: "heavy snow fall", 77: "snow grains",
-                    80: "slight rain showers", 81: "moderate rain showers", 82: "violent rain showers",
-                    85: "slight snow showers", 86: "heavy snow showers", 95: "thunderstorm",
-                    96: "thunderstorm with slight hail", 99: "thunderstorm with heavy hail"
-                }
-                weather_code = data['current']['weather_code']
-                next_48h_precip = data['hourly']['precipitation'][:48]
-                hourly_weather_codes = data['hourly']['weather_code'][:48]
-                
-                day1_precip = next_48h_precip[:24]
-                day2_precip = next_48h_precip[24:48]
-                
-                day1_weather_codes = hourly_weather_codes[:24]
-                day2_weather_codes = hourly_weather_codes[24:48]
-            
-                rain_weather_codes = [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82, 95, 96, 99]
-                
-                day1_rain_chance = any(p > 0.1 for p in day1_precip)
-                day1_rain_hours = sum(1 for p in day1_precip if p > 0.1)
-                day1_has_rain_codes = any(code in rain_weather_codes for code in day1_weather_codes)
-                
-                day2_rain_chance = any(p > 0.1 for p in day2_precip)
-                day2_rain_hours = sum(1 for p in day2_precip if p > 0.1)
-                day2_has_rain_codes = any(code in rain_weather_codes for code in day2_weather_codes)
-            
-                forecast_data = {
-                    'next_48h': {
-                        'rain_chance': any(p > 0.1 for p in next_48h_precip) or any(code in rain_weather_codes for code in hourly_weather_codes),
-                        'rain_hours': sum(1 for p in next_48h_precip if p > 0.1),
-                        'max_precipitation': float(max(next_48h_precip)) if next_48h_precip else 0.0,
-                    },
-                    'day1': {
-                        'rain_chance': day1_rain_chance or day1_has_rain_codes,
-                        'rain_hours': day1_rain_hours,
-                        'max_precipitation': float(max(day1_precip)) if day1_precip else 0.0,
-                    },
-                    'day2': {
-                        'rain_chance': day2_rain_chance or day2_has_rain_codes,
-                        'rain_hours': day2_rain_hours,
-                        'max_precipitation': float(max(day2_precip)) if day2_precip else 0.0,
-                    }
-                }
-            
-                return WeatherData(
-                    temperature=data['current']['temperature_2m'],
-                    description=weather_codes.get(weather_code, "unknown weather"),
-                    forecast=forecast_data
-                )
-            else:
-                logger.warning(f"Weather API returned status code {response.status_code}: {response.text}")
-                return None
-        except requests.exceptions.RequestException as e:
-            retries += 1
-            logger.warning(f"Attempt {retries} failed: {str(e)}")
-            if retries < max_retries:
-                time.sleep(retry_delay * retries)  # Exponential backoff
-            else:
-                logger.error(f"Failed to fetch weather data after {max_retries} attempts: {str(e)}")
+                weather_breaker.record_success()
+                return response.json()
+            error = f"status code {response.status_code}: {response.text}"
+            if response.status_code != 429 and response.status_code < 500:
+                # Open-Meteo is up but rejects the request; retrying will not change that
+                weather_breaker.record_success()
+                logger.warning(f"Weather API returned {error}")
                 return None
+        weather_breaker.record_failure()
+        logger.warning(f"Weather API attempt {attempt} failed: {error}")
+        if attempt < max_retries:
+            await asyncio.sleep(backoff_delay(attempt, retry_delay))
+    logger.error(f"Failed to fetch weather data after {max_retries} attempts")
     return None
 
+
+async def fetch_weather_data(lat: float, lon: float, max_retries: Optional[int] = None,
+                             retry_delay: Optional[float] = None) -> Optional[WeatherData]:
+    """Fetch the current weather and forecast of a point from Open-Meteo"""
+    data = await request_forecast([lat], [lon], max_retries, retry_delay)
+    return parse_forecast(data) if data is not None else None
+
+
+async def fetch_weather_batch(cells: List[Tuple[int, int]]) -> Dict[Tuple[int, int], WeatherData]:
+    """
+    Fetch the forecasts of many grid cells from Open-Meteo
+
+    One multi-location request per WEATHER_BATCH_SIZE cells, sent concurrently;
+    cells of a chunk that failed are missing from the result.
+    """
+    async def fetch_chunk(chunk: List[Tuple[int, int]]) -> Dict[Tuple[int, int], WeatherData]:
+        centers = [cell_center(cell) for cell in chunk]
+        data = await request_forecast([c[0] for c in centers], [c[1] for c in centers])
+        if data is None:
+            return {}
+        # A single location comes back as an object, several as a list in request order
+        locations = data if isinstance(data, list) else [data]
+        try:
+            return dict(zip(chunk, parse_forecasts(locations)))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Unexpected weather data for {len(chunk)} locations: {str(e)}")
+            return {}
+
+    chunks = [cells[i:i + WEATHER_BATCH_SIZE] for i in range(0, len(cells), WEATHER_BATCH_SIZE)]
+    fetched = {}
+    for result in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+        fetched.update(result)
+    return fetched
+
+
+async def _refresh_weather_batch(cells: List[Tuple[int, int]]):
+    try:
+        for cell, weather in (await fetch_weather_batch(cells)).items():
+            _cache_weather(cell, weather)
+    finally:
+        for cell in cells:
+            weather_cache.end_refresh(cell)
+
+
+async def get_weather_batch(points: List[Tuple[float, float]]) -> List[Optional[WeatherData]]:
+    """
+    Weather of many points, in input order, through the weather cache
+
+    Points are de-duplicated by grid cell; cached cells are answered at once
+    (stale ones refreshed in one background batch) and the missing ones are
+    fetched with one multi-location request per chunk. A cell that could not
+    be fetched falls back on its last known forecast, else None.
+    """
+    cells = [weather_cell(lat, lon) for lat, lon in points]
+    weather_by_cell: Dict[Tuple[int, int], Optional[WeatherData]] = {}
+    missing, stale = [], []
+    for cell in dict.fromkeys(cells):
+        weather, fresh = weather_cache.get(cell)
+        weather_by_cell[cell] = weather
+        if weather is None:
+            missing.append(cell)
+        elif not fresh and weather_cache.start_refresh(cell):
+            stale.append(cell)
+
+    if stale:
+        _start_refresh(_refresh_weather_batch(stale))
+    if missing:
+        fetched = await fetch_weather_batch(missing)
+        for cell in missing:
+            if cell in fetched:
+                _cache_weather(cell, fetched[cell])
+                weather_by_cell[cell] = fetched[cell]
+            else:
+                weather_by_cell[cell] = weather_cache.last_known(cell)
+
+    return [weather_by_cell[cell] for cell in cells]
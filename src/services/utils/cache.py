@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger("Cache")
+
+# Every named cache registers itself here so its counters can be exported in one place
+_registry: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any):
+    """Register a cache (anything with a stats() method) under a metrics name"""
+    _registry[name] = cache
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the stats of every registered cache, keyed by name"""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600, name: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key, default=None):
+        """Get a value, refreshing its LRU position; expired entries count as misses"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries beyond max_size"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache with per-entry expiry, stored as JSON in a SQLite table.
+    With max_entries the table is bounded: writes past the limit evict expired rows
+    first, then the least recently used ones.
+    """
+
+    def __init__(self, path: str, table: str = "cache", ttl: float = 86400, max_entries: Optional[int] = None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL DEFAULT 0)"
+            )
+            # Tables created before LRU eviction lack the access time
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "accessed_at" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            if max_entries:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+            self._conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (time.time(),))
+        logger.info(f"Opened persistent cache {path}:{table}")
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            # Only bounded tables track recency, so unbounded ones stay read-only on lookups
+            if row is not None and self.max_entries:
+                with self._conn:
+                    self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            if self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """Delete rows past max_entries, expired ones first and then the least recently used (lock held)"""
+        excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY expires_at > ?, accessed_at LIMIT ?)",
+            (now, excess),
+        )
+        self.evictions += excess
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "path": self.path,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """An in-memory TTLCache in front of an optional persistent cache; disk hits are promoted to memory"""
+
+    def __init__(self, memory: TTLCache, persistent: Optional[SQLiteCache] = None, name: Optional[str] = None):
+        self.memory = memory
+        self.persistent = persistent
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: str, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        self.memory.set(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        memory_stats = self.memory.stats()
+        persistent_hits = self.persistent.hits if self.persistent is not None else 0
+        misses = self.persistent.misses if self.persistent is not None else memory_stats["misses"]
+        lookups = memory_stats["hits"] + persistent_hits + misses
+        return {
+            "hits": memory_stats["hits"] + persistent_hits,
+            "misses": misses,
+            "hit_ratio": round((lookups - misses) / lookups, 4) if lookups else 0.0,
+            "memory": memory_stats,
+            "persistent": self.persistent.stats() if self.persistent is not None else None,
+        }
+
+
+class StaleWhileRevalidateCache:
+    """
+    In-memory LRU cache whose entries go stale before they expire
+
+    Each entry is fresh until `fresh_until` and may still be served, stale,
+    until `stale_until` (both wall-clock times) while one caller refreshes it;
+    start_refresh() hands that job to a single caller per key. Entries past
+    their stale window are misses for get() but are kept until evicted, so
+    last_known() can still fall back on them while the upstream is down.
+    """
+
+    def __init__(self, max_size: int = 4096, name: Optional[str] = None):
+        self.max_size = max_size
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.last_known_hits = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key) -> Tuple[Any, bool]:
+        """(value, fresh) of a key; (None, False) when it is missing or past its stale window"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, fresh_until, stale_until = entry
+                if now < fresh_until:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value, True
+                if now < stale_until:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, False
+            self.misses += 1
+            return None, False
+
+    def last_known(self, key) -> Any:
+        """The last value stored for a key however old it is; None when it was never stored or was evicted"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self.last_known_hits += 1
+            return entry[0]
+
+    def set(self, key, value, fresh_until: float, stale_until: float):
+        with self._lock:
+            self._data[key] = (value, fresh_until, stale_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def start_refresh(self, key) -> bool:
+        """Claim the refresh of a key; False when another caller is already refreshing it"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "last_known_hits": self.last_known_hits,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from services.utils.cache import register_cache
+
+# Set up logging
+logger = logging.getLogger("CircuitBreaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream service that keeps failing
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    allow() turns callers away for `reset_timeout` seconds. Then a single
+    probe call is let through (half-open): its success closes the breaker,
+    its failure opens it for another `reset_timeout`. A probe that ends
+    without an outcome gives its slot back with release(); one that never
+    reports back is replaced by a new probe after `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: Optional[str] = None):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.name = name or "circuit"
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.short_circuits = 0
+        self._probing = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+        if name:
+            register_cache(name, self)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state only the one probe may"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and (not self._probing or now - self._probe_started_at >= self.reset_timeout):
+                self._probing = True
+                self._probe_started_at = now
+                return True
+            self.short_circuits += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name}: upstream recovered, closing")
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """End a call without an outcome (e.g. cancelled), so a half-open breaker lets the next probe through"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"{self.name}: {self.failures} consecutive failures, open for {self.reset_timeout:g}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.opens += 1
+                self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Open and not yet due for a probe"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opens": self.opens,
+            "short_circuits": self.short_circuits,
+        }
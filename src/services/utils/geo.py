@@ -0,0 +1,106 @@
+import math
+import numpy as np
+from typing import List, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+# Web Mercator cannot represent the poles; clamp like every slippy-map tile server does
+MAX_LATITUDE = 85.05112878
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances in kilometres from one point to arrays of points"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def lat_lon_to_tile(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Slippy-map (x, y) of the tile containing a point"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    n = 1 << zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile, the order Overpass bbox filters use"""
+    n = 1 << zoom
+
+    def tile_lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    return tile_lat(y + 1), west, tile_lat(y), east
+
+
+def tile_distance_km(lat: float, lon: float, x: int, y: int, zoom: int) -> float:
+    """Distance from a point to the closest point of a tile (0 inside it), across the antimeridian too"""
+    tile_south, tile_west, tile_north, tile_east = tile_bounds(x, y, zoom)
+    nearest_lat = min(max(lat, tile_south), tile_north)
+    # The point's longitude on the tile's side of the antimeridian
+    lon += 360.0 * round(((tile_west + tile_east) / 2 - lon) / 360.0)
+    nearest_lon = min(max(lon, tile_west), tile_east)
+    return haversine_km(lat, lon, nearest_lat, nearest_lon)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    """Bing-style quadkey of a tile; a tile's key is a prefix of all its children's keys"""
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digit = 0
+        if x & mask:
+            digit += 1
+        if y & mask:
+            digit += 2
+        digits.append(str(digit))
+    return "".join(digits)
+
+
+def circle_bounds(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of the box enclosing a circle"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return max(lat - dlat, -90.0), lon - dlon, min(lat + dlat, 90.0), lon + dlon
+
+
+def tiles_covering_circle(lat: float, lon: float, radius_km: float, zoom: int) -> List[Tuple[int, int]]:
+    """All tiles at a zoom level that intersect a circle; circles across the antimeridian wrap around"""
+    south, west, north, east = circle_bounds(lat, lon, radius_km)
+    _, min_y = lat_lon_to_tile(north, lon, zoom)
+    _, max_y = lat_lon_to_tile(south, lon, zoom)
+    n = 1 << zoom
+    if east - west >= 360.0:
+        columns = range(n)
+    else:
+        # The part of the box past one edge of the map continues at the other
+        min_x, _ = lat_lon_to_tile(0.0, (west + 180.0) % 360.0 - 180.0, zoom)
+        max_x, _ = lat_lon_to_tile(0.0, min((east + 180.0) % 360.0 - 180.0, 180.0 - 1e-9), zoom)
+        if min_x <= max_x:
+            columns = range(min_x, max_x + 1)
+        else:
+            columns = list(range(min_x, n)) + list(range(0, max_x + 1))
+
+    tiles = []
+    for x in columns:
+        for y in range(min_y, max_y + 1):
+            if tile_distance_km(lat, lon, x, y, zoom) <= radius_km:
+                tiles.append((x, y))
+    return tiles
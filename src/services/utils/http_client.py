@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+# Set up logging
+logger = logging.getLogger("HttpClient")
+
+# HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 keep-alive without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+USER_AGENT = "TouristApp/1.0"
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 10))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", 10))
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Closes of clients left behind by a previous event loop, referenced until they finish
+_closing: Set[asyncio.Task] = set()
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception as e:
+        # Connections of a loop that has already been closed cannot be shut down cleanly
+        logger.debug(f"Closing stale HTTP client: {type(e).__name__}: {str(e)}")
+
+
+def _discard_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+    """Close a client bound to another event loop: on that loop while it still runs, else on this one"""
+    if client.is_closed:
+        return
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop)
+        return
+    task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled async HTTP client, creating it on first use"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+
+    # A client is bound to the loop it was created on (tests and scripts may run several loops)
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if _client is not None:
+            _discard_client(_client, _client_loop)
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+        )
+        _client_loop = loop
+        _host_semaphores.clear()
+        logger.info(f"Created shared HTTP client (http2={HTTP2_AVAILABLE}, max_connections={MAX_CONNECTIONS})")
+    return _client
+
+
+def _get_host_semaphore(url: str) -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent requests to the host of a URL"""
+    host = urlsplit(url).netloc
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+async def fetch(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared client, respecting the per-host connection limit
+
+    Args:
+        method: HTTP method, e.g. "GET" or "POST"
+        url: Absolute URL to request
+        **kwargs: Passed through to httpx.AsyncClient.request (params, data, timeout, ...)
+
+    Returns:
+        The httpx response
+    """
+    client = get_http_client()
+    async with _get_host_semaphore(url):
+        return await client.request(method, url, **kwargs)
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Send a request whose body is read incrementally (response.aiter_bytes()) instead of all at once
+
+    The per-host slot is held until the body has been consumed or the block exits.
+    """
+    client = get_http_client()
+    async with _get_host_semaphore(url):
+        async with client.stream(method, url, **kwargs) as response:
+            yield response
+
+
+async def http_get(url: str, **kwargs) -> httpx.Response:
+    """Send a GET request through the shared client"""
+    return await fetch("GET", url, **kwargs)
+
+
+async def http_post(url: str, **kwargs) -> httpx.Response:
+    """Send a POST request through the shared client"""
+    return await fetch("POST", url, **kwargs)
+
+
+async def close_http_client():
+    """Close the shared client and release its pooled connections"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Shared HTTP client closed")
+    _client = None
+    _client_loop = None
+    _host_semaphores.clear()
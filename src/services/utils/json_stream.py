@@ -0,0 +1,162 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, List, Union
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_VALUE_TERMINATORS = frozenset(" \t\n\r,:]}")
+
+
+class JsonArrayStream:
+    """
+    Incremental parser for one array field of a top-level JSON object.
+
+    Feed it the response body chunk by chunk; every call returns the array items
+    completed so far, so the full document is never held in memory at once.
+    Other top-level fields are decoded normally and kept in `fields`.
+
+        stream = JsonArrayStream("elements")
+        for chunk in chunks:
+            for element in stream.feed(chunk):
+                ...
+        stream.close()
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.fields: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self._eof = False
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Any]:
+        """Add a chunk of the document and return the array items it completed"""
+        self._buffer += self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return self._parse()
+
+    def close(self) -> List[Any]:
+        """Signal the end of the document; raises ValueError if it was incomplete"""
+        self._buffer += self._utf8.decode(b"", final=True)
+        self._eof = True
+        items = self._parse()
+        if self._state != "done":
+            raise ValueError(f"Incomplete JSON document (stopped in state '{self._state}')")
+        return items
+
+    def _skip_whitespace(self):
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+
+    def _expect(self, char: str) -> bool:
+        """Consume `char`; False means more data is needed"""
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            return False
+        if self._buffer[self._pos] != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos}, found '{self._buffer[self._pos]}'")
+        self._pos += 1
+        return True
+
+    def _decode_value(self):
+        """Decode the next complete JSON value; (False, None) means more data is needed"""
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            return False, None
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise ValueError(f"Invalid JSON value at offset {self._pos}")
+            return False, None
+        # A number cut by a chunk boundary decodes as a shorter number ("0." -> 0), so only
+        # accept a value once the character after it is visible and ends it
+        if not self._eof and (end >= len(self._buffer) or self._buffer[end] not in _VALUE_TERMINATORS):
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _peek(self):
+        self._skip_whitespace()
+        return self._buffer[self._pos] if self._pos < len(self._buffer) else None
+
+    def _parse(self) -> List[Any]:
+        items = []
+        while True:
+            state = self._state
+            if state == "start":
+                if not self._expect("{"):
+                    break
+                self._state = "key"
+            elif state == "key":
+                char = self._peek()
+                if char is None:
+                    break
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                complete, key = self._decode_value()
+                if not complete:
+                    break
+                self._key = key
+                self._state = "colon"
+            elif state == "colon":
+                if not self._expect(":"):
+                    break
+                self._state = "array_start" if self._key == self.field else "value"
+            elif state == "value":
+                complete, value = self._decode_value()
+                if not complete:
+                    break
+                self.fields[self._key] = value
+                self._state = "next_key"
+            elif state == "next_key":
+                char = self._peek()
+                if char is None:
+                    break
+                self._pos += 1
+                if char == ",":
+                    self._state = "key"
+                elif char == "}":
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Expected ',' or '}}' at offset {self._pos - 1}, found '{char}'")
+            elif state == "array_start":
+                if not self._expect("["):
+                    break
+                self._state = "array_item"
+            elif state == "array_item":
+                char = self._peek()
+                if char is None:
+                    break
+                if char == "]":
+                    self._pos += 1
+                    self._state = "next_key"
+                    continue
+                complete, item = self._decode_value()
+                if not complete:
+                    break
+                items.append(item)
+                self._state = "array_next"
+            elif state == "array_next":
+                char = self._peek()
+                if char is None:
+                    break
+                self._pos += 1
+                if char == ",":
+                    self._state = "array_item"
+                elif char == "]":
+                    self._state = "next_key"
+                else:
+                    raise ValueError(f"Expected ',' or ']' at offset {self._pos - 1}, found '{char}'")
+            else:  # done
+                break
+
+        # Drop everything already consumed so memory stays bounded by one item
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return items
@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.utils.cache import register_cache
+
+# Set up logging
+logger = logging.getLogger("SemanticCache")
+
+_WORD = re.compile(r"\w+")
+# Words that carry no meaning of their own in a visitor's question; "not" and "no" are kept on purpose
+STOP_WORDS = frozenset(
+    "a an the is it its are was be do does can could would should i we my our me you your there "
+    "this that what which how of to in on at for and or any about tell please here".split()
+)
+# Weight of a character trigram relative to a whole word or word pair
+TRIGRAM_WEIGHT = 0.5
+
+
+def _content_words(text: str) -> List[str]:
+    """Words of a text without its stop words (all of them when it has nothing else)"""
+    words = _WORD.findall(text.casefold())
+    return [word for word in words if word not in STOP_WORDS] or words
+
+
+def _features(text: str):
+    """(feature, weight) pairs of a text: content words, adjacent word pairs and character trigrams of words"""
+    words = _content_words(text)
+    features = [(word, 1.0) for word in words]
+    features += [(f"{first} {second}", 1.0) for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [(padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+    return features
+
+
+def hash_embedding(text: str, dim: int = 256) -> np.ndarray:
+    """
+    Unit vector of a text's hashed word and character n-grams (signed feature hashing).
+    blake2b rather than hash() keeps vectors identical across processes.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[digest % dim] += weight if digest >> 63 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Scope:
+    """Vectors and answers cached for one scope, oldest first; the vector matrix grows by doubling up to capacity"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(4, capacity), dim), dtype=np.float32)
+        self.entries: List[Dict[str, Any]] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def remove(self, count: int):
+        """Drop the oldest entries"""
+        size = len(self.entries)
+        self.vectors[:size - count] = self.vectors[count:size]
+        del self.entries[:count]
+
+    def discard(self, index: int):
+        """Drop one entry, keeping the others oldest first"""
+        size = len(self.entries)
+        self.vectors[index:size - 1] = self.vectors[index + 1:size]
+        del self.entries[index]
+
+    def append(self, vector: np.ndarray, entry: Dict[str, Any]):
+        size = len(self.entries)
+        if size == len(self.vectors):
+            grown = np.zeros((min(2 * size, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+            grown[:size] = self.vectors
+            self.vectors = grown
+        self.vectors[size] = vector
+        self.entries.append(entry)
+
+
+class SemanticCache:
+    """
+    Answers looked up by the wording of a question rather than its exact text.
+
+    A hit also needs the same set of content words as the cached question, so the
+    cosine only forgives stop words and word order: questions differing in a single
+    word ("north side" / "south side") score high on their shared n-grams but miss,
+    and so do paraphrases that share no content words.
+
+    Entries are partitioned by a scope (e.g. a spot id): a lookup only compares the
+    question's embedding with the at most max_per_scope questions cached for that
+    scope, in one matrix-vector product, so its cost does not grow with the total
+    number of cached pairs. The best match at or above the cosine threshold with the same content words is a hit.
+    Scopes are evicted least recently used once max_entries is exceeded, and entries
+    expire after ttl seconds.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 100000, max_per_scope: int = 32,
+                 ttl: float = 21600, dim: int = 256, name: Optional[str] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_scope = max_per_scope
+        self.ttl = ttl
+        self.dim = dim
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Generation time of the answers served from cache instead of being generated again
+        self.seconds_saved = 0.0
+        self.lookup_seconds = 0.0
+        self._scopes: "OrderedDict[str, _Scope]" = OrderedDict()
+        self._lock = threading.Lock()
+        if name:
+            register_cache(name, self)
+
+    def get(self, scope: str, text: str, default=None):
+        """Cached answer to the closest question of a scope, or default when none is similar enough"""
+        start = time.perf_counter()
+        vector = hash_embedding(text, self.dim)
+        words = frozenset(_content_words(text))
+        with self._lock:
+            entries = self._scopes.get(scope)
+            match = None
+            if entries is not None:
+                self._expire(scope, entries)
+            if entries is not None and len(entries):
+                similarities = entries.vectors[:len(entries)] @ vector
+                for best in np.argsort(-similarities):
+                    if similarities[best] < self.threshold:
+                        break
+                    if entries.entries[best]["words"] == words:
+                        match = entries.entries[best]
+                        self._scopes.move_to_end(scope)
+                        break
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.seconds_saved += match["cost"]
+            self.lookup_seconds += time.perf_counter() - start
+        return default if match is None else match["value"]
+
+    def set(self, scope: str, text: str, value, cost: float = 0.0):
+        """Cache the answer to a question of a scope; cost is the seconds the answer took to generate"""
+        vector = hash_embedding(text, self.dim)
+        entry = {"text": text, "words": frozenset(_content_words(text)), "value": value, "cost": cost,
+                 "created_at": time.monotonic()}
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is not None:
+                self._expire(scope, entries)
+                entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = _Scope(self.dim, self.max_per_scope)
+            else:
+                self._scopes.move_to_end(scope)
+                # A new answer to a question already cached (e.g. regenerated) replaces the old one
+                similarities = entries.vectors[:len(entries)] @ vector
+                for index in reversed(range(len(entries))):
+                    if similarities[index] >= self.threshold and entries.entries[index]["words"] == entry["words"]:
+                        entries.discard(index)
+                        self.size -= 1
+                if len(entries) >= self.max_per_scope:
+                    entries.remove(1)
+                    self.size -= 1
+                    self.evictions += 1
+            entries.append(vector, entry)
+            self.size += 1
+            while self.size > self.max_entries and len(self._scopes) > 1:
+                _, evicted = self._scopes.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += len(evicted)
+
+    def _expire(self, scope: str, entries: _Scope):
+        """Drop the expired entries of a scope, which are its oldest (lock held)"""
+        deadline = time.monotonic() - self.ttl
+        expired = 0
+        while expired < len(entries) and entries.entries[expired]["created_at"] <= deadline:
+            expired += 1
+        if expired:
+            entries.remove(expired)
+            self.size -= expired
+            if not len(entries):
+                del self._scopes[scope]
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from services.utils.cache import register_cache
+
+# Latency samples kept per endpoint for the percentiles on /metrics
+LATENCY_SAMPLES = 1024
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    """One Server-Sent Event carrying a JSON payload"""
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def _percentiles(samples) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2] * 1000, 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+    }
+
+
+class _EndpointLatency:
+    def __init__(self, samples: int):
+        self.streams = 0
+        self.generated = 0
+        self.errors = 0
+        self.first_token: Deque[float] = deque(maxlen=samples)
+        self.total: Deque[float] = deque(maxlen=samples)
+
+
+class StreamTimer:
+    """Formats the events of one streamed answer and times its first token and its end"""
+
+    def __init__(self, latency: "StreamLatency", endpoint: str):
+        self.latency = latency
+        self.endpoint = endpoint
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def token(self, text: str) -> str:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return sse_event({"type": "token", "text": text})
+
+    def done(self, generated: bool) -> str:
+        """Closing event; generated is False for answers known up front (cached or computed locally)"""
+        now = time.perf_counter()
+        first_token = (self.first_token_at or now) - self.started_at
+        self.latency.record(self.endpoint, first_token, now - self.started_at, generated)
+        return sse_event({"type": "done", "generated": generated, "first_token_ms": round(first_token * 1000, 1)})
+
+    def error(self, status_code: int, detail: str) -> str:
+        self.latency.record_error(self.endpoint)
+        return sse_event({"type": "error", "status_code": status_code, "detail": detail})
+
+
+class StreamLatency:
+    """
+    Time to first token and total time of streamed answers, per endpoint.
+
+    Time to first token is what a reader of a streamed answer waits for, so the
+    percentiles cover generated answers only; cached ones are only counted.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES, name: Optional[str] = None):
+        self.samples = samples
+        self._endpoints: Dict[str, _EndpointLatency] = {}
+        self._lock = threading.Lock()
+        if name:
+            register_cache(name, self)
+
+    def start(self, endpoint: str) -> StreamTimer:
+        return StreamTimer(self, endpoint)
+
+    def _endpoint(self, endpoint: str) -> _EndpointLatency:
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _EndpointLatency(self.samples)
+        return self._endpoints[endpoint]
+
+    def record(self, endpoint: str, first_token: float, total: float, generated: bool):
+        with self._lock:
+            latency = self._endpoint(endpoint)
+            latency.streams += 1
+            if generated:
+                latency.generated += 1
+                latency.first_token.append(first_token)
+                latency.total.append(total)
+
+    def record_error(self, endpoint: str):
+        with self._lock:
+            self._endpoint(endpoint).errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "streams": latency.streams,
+                    "generated": latency.generated,
+                    "errors": latency.errors,
+                    "first_token_ms": _percentiles(latency.first_token),
+                    "total_ms": _percentiles(latency.total),
+                }
+                for endpoint, latency in self._endpoints.items()
+            }
+
+
+# Shared by every streaming endpoint, exported on /metrics as "llm_streams"
+stream_latency = StreamLatency(name="llm_streams")
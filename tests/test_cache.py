@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.utils.cache import TTLCache, SQLiteCache, TieredCache
+from services.spot_searching_page import geocode_service
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class TestCaches(unittest.TestCase):
+    """Test cases for the in-memory and persistent caches"""
+
+    def test_01_lru_eviction(self):
+        """Least recently used entries are evicted first"""
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_02_ttl_expiry(self):
+        """Expired entries are reported as misses"""
+        cache = TTLCache(max_size=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_03_persistent_tier_survives_restart(self):
+        """Values written through a TieredCache are found by a fresh cache on the same file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            first = TieredCache(TTLCache(), SQLiteCache(path, table="geocode"))
+            first.set("paris", {"lat": 48.85, "lon": 2.35})
+            first.persistent.close()
+
+            second = TieredCache(TTLCache(), SQLiteCache(path, table="geocode"))
+            self.assertEqual(second.get("paris"), {"lat": 48.85, "lon": 2.35})
+            self.assertEqual(second.stats()["hits"], 1)
+            # Promoted into memory on the first lookup
+            self.assertEqual(second.memory.get("paris"), {"lat": 48.85, "lon": 2.35})
+            second.persistent.close()
+
+    def test_04_persistent_lru_eviction(self):
+        """A bounded SQLite cache evicts the least recently read rows"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SQLiteCache(os.path.join(directory, "cache.sqlite"), table="descriptions", max_entries=2)
+            cache.set("a", "first")
+            cache.set("b", "second")
+            cache.get("a")
+            cache.set("c", "third")
+            self.assertEqual(cache.get("a"), "first")
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.stats()["evictions"], 1)
+            cache.close()
+
+    def test_05_existing_table_migrated(self):
+        """Tables written before LRU eviction gain an access time and keep their rows"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            conn = sqlite3.connect(path)
+            with conn:
+                conn.execute("CREATE TABLE geocode (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+                conn.execute("INSERT INTO geocode VALUES (?, ?, ?)", ("paris", "[48.85, 2.35]", time.time() + 60))
+            conn.close()
+
+            cache = SQLiteCache(path, table="geocode", max_entries=1)
+            self.assertEqual(cache.get("paris"), [48.85, 2.35])
+            cache.set("lyon", [45.76, 4.84])
+            self.assertIsNone(cache.get("paris"))
+            cache.close()
+
+    def test_06_ttl_reaches_persistent_tier(self):
+        """A per-entry TTL given to a TieredCache also bounds the row on disk"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TieredCache(TTLCache(ttl=60), SQLiteCache(os.path.join(directory, "cache.sqlite"), table="geocode"))
+            cache.set("paris", [48.85, 2.35], ttl=0.01)
+            time.sleep(0.02)
+            self.assertIsNone(cache.persistent.get("paris"))
+            self.assertIsNone(cache.get("paris"))
+            cache.persistent.close()
+
+
+class TestGeocodeCache(unittest.TestCase):
+    """Test cases for the geocode cache in front of Nominatim"""
+
+    def setUp(self):
+        geocode_service.geocode_cache.clear()
+
+    def test_01_normalize_location(self):
+        self.assertEqual(geocode_service.normalize_location("  Paris,   FRANCE "), "paris france")
+        self.assertEqual(geocode_service.normalize_location("Paris France"), "paris france")
+
+    def test_02_repeated_lookups_hit_cache(self):
+        """Equivalent spellings of a location trigger a single Nominatim request"""
+        response = FakeResponse(200, [{"lat": "48.8566", "lon": "2.3522", "display_name": "Paris, France"}])
+        with mock.patch.object(geocode_service, "http_get", mock.AsyncMock(return_value=response)) as http_get:
+            first = asyncio.run(geocode_service.geocode_location("Paris, France"))
+            second = asyncio.run(geocode_service.geocode_location("paris france"))
+
+        self.assertEqual(http_get.await_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first["country"], "France")
+
+    def test_03_unknown_location_not_cached(self):
+        with mock.patch.object(geocode_service, "http_get", mock.AsyncMock(return_value=FakeResponse(200, []))) as http_get:
+            self.assertIsNone(asyncio.run(geocode_service.geocode_location("Nowhere")))
+            self.assertIsNone(asyncio.run(geocode_service.geocode_location("Nowhere")))
+        self.assertEqual(http_get.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.models import PlaceDescriptionRequest, WeatherData
+from services.spot_searching_page import description_service
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def description_request(temperature=12.0, description="slight rain", **fields):
+    spot = {"spot_id": "node/1", "spot_name": "Louvre", "spot_category": "museum", "location": "Paris, France", "country": "France"}
+    spot.update(fields)
+    return PlaceDescriptionRequest(weather_data=WeatherData(temperature=temperature, description=description, forecast={}), **spot)
+
+
+class TestDescriptionCache(unittest.TestCase):
+    """Test cases for the content-addressed cache of generated descriptions"""
+
+    def setUp(self):
+        description_service.description_cache.clear()
+        self.key_manager = mock.Mock()
+        self.key_manager.chat_completion = mock.AsyncMock(side_effect=[completion("First"), completion("Second")])
+        patcher = mock.patch.object(description_service, "get_key_manager", return_value=self.key_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate(self, request):
+        return asyncio.run(description_service.generate_description(request))
+
+    def test_01_weather_bucket(self):
+        bucket = description_service.weather_bucket
+        self.assertEqual(bucket(WeatherData(temperature=12.4, description="moderate rain showers", forecast={})), "rainy, 10 to 15°C")
+        self.assertEqual(bucket(WeatherData(temperature=-0.5, description="thunderstorm with slight hail", forecast={})), "stormy, -5 to 0°C")
+        self.assertEqual(bucket(None), "unknown")
+
+    def test_02_same_spot_and_weather_bucket_generated_once(self):
+        """Requests differing only within a weather bucket or in whitespace share a description"""
+        first = self.generate(description_request(temperature=11.0, description="slight rain"))
+        second = self.generate(description_request(temperature=14.2, description="heavy rain", spot_name=" Louvre  "))
+        self.assertEqual((first, second), ("First", "First"))
+        self.assertEqual(self.key_manager.chat_completion.await_count, 1)
+        self.assertEqual(description_service.description_cache.stats()["hits"], 1)
+
+    def test_03_other_weather_bucket_generated_again(self):
+        self.generate(description_request(temperature=12.0))
+        self.assertEqual(self.generate(description_request(temperature=22.0)), "Second")
+        self.assertEqual(self.key_manager.chat_completion.await_count, 2)
+
+    def test_04_fresh_bypasses_and_replaces_cache(self):
+        self.generate(description_request())
+        self.assertEqual(self.generate(description_request(fresh=True)), "Second")
+        self.assertEqual(self.generate(description_request()), "Second")
+        self.assertEqual(self.key_manager.chat_completion.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
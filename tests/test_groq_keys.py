@@ -0,0 +1,158 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from api_manager import api_manager
+from api_manager.api_manager import GroqKeyManager, KeyPoolTimeout, get_key_manager, parse_reset
+from fake_groq_server import FakeGroqServer
+
+MESSAGES = [{"role": "user", "content": "Describe the Louvre."}]
+
+
+class TestGroqKeyPool(unittest.TestCase):
+    """Test cases for the async Groq key pool against a local fake Groq API"""
+
+    def complete(self, pool, count):
+        async def run():
+            return await asyncio.gather(*(pool.chat_completion(MESSAGES, model="fake", max_tokens=20) for _ in range(count)))
+        return asyncio.run(run())
+
+    def test_01_reset_headers_parsed(self):
+        self.assertAlmostEqual(parse_reset("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_reset("7.66s"), 7.66)
+        self.assertAlmostEqual(parse_reset("120ms"), 0.12)
+        self.assertEqual(parse_reset("3"), 3.0)
+        self.assertIsNone(parse_reset(None))
+
+    def test_02_key_with_most_headroom_chosen(self):
+        pool = GroqKeyManager(["a", "b", "c"])
+        now = time.monotonic()
+        pool.keys[0].remaining_requests, pool.keys[0].requests_reset_at = 2, now + 60
+        pool.keys[1].remaining_requests, pool.keys[1].requests_reset_at = 9, now + 60
+        pool.keys[2].cooldown_until = now + 60
+
+        async def acquire_twice():
+            return [(await pool._acquire(10)).index for _ in range(2)]
+
+        self.assertEqual(asyncio.run(acquire_twice()), [1, 1])
+        self.assertEqual((pool.keys[1].in_flight, pool.keys[1].reserved_tokens), (2, 20))
+
+    def test_03_scheduled_429s_fail_over_to_other_keys(self):
+        with FakeGroqServer(delay=0.01, requests_per_window=100, outages={"a": [(0, 60)]}) as server:
+            pool = GroqKeyManager(["a", "b"], base_url=server.base_url)
+            completions = self.complete(pool, 10)
+            first_burst = server.rate_limited["a"]
+            completions += self.complete(pool, 10)
+        self.assertEqual({completion.choices[0].message.content for completion in completions}, {"Answer from b"})
+        # Key a is cooling down for the rest of the outage: only the first burst, sent before any 429, hit it
+        self.assertLessEqual(first_burst, 5)
+        self.assertEqual(server.rate_limited["a"], first_burst)
+        self.assertTrue(pool.stats()["keys"][0]["cooling_down"])
+
+    def test_04_completions_queue_for_headroom_without_blocking(self):
+        with FakeGroqServer(delay=0.01, requests_per_window=4, window=0.3) as server:
+            pool = GroqKeyManager(["a"], base_url=server.base_url, concurrency=8)
+            self.complete(pool, 1)
+            ticks = 0
+
+            async def run():
+                nonlocal ticks
+                done = False
+
+                async def ticker():
+                    nonlocal ticks
+                    while not done:
+                        ticks += 1
+                        await asyncio.sleep(0.01)
+
+                task = asyncio.create_task(ticker())
+                results = await asyncio.gather(*(pool.chat_completion(MESSAGES, model="fake", max_tokens=20) for _ in range(10)))
+                done = True
+                await task
+                return results
+
+            start = time.perf_counter()
+            completions = asyncio.run(run())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(completions), 10)
+        # 11 completions at 4 per 0.3 s window span at least two window rollovers
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertGreater(pool.waits, 0)
+        self.assertGreaterEqual(ticks, elapsed / 0.02)
+
+    def test_05_queue_timeout_when_no_key_recovers(self):
+        pool = GroqKeyManager(["a"], queue_timeout=0.05)
+        pool.keys[0].cooldown_until = time.monotonic() + 60
+        with self.assertRaises(KeyPoolTimeout):
+            asyncio.run(pool.chat_completion(MESSAGES, model="fake"))
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+
+class TestSharedKeyPool(unittest.TestCase):
+    """Test cases for sharing the key pool's rate-limit state across services, threads and workers"""
+
+    def test_01_one_pool_per_process(self):
+        with mock.patch.dict(os.environ, {"GROQ_API_KEY": "a", "GROQ_API_KEY_1": "b"}), \
+                mock.patch.object(api_manager, "_key_manager", None):
+            pool = get_key_manager()
+            self.assertIs(get_key_manager(), pool)
+            self.assertEqual(pool.api_keys[:2], ["a", "b"])
+
+    def test_02_cooldown_shared_between_worker_processes(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                FakeGroqServer(delay=0.01, requests_per_window=100, outages={"a": [(0, 60)]}) as server:
+            path = os.path.join(directory, "cooldowns.db")
+            # Two pools on one cooldown table stand in for two uvicorn workers
+            worker_1 = GroqKeyManager(["a", "b"], base_url=server.base_url, cooldown_path=path, cooldown_sync=0)
+            worker_2 = GroqKeyManager(["a", "b"], base_url=server.base_url, cooldown_path=path, cooldown_sync=0)
+            asyncio.run(worker_1.chat_completion(MESSAGES, model="fake"))
+            asyncio.run(worker_1.chat_completion(MESSAGES, model="fake"))
+            self.assertEqual(server.rate_limited["a"], 1)
+
+            async def burst():
+                return await asyncio.gather(*(worker_2.chat_completion(MESSAGES, model="fake") for _ in range(5)))
+            completions = asyncio.run(burst())
+
+        self.assertEqual({completion.choices[0].message.content for completion in completions}, {"Answer from b"})
+        self.assertEqual(server.rate_limited["a"], 1)
+        self.assertTrue(worker_2.stats()["keys"][0]["cooling_down"])
+
+    def test_03_pool_used_from_several_threads(self):
+        with FakeGroqServer(delay=0.01, requests_per_window=1000) as server:
+            pool = GroqKeyManager(["a", "b"], base_url=server.base_url, concurrency=2)
+            errors = []
+
+            def worker():
+                async def run():
+                    await asyncio.gather(*(pool.chat_completion(MESSAGES, model="fake") for _ in range(10)))
+                try:
+                    asyncio.run(run())
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        stats = pool.stats()
+        self.assertEqual(sum(key["requests"] for key in stats["keys"]), 40)
+        self.assertEqual([key["in_flight"] for key in stats["keys"]], [0, 0])
+        self.assertLessEqual(server.max_in_flight, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.utils.json_stream import JsonArrayStream
+
+
+DOCUMENT = {
+    "version": 0.6,
+    "osm3s": {"copyright": "The data included in this document is from www.openstreetmap.org."},
+    "elements": [
+        {"type": "node", "id": 1, "lat": 48.8566, "lon": 2.3522, "tags": {"name": "Café de Flore", "amenity": "cafe"}},
+        {"type": "way", "id": 2, "center": {"lat": 48.86, "lon": 2.33}, "nodes": [1, 2, 3], "tags": {"name": "Jardin"}},
+        {"type": "node", "id": 123456789, "lat": -0.5, "lon": 1e-3},
+    ],
+    "remark": "runtime error: Query timed out",
+}
+
+
+def parse_in_chunks(text, size):
+    data = text.encode("utf-8")
+    stream = JsonArrayStream("elements")
+    items = []
+    for start in range(0, len(data), size):
+        items.extend(stream.feed(data[start:start + size]))
+    items.extend(stream.close())
+    return items, stream.fields
+
+
+class TestJsonArrayStream(unittest.TestCase):
+    """Test cases for the incremental Overpass response parser"""
+
+    def test_01_any_chunking_gives_same_result(self):
+        """Splits inside numbers, strings and multi-byte characters are handled"""
+        text = json.dumps(DOCUMENT, indent=2, ensure_ascii=False)
+        for size in (1, 2, 3, 7, 64, len(text) * 2):
+            items, fields = parse_in_chunks(text, size)
+            self.assertEqual(items, DOCUMENT["elements"], f"chunk size {size}")
+            self.assertEqual(fields["version"], 0.6)
+            self.assertEqual(fields["remark"], DOCUMENT["remark"])
+
+    def test_02_items_are_returned_as_they_complete(self):
+        stream = JsonArrayStream("elements")
+        self.assertEqual(stream.feed('{"elements": [{"id": 1}, {"id"'), [{"id": 1}])
+        self.assertEqual(stream.feed(': 2}]}'), [{"id": 2}])
+        self.assertEqual(stream.close(), [])
+
+    def test_03_empty_array(self):
+        items, fields = parse_in_chunks('{"elements": []}', 4)
+        self.assertEqual(items, [])
+
+    def test_04_truncated_document_raises(self):
+        stream = JsonArrayStream("elements")
+        stream.feed('{"elements": [{"id": 1}, {"id": 2')
+        with self.assertRaises(ValueError):
+            stream.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
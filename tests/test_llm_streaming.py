@@ -0,0 +1,127 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from api_manager.api_manager import GroqKeyManager
+from fake_groq_server import STREAM_TEXT, FakeGroqServer
+from models.models import AskQuestionRequest, PlaceDescriptionRequest, WeatherData
+from services.spot_searching_page import description_service, question_service
+from services.utils.sse import StreamLatency
+
+MESSAGES = [{"role": "user", "content": "When does the gallery open?"}]
+
+
+def collect(stream):
+    async def run():
+        return [item async for item in stream]
+    return asyncio.run(run())
+
+
+def parse_events(lines):
+    return [json.loads(line[len("data: "):]) for line in lines]
+
+
+class TestStreamingKeyPool(unittest.TestCase):
+    """Test cases for streaming completions through the key pool"""
+
+    def test_01_stream_resumed_on_another_key_when_it_breaks_off(self):
+        with FakeGroqServer(delay=0.01, stream_drops={"a": 3}) as server:
+            pool = GroqKeyManager(["a", "b"], base_url=server.base_url)
+            # Key a has the most headroom, so the stream starts there
+            pool.keys[1].remaining_requests, pool.keys[1].requests_reset_at = 1, float("inf")
+            chunks = collect(pool.stream_completion(MESSAGES, model="fake", max_tokens=50))
+
+        self.assertEqual("".join(chunks), STREAM_TEXT)
+        self.assertEqual(server.request_counts, {"a": 1, "b": 1})
+        stats = pool.stats()
+        self.assertEqual(stats["stream_failovers"], 1)
+        self.assertEqual([key["in_flight"] for key in stats["keys"]], [0, 0])
+
+    def test_02_rate_limited_stream_fails_over(self):
+        with FakeGroqServer(delay=0.01, outages={"a": [(0, 60)]}) as server:
+            pool = GroqKeyManager(["a", "b"], base_url=server.base_url)
+            chunks = collect(pool.stream_completion(MESSAGES, model="fake"))
+            chunks += collect(pool.stream_completion(MESSAGES, model="fake"))
+
+        self.assertEqual("".join(chunks), STREAM_TEXT * 2)
+        self.assertLessEqual(server.rate_limited["a"], 1)
+        self.assertEqual(server.request_counts, {"b": 2})
+
+    def test_03_stopping_early_releases_the_key(self):
+        with FakeGroqServer(delay=0.01, token_delay=0.01) as server:
+            pool = GroqKeyManager(["a"], base_url=server.base_url)
+
+            async def first_chunk():
+                stream = pool.stream_completion(MESSAGES, model="fake")
+                chunk = await stream.__anext__()
+                await stream.aclose()
+                return chunk
+
+            self.assertEqual(asyncio.run(first_chunk()), "The")
+        self.assertEqual(pool.stats()["keys"][0]["in_flight"], 0)
+
+
+class TestStreamingEndpoints(unittest.TestCase):
+    """Test cases for the SSE streams of descriptions and answers"""
+
+    def setUp(self):
+        self.server = FakeGroqServer(delay=0.01).start()
+        self.addCleanup(self.server.stop)
+        self.pool = GroqKeyManager(["a"], base_url=self.server.base_url)
+        self.latency = StreamLatency()
+        description_service.description_cache.clear()
+        question_service.answer_cache.clear()
+        for module in (description_service, question_service):
+            for name, value in (("get_key_manager", mock.Mock(return_value=self.pool)), ("stream_latency", self.latency)):
+                patcher = mock.patch.object(module, name, value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+    def test_01_description_streamed_then_served_from_cache(self):
+        request = PlaceDescriptionRequest(spot_id="node/1", spot_name="Louvre", spot_category="museum",
+                                          location="Paris", country="France")
+        first = parse_events(collect(description_service.stream_description(request)))
+        second = parse_events(collect(description_service.stream_description(request)))
+
+        self.assertGreater(len(first), 3)
+        self.assertEqual("".join(event["text"] for event in first if event["type"] == "token"), STREAM_TEXT)
+        self.assertEqual(first[-1]["type"], "done")
+        self.assertTrue(first[-1]["generated"])
+        self.assertEqual([event["type"] for event in second], ["token", "done"])
+        self.assertEqual(second[0]["text"], STREAM_TEXT)
+        self.assertFalse(second[-1]["generated"])
+
+        stats = self.latency.stats()["generate_description"]
+        self.assertEqual((stats["streams"], stats["generated"], stats["errors"]), (2, 1, 0))
+        self.assertLessEqual(stats["first_token_ms"]["p50"], stats["total_ms"]["p50"])
+
+    def test_02_weather_answer_sent_as_one_token(self):
+        weather = WeatherData(temperature=18.0, description="clear sky", forecast={
+            "day1": {"rain_chance": False, "rain_hours": 0, "max_precipitation": 0.0}})
+        request = AskQuestionRequest(spot_id="node/1", spot_name="Louvre", spot_category="museum", location="Paris",
+                                     country="France", question="Will it rain?", weather_data=weather)
+        events = parse_events(collect(question_service.stream_question(request)))
+        self.assertEqual([event["type"] for event in events], ["token", "done"])
+        self.assertIn("No rain is expected", events[0]["text"])
+        self.assertEqual(self.server.request_counts, {})
+
+    def test_03_failure_ends_stream_with_error_event(self):
+        request = AskQuestionRequest(spot_id="node/1", spot_name="Louvre", spot_category="museum",
+                                     location="Paris", country="France", question="Is it open late?")
+        with mock.patch.object(self.pool, "stream_completion", side_effect=ValueError("boom")):
+            events = parse_events(collect(question_service.stream_question(request)))
+        self.assertEqual(events[-1]["type"], "error")
+        self.assertEqual(events[-1]["status_code"], 500)
+        self.assertEqual(self.latency.stats()["ask_question"]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.spot_searching_page import overpass_service
+from services.spot_searching_page.offline_index import OfflinePoiIndex
+
+
+def point(osm_id, lat, lon, **tags):
+    return {"type": "Feature", "id": osm_id, "properties": tags, "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+
+
+EXTRACT = {
+    "type": "FeatureCollection",
+    "bbox": [2.0, 48.6, 2.7, 49.1],
+    "features": [
+        point("node/1", 48.8584, 2.2945, tourism="attraction", name="Eiffel Tower"),
+        point("node/2", 48.8606, 2.3376, tourism="museum", name="Louvre"),
+        point("n3", 48.8530, 2.3499, historic="monument", name="Notre-Dame"),
+        point("node/4", 48.8600, 2.3400, shop="bakery", name="Boulangerie"),
+        point("node/5", 48.8610, 2.3410, tourism="attraction"),
+        {
+            "type": "Feature", "id": "way/6",
+            "properties": {"leisure": "park", "name": "Jardin"},
+            "geometry": {"type": "Polygon", "coordinates": [[[2.33, 48.84], [2.34, 48.84], [2.34, 48.85], [2.33, 48.84]]]},
+        },
+    ],
+}
+
+
+class TestOfflinePoiIndex(unittest.TestCase):
+    """Test cases for answering POI searches from a local OSM extract"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".geojson")
+        with os.fdopen(handle, "w") as f:
+            json.dump(EXTRACT, f)
+        self.index = OfflinePoiIndex()
+        self.index.load(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_01_only_catalog_matches_are_indexed(self):
+        """Unnamed elements and categories outside the catalog (shop=bakery) are skipped"""
+        self.assertEqual(self.index.elements, 4)
+        primary = list(self.index.query("primary", 48.8566, 2.3522, 10))
+        secondary = list(self.index.query("secondary", 48.8566, 2.3522, 10))
+        self.assertEqual([e["id"] for e in primary], [1])
+        self.assertEqual(sorted(e["id"] for e in secondary), [2, 3, 6])
+        way = next(e for e in secondary if e["type"] == "way")
+        self.assertIn("center", way)
+
+    def test_02_radius_is_exact(self):
+        nearby = list(self.index.query("secondary", 48.8530, 2.3499, 0.5))
+        self.assertEqual([e["id"] for e in nearby], [3])
+
+    def test_03_coverage_follows_extract_bbox(self):
+        self.assertTrue(self.index.covers(48.8566, 2.3522, 10))
+        self.assertFalse(self.index.covers(48.8566, 2.3522, 40))
+        self.assertFalse(self.index.covers(45.76, 4.83, 5))
+
+    def test_04_offline_backend_falls_back_to_overpass_outside_extract(self):
+        queries = []
+
+        async def stream_elements(query, timeout_seconds):
+            queries.append(query)
+            yield {"type": "node", "id": 99, "lat": 45.76, "lon": 4.83, "tags": {"tourism": "attraction", "name": "Fourviere"}}
+
+        overpass_service.poi_tile_cache.clear()
+        with mock.patch.object(overpass_service, "POI_BACKEND", "offline"), \
+                mock.patch.object(overpass_service, "get_offline_index", return_value=self.index), \
+                mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            inside = asyncio.run(overpass_service.fetch_pois("primary", 48.8566, 2.3522, 10, 25))
+            outside = asyncio.run(overpass_service.fetch_pois("primary", 45.76, 4.83, 5, 25))
+
+        self.assertEqual([e["id"] for e in inside], [1])
+        self.assertEqual([e["id"] for e in outside], [99])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((self.index.hits, self.index.fallbacks), (1, 1))
+
+    def test_05_features_without_id_do_not_collide(self):
+        """Features lacking an OSM id get negative ids that clash neither with OSM ids nor across extracts"""
+        def unnamed_id(lat, lon, name):
+            feature = point(None, lat, lon, tourism="attraction", name=name)
+            del feature["id"]
+            return feature
+
+        paths = []
+        for features in ([unnamed_id(48.85, 2.30, "Pont"), unnamed_id(48.86, 2.31, "Quai")],
+                         [unnamed_id(48.87, 2.32, "Square"), unnamed_id(48.86, 2.31, "Quai")]):
+            handle, path = tempfile.mkstemp(suffix=".geojson")
+            with os.fdopen(handle, "w") as f:
+                json.dump({"type": "FeatureCollection", "features": features}, f)
+            self.addCleanup(os.remove, path)
+            self.index.load(path)
+
+        seen = overpass_service.ElementIndex()
+        kept = [e for e in self.index.query("primary", 48.8566, 2.3522, 10) if seen.add(e)]
+        self.assertEqual(sorted(e["tags"]["name"] for e in kept), ["Eiffel Tower", "Pont", "Quai", "Square"])
+        self.assertTrue(all(e["id"] < 0 for e in kept if e["tags"]["name"] != "Eiffel Tower"))
+
+
+if __name__ == "__main__":
+    unittest.main()
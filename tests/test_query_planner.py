@@ -0,0 +1,170 @@
+import unittest
+import asyncio
+import os
+import sys
+from contextlib import aclosing
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.models import SearchRequest
+from services.spot_searching_page import overpass_service, poi_engine, query_planner
+from services.utils.geo import lat_lon_to_tile, tiles_covering_circle
+
+
+def node(element_id, lat, lon, **tags):
+    tags = tags or {"tourism": "attraction"}
+    tags.setdefault("name", f"Spot {element_id}")
+    return {"type": "node", "id": element_id, "lat": lat, "lon": lon, "tags": tags}
+
+
+class TestQueryPlanner(unittest.TestCase):
+    """Test cases for splitting large Overpass fetches into ranked sub-queries"""
+
+    def setUp(self):
+        self.center = lat_lon_to_tile(48.8566, 2.3522, 13)
+        self.tiles = tiles_covering_circle(48.8566, 2.3522, 50, 13)
+
+    def test_01_sparse_search_is_one_query(self):
+        plan = query_planner.plan_subqueries(self.center, self.tiles, tile_density=0.5)
+        self.assertEqual(len(plan), 1)
+        self.assertIsNone(plan[0].category_cap)
+        query = overpass_service.build_overpass_query("primary", ["(1,2,3,4)"], 25)
+        self.assertTrue(query.endswith("out body center;"))
+
+    def test_02_dense_search_splits_into_rings_nearest_first(self):
+        plan = query_planner.plan_subqueries(self.center, self.tiles, tile_density=100, target=2000)
+        self.assertGreater(len(plan), 3)
+        self.assertIn(self.center, plan[0].tiles)
+
+        covered = set()
+        for subquery in plan:
+            self.assertLessEqual(len(subquery.rectangles), 4)
+            self.assertFalse(covered & subquery.tiles)
+            covered |= subquery.tiles
+        self.assertTrue(set(self.tiles) <= covered)
+
+        def distance(subquery):
+            return min(max(abs(x - self.center[0]), abs(y - self.center[1])) for x, y in subquery.tiles)
+        self.assertEqual([distance(subquery) for subquery in plan], sorted(distance(subquery) for subquery in plan))
+
+    def test_03_capped_query_limits_each_category(self):
+        query = overpass_service.build_overpass_query("primary", ["(1,2,3,4)", "(5,6,7,8)"], 25, category_cap=300)
+        self.assertEqual(query.count("out body center qt 300;"), len(overpass_service.POI_CATALOG["primary"]))
+        self.assertIn('node["tourism"="hotel"](5,6,7,8);', query)
+
+    def test_04_outer_rings_skipped_when_consumer_stops(self):
+        queries = []
+
+        async def stream_elements(query, timeout_seconds):
+            queries.append(query)
+            yield node(len(queries), 48.8566, 2.3522)
+            await asyncio.sleep(0.05)
+
+        async def first_only():
+            async with aclosing(overpass_service.iter_pois("primary", 48.8566, 2.3522, 30, 25)) as elements:
+                async for element in elements:
+                    break
+
+        overpass_service.poi_tile_cache.clear()
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements), \
+                mock.patch.object(query_planner, "DEFAULT_TILE_DENSITY", 200):
+            asyncio.run(first_only())
+
+        # Only the innermost ring and the one prefetched behind it went upstream
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(overpass_service.overpass_flights.stats()["in_flight"], 0)
+
+    def test_05_capped_results_are_not_cached(self):
+        async def stream_elements(query, timeout_seconds):
+            for i in range(3):
+                yield node(i, 48.8566 + i * 0.001, 2.3522)
+
+        subquery = query_planner.SubQuery({self.center}, [(self.center[0], self.center[1], self.center[0], self.center[1])], 2)
+
+        async def run():
+            flight = overpass_service.OverpassFlight("primary", subquery, 25, 13)
+            await flight.run()
+            return flight
+
+        overpass_service.poi_tile_cache.clear()
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            flight = asyncio.run(run())
+        self.assertEqual(len(flight.elements), 3)
+        self.assertEqual(len(overpass_service.poi_tile_cache), 0)
+
+    def test_06_capped_results_outside_the_tiles_count_towards_the_cap(self):
+        """Ways crossing the bbox edge fill the cap with centers outside the tiles, so the tiles are incomplete"""
+        outside = lat_lon_to_tile(48.9566, 2.3522, 13)
+        self.assertNotEqual(outside, self.center)
+
+        async def stream_elements(query, timeout_seconds):
+            yield node(1, 48.8566, 2.3522)
+            yield {"type": "way", "id": 2, "center": {"lat": 48.9566, "lon": 2.3522}, "tags": {"tourism": "attraction", "name": "Edge"}}
+            # The same way again for another capped category is not counted twice
+            yield {"type": "way", "id": 2, "center": {"lat": 48.9566, "lon": 2.3522}, "tags": {"tourism": "attraction", "name": "Edge"}}
+
+        subquery = query_planner.SubQuery({self.center}, [(self.center[0], self.center[1], self.center[0], self.center[1])], 2)
+
+        async def run(cap):
+            flight = overpass_service.OverpassFlight("primary", query_planner.SubQuery(subquery.tiles, subquery.rectangles, cap), 25, 13)
+            await flight.run()
+            return flight
+
+        overpass_service.poi_tile_cache.clear()
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            flight = asyncio.run(run(2))
+            self.assertEqual([element["id"] for _, element in flight.elements], [1])
+            self.assertEqual(len(overpass_service.poi_tile_cache), 0)
+
+            asyncio.run(run(3))
+            self.assertEqual(len(overpass_service.poi_tile_cache), 1)
+
+    def test_07_small_searches_merge_up_to_target(self):
+        boxes = [query_planner.SubQuery({(x, 0), (x, 1)}, [(x, 0, x, 1)]) for x in range(0, 10, 2)]
+        ring = query_planner.SubQuery({(50, 50)}, [(50, 50, 50, 50)], 100)
+        merged = query_planner.merge_subqueries(boxes + [ring], tile_density=100, target=600)
+        # Three boxes of 2 tiles fit in 600 elements at 100 per tile; the capped ring stays alone
+        self.assertEqual(sorted(len(subquery.rectangles) for subquery in merged), [1, 2, 3])
+        self.assertIn(ring, merged)
+        self.assertEqual(merged[0].tiles, boxes[0].tiles | boxes[1].tiles | boxes[2].tiles)
+
+    def test_08_distance_page_stops_before_rings_it_does_not_need(self):
+        """Sorted by distance, a page filled by the inner ring does not fetch the outer rings"""
+        queries = []
+
+        async def stream_elements(query, timeout_seconds):
+            queries.append(query)
+            for i in range(12):
+                yield node(len(queries) * 100 + i, 48.8566, 2.3522 + i * 0.0001)
+
+        async def center_of_paris(request):
+            return poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+        def first_page(sort):
+            queries.clear()
+            overpass_service.poi_tile_cache.clear()
+            poi_engine.ranked_results.clear()
+            request = SearchRequest(location="Paris", radius=30)
+            return asyncio.run(poi_engine.search_page(request, center_of_paris, limit=5, sort=sort))
+
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements), \
+                mock.patch.object(overpass_service, "SPECULATIVE_SECONDARY", False), \
+                mock.patch.object(query_planner, "DEFAULT_TILE_DENSITY", 200):
+            page = first_page("rank")
+            all_rings = len(queries)
+            self.assertEqual(page.total, 12)
+
+            page = first_page("distance")
+            # The inner ring and the one prefetched behind it
+            self.assertEqual(len(queries), 2)
+            self.assertLess(len(queries), all_rings)
+            self.assertEqual([spot["id"] for spot in page.items], ["100", "101", "102", "103", "104"])
+            # Spots further out were not searched for, so there is a next page either way
+            self.assertIsNotNone(page.next_cursor)
+            self.assertEqual(page.total, 12)
+
+if __name__ == "__main__":
+    unittest.main()
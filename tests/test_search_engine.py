@@ -0,0 +1,218 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+from fastapi import HTTPException
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.spot_searching_page import overpass_service, poi_engine
+from services.spot_searching_page.poi_catalog import PoiCategory, compile_selectors
+from services.spot_searching_page.spots import Spot
+
+
+def node(element_id, lat=48.8566, lon=2.3522, name=None, **tags):
+    tags = tags or {"tourism": "attraction"}
+    tags["name"] = name or f"Spot {element_id}"
+    return {"type": "node", "id": element_id, "lat": lat, "lon": lon, "tags": tags}
+
+
+def streamed(fake_fetch):
+    """Stand-in for iter_pois that yields the elements of a fake fetch_pois"""
+    async def iter_pois(*args):
+        for element in await fake_fetch(*args):
+            yield element
+
+    return iter_pois
+
+
+class TestSpeculativeSecondary(unittest.TestCase):
+    """Test cases for running the secondary Overpass query alongside the primary one"""
+
+    def test_01_secondary_cancelled_when_primary_suffices(self):
+        secondary_cancelled = asyncio.Event()
+
+        async def fake_fetch(query_name, *args):
+            if query_name == "primary":
+                await asyncio.sleep(0.01)
+                return [node(i) for i in range(overpass_service.MIN_PRIMARY_RESULTS)]
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                secondary_cancelled.set()
+                raise
+
+        async def run():
+            primary, secondary = await overpass_service.fetch_primary_and_secondary(48.85, 2.35, 5, 25)
+            await asyncio.sleep(0)
+            return primary, secondary, secondary_cancelled.is_set()
+
+        with mock.patch.object(overpass_service, "iter_pois", streamed(fake_fetch)), \
+                mock.patch.object(overpass_service, "SPECULATIVE_SECONDARY", True):
+            primary, secondary, cancelled = asyncio.run(run())
+
+        self.assertEqual(len(primary), overpass_service.MIN_PRIMARY_RESULTS)
+        self.assertEqual(secondary, [])
+        self.assertTrue(cancelled)
+
+    def test_02_sparse_area_runs_queries_concurrently(self):
+        """Both queries overlap, so a sparse search costs one round-trip, not two"""
+        async def fake_fetch(query_name, *args):
+            await asyncio.sleep(0.2)
+            return [node(1)] if query_name == "primary" else [node(2, historic="castle")]
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            result = await overpass_service.fetch_primary_and_secondary(48.85, 2.35, 5, 25)
+            return result, loop.time() - start
+
+        with mock.patch.object(overpass_service, "iter_pois", streamed(fake_fetch)), \
+                mock.patch.object(overpass_service, "SPECULATIVE_SECONDARY", True):
+            (primary, secondary), elapsed = asyncio.run(run())
+
+        self.assertEqual([e["id"] for e in primary], [1])
+        self.assertEqual([e["id"] for e in secondary], [2])
+        self.assertLess(elapsed, 0.35)
+
+    def test_03_secondary_failure_keeps_primary_results(self):
+        async def fake_fetch(query_name, *args):
+            if query_name == "secondary":
+                raise RuntimeError("Overpass timeout")
+            return [node(1)]
+
+        with mock.patch.object(overpass_service, "iter_pois", streamed(fake_fetch)):
+            primary, secondary = asyncio.run(overpass_service.fetch_primary_and_secondary(48.85, 2.35, 5, 25))
+
+        self.assertEqual([e["id"] for e in primary], [1])
+        self.assertEqual(secondary, [])
+
+
+class TestElementIndex(unittest.TestCase):
+    """Test cases for de-duplicating merged Overpass elements"""
+
+    def test_01_ids_are_scoped_by_type(self):
+        """node 7 and way 7 are different features"""
+        seen = overpass_service.ElementIndex()
+        way = {"type": "way", "id": 7, "center": {"lat": 40.0, "lon": 3.0}, "tags": {"name": "Other"}}
+        self.assertTrue(seen.add(node(7)))
+        self.assertTrue(seen.add(way))
+        self.assertFalse(seen.add(node(7)))
+        self.assertEqual(seen.duplicates, 1)
+
+    def test_02_node_and_way_of_same_feature_collapse(self):
+        seen = overpass_service.ElementIndex()
+        way = {"type": "way", "id": 99, "center": {"lat": 48.8570, "lon": 2.3525}, "tags": {"name": "Old Castle"}}
+        self.assertTrue(seen.add(node(1, name="Old Castle")))
+        self.assertFalse(seen.add(way))
+        self.assertEqual(seen.near_duplicates, 1)
+
+    def test_03_same_name_far_apart_kept(self):
+        seen = overpass_service.ElementIndex()
+        self.assertTrue(seen.add(node(1, name="Town Hall")))
+        self.assertTrue(seen.add(node(2, lat=48.95, name="Town Hall")))
+
+    def test_04_repeated_names_compared_with_neighbouring_cells_only(self):
+        """Many same-named elements stay cheap, and near duplicates across a cell edge are still caught"""
+        seen = overpass_service.ElementIndex(near_duplicate_km=0.25)
+        for i in range(2000):
+            self.assertTrue(seen.add(node(i, lat=40.0 + i * 0.01, name="Parking")))
+        cell = 0.25 / overpass_service.KM_PER_DEGREE
+        edge = round(40.0 / cell) * cell
+        self.assertTrue(seen.add(node(5000, lat=edge - cell * 0.1, lon=2.0, name="Summit")))
+        self.assertFalse(seen.add(node(5001, lat=edge + cell * 0.1, lon=2.0, name="Summit")))
+        self.assertTrue(all(len(points) == 1 for points in seen._by_cell.values()))
+
+
+class TestPoiEngine(unittest.TestCase):
+    """Test cases for the shared catalog, parser and front-ends of the POI engine"""
+
+    def test_01_catalog_compiles_to_selectors(self):
+        selectors = compile_selectors([
+            PoiCategory("historic", None, ("node", "way")),
+            PoiCategory("amenity", "restaurant", ("node",), ("cuisine",)),
+        ])
+        self.assertEqual(selectors, ['node["historic"]', 'way["historic"]', 'node["amenity"="restaurant"]["cuisine"]'])
+
+    def test_02_parse_element_classifies_by_tier(self):
+        element = node(5, historic="castle", leisure="park")
+        self.assertEqual(poi_engine.parse_element(element, "primary").category, "other")
+        self.assertEqual(poi_engine.parse_element(element, "secondary").category, "historic_castle")
+        self.assertIsNone(poi_engine.parse_element({"type": "node", "id": 6, "tags": {}}, "primary"))
+
+    def test_03_front_ends_share_one_search(self):
+        """Both front-ends feed the same engine; secondary spots follow primary ones without duplicates"""
+        async def fake_fetch(lat, lon, radius_km, timeout_seconds):
+            for tier, element in [("primary", node(1)), ("secondary", node(1)), ("secondary", node(2, lat=48.9, historic="ruins"))]:
+                yield tier, element
+
+        async def fixed_center(request):
+            return poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+        request = mock.Mock(radius=5)
+        with mock.patch.object(poi_engine, "iter_primary_and_secondary", fake_fetch):
+            spots = asyncio.run(poi_engine.search_spots(request, fixed_center))
+
+        self.assertEqual([spot.id for spot in spots], ["1", "2"])
+        self.assertEqual(spots[1].category, "historic_ruins")
+
+    def test_04_stream_emits_center_spots_and_done(self):
+        async def fake_fetch(lat, lon, radius_km, timeout_seconds):
+            yield "primary", node(1)
+            yield "primary", node(2, lat=48.86)
+
+        async def fixed_center(request):
+            return poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+        async def collect():
+            return [json.loads(line) async for line in poi_engine.stream_spots(mock.Mock(radius=5), fixed_center)]
+
+        with mock.patch.object(poi_engine, "iter_primary_and_secondary", fake_fetch):
+            events = asyncio.run(collect())
+
+        self.assertEqual([event["type"] for event in events], ["center", "spot", "spot", "done"])
+        self.assertEqual(events[0]["country"], "France")
+        self.assertEqual(events[2]["spot"]["id"], "2")
+        self.assertEqual(events[-1]["count"], 2)
+
+    def test_05_stream_reports_errors_in_band(self):
+        async def missing_center(request):
+            raise HTTPException(status_code=404, detail="No location found for 'Atlantis'.")
+
+        async def collect():
+            return [json.loads(line) async for line in poi_engine.stream_spots(mock.Mock(radius=5), missing_center)]
+
+        events = asyncio.run(collect())
+        self.assertEqual(events, [{"type": "error", "status_code": 404, "detail": "No location found for 'Atlantis'."}])
+
+
+class TestSpot(unittest.TestCase):
+    """Test cases for the compact spot record of the search hot path"""
+
+    def test_01_spots_share_key_tables(self):
+        a = poi_engine.parse_element(node(1), "primary")
+        b = poi_engine.parse_element(node(2), "primary")
+        self.assertIsInstance(a, Spot)
+        self.assertIs(a.tag_keys, b.tag_keys)
+        self.assertIs(a.category, b.category)
+        self.assertEqual(a.tags, node(1)["tags"])
+
+    def test_02_to_dict_projects_fields(self):
+        spot = Spot.from_tags("7", "Louvre", "museum", 48.86, 2.33, {"name": "Louvre", "tourism": "museum"})
+        self.assertEqual(spot.to_dict(["id", "name"]), {"id": "7", "name": "Louvre"})
+        self.assertNotIn("tags", spot.to_dict(["id", "lat", "lon"]))
+        self.assertEqual(spot.to_dict()["tags"], {"name": "Louvre", "tourism": "museum"})
+
+    def test_03_to_model_round_trips(self):
+        spot = Spot.from_tags("7", "Louvre", "museum", 48.86, 2.33, {"name": "Louvre", "tourism": "museum"})
+        model = spot.to_model()
+        self.assertEqual(model.model_dump(include={"id", "category", "lat", "tags"}),
+                         {"id": "7", "category": "museum", "lat": 48.86, "tags": {"name": "Louvre", "tourism": "museum"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
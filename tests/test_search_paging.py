@@ -0,0 +1,145 @@
+import unittest
+import asyncio
+import os
+import sys
+from unittest import mock
+from fastapi import HTTPException
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.models import SearchRequest
+from services.spot_searching_page import poi_engine
+from services.spot_searching_page.ranking import rank_spots, sort_by_distance
+from services.utils.geo import haversine_km, haversine_km_array
+import numpy as np
+from services.spot_searching_page.spots import Spot
+
+
+def spot(spot_id, lat=48.8566, lon=2.3522, category="attraction", **tags):
+    return Spot.from_tags(str(spot_id), f"Spot {spot_id}", category, lat, lon, {"name": f"Spot {spot_id}", **tags})
+
+
+class TestRanking(unittest.TestCase):
+    """Test cases for server-side ranking of search results"""
+
+    def test_01_notable_nearby_attraction_ranks_first(self):
+        spots = [
+            spot(1, category="hotel"),
+            spot(2, lat=48.90, wikipedia="en:Somewhere"),
+            spot(3, lat=48.86, wikipedia="fr:Tour", wikidata="Q1"),
+        ]
+        ranked = [s.id for s, _ in rank_spots(spots, 48.8566, 2.3522, 10)]
+        self.assertEqual(ranked, ["3", "2", "1"])
+
+    def test_02_distance_sort_is_nearest_first(self):
+        spots = [spot(1, lat=48.90), spot(2, lat=48.86), spot(3, lat=48.8566)]
+        ranked = rank_spots(spots, 48.8566, 2.3522, 10, sort="distance")
+        self.assertEqual([s.id for s, _ in ranked], ["3", "2", "1"])
+        self.assertAlmostEqual(ranked[0][1], 0.0, places=3)
+
+    def test_03_vectorized_haversine_matches_scalar(self):
+        lats = np.array([48.8566, 51.5074, -33.8688, 40.7128])
+        lons = np.array([2.3522, -0.1278, 151.2093, -74.0060])
+        distances = haversine_km_array(48.8566, 2.3522, lats, lons)
+        for distance, lat, lon in zip(distances, lats, lons):
+            self.assertAlmostEqual(distance, haversine_km(48.8566, 2.3522, lat, lon), places=6)
+
+    def test_04_spots_outside_radius_dropped_and_distances_attached(self):
+        # 0.05 degrees of latitude is about 5.6 km
+        spots = [spot(1, lat=48.9066), spot(2, lat=48.8666), spot(3, lat=48.8566)]
+        nearest = sort_by_distance(spots, 48.8566, 2.3522, 5)
+        self.assertEqual([s.id for s in nearest], ["3", "2"])
+        self.assertAlmostEqual(nearest[1].distance_km, 1.112, places=2)
+        self.assertEqual(nearest[1].to_dict(["distance_km"]), {"distance_km": nearest[1].distance_km})
+
+
+class TestSearchPaging(unittest.TestCase):
+    """Test cases for cursor pagination and field projection of /search"""
+
+    def setUp(self):
+        poi_engine.ranked_results.clear()
+        self.spots = [spot(i, lat=48.8566 + i * 0.001) for i in range(25)]
+        self.front_end_calls = 0
+
+    async def fixed_center(self, request):
+        self.front_end_calls += 1
+        return poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+    def page(self, **kwargs):
+        async def fake_search(center, radius, limit=None):
+            return list(self.spots)
+
+        with mock.patch.object(poi_engine, "search_pois", side_effect=fake_search):
+            return asyncio.run(poi_engine.search_page(SearchRequest(location="Paris", radius=5), self.fixed_center, **kwargs))
+
+    def test_01_cursor_walks_every_spot_once(self):
+        seen = []
+        page = self.page(limit=10)
+        self.assertEqual(page.total, 25)
+        while True:
+            seen.extend(item["id"] for item in page.items)
+            if page.next_cursor is None:
+                break
+            page = self.page(limit=10, cursor=page.next_cursor)
+        self.assertEqual(sorted(seen, key=int), [str(i) for i in range(25)])
+        # Later pages come from the ranked result set, not a new search
+        self.assertEqual(self.front_end_calls, 1)
+
+    def test_02_tags_omitted_unless_requested(self):
+        item = self.page(limit=1).items[0]
+        self.assertNotIn("tags", item)
+        self.assertEqual(set(item), set(poi_engine.DEFAULT_FIELDS))
+        item = self.page(limit=1, fields="id,tags").items[0]
+        self.assertEqual(set(item), {"id", "tags"})
+
+    def test_03_invalid_requests_are_rejected(self):
+        for kwargs in ({"cursor": "not-a-cursor"}, {"fields": "id,secret"}, {"sort": "random"}):
+            with self.assertRaises(HTTPException) as context:
+                self.page(**kwargs)
+            self.assertEqual(context.exception.status_code, 400)
+
+    def test_04_cursor_of_another_search_is_rejected(self):
+        cursor = self.page(limit=5).next_cursor
+        with self.assertRaises(HTTPException):
+            self.page(limit=5, cursor=cursor, sort="distance")
+
+
+class TestSearchBatch(unittest.TestCase):
+    """Test cases for searching several destinations in one request"""
+
+    def setUp(self):
+        poi_engine.ranked_results.clear()
+
+    async def center(self, request):
+        if request.location == "Atlantis":
+            raise HTTPException(status_code=404, detail="No location found for 'Atlantis'.")
+        return poi_engine.SearchCenter(48.8566, 2.3522, "France")
+
+    def test_01_results_per_destination_and_cursor_continues_on_search(self):
+        def node(element_id):
+            return {"type": "node", "id": element_id, "lat": 48.8566 + element_id * 0.001, "lon": 2.3522,
+                    "tags": {"tourism": "attraction", "name": f"Spot {element_id}"}}
+
+        async def fake_batch(searches):
+            return [([node(i) for i in range(15)], []) for _ in searches]
+
+        requests = [SearchRequest(location="Paris", radius=5), SearchRequest(location="Atlantis", radius=5)]
+        with mock.patch.object(poi_engine, "fetch_primary_and_secondary_batch", side_effect=fake_batch) as batch:
+            paris, atlantis = asyncio.run(poi_engine.search_batch(requests, self.center, limit=10))
+        self.assertEqual(len(batch.call_args.args[0]), 1)
+
+        self.assertEqual((paris.status_code, paris.page.total, len(paris.page.items)), (200, 15, 10))
+        self.assertEqual((atlantis.status_code, atlantis.page), (404, None))
+        rest = asyncio.run(poi_engine.search_page(requests[0], self.center, limit=10, cursor=paris.page.next_cursor))
+        self.assertEqual(len(rest.items), 5)
+
+    def test_02_too_many_destinations_rejected(self):
+        requests = [SearchRequest(location="Paris")] * (poi_engine.SEARCH_BATCH_MAX + 1)
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(poi_engine.search_batch(requests, self.center))
+        self.assertEqual(context.exception.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.models import AskQuestionRequest
+from services.spot_searching_page import question_service
+from services.utils.semantic_cache import SemanticCache, hash_embedding
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestSemanticCache(unittest.TestCase):
+    """Test cases for the per-scope semantic cache of answers"""
+
+    def test_01_rephrasings_are_similar(self):
+        def similarity(first, second):
+            return float(hash_embedding(first) @ hash_embedding(second))
+        self.assertGreaterEqual(similarity("What are the opening hours?", "opening hours?"), 0.85)
+        self.assertGreaterEqual(similarity("Is it open late?", "is it OPEN late"), 0.85)
+        self.assertLess(similarity("Is it open on Monday?", "Is it open on Sunday?"), 0.85)
+        self.assertLess(similarity("Can I bring my dog?", "Can I bring my kids?"), 0.85)
+
+    def test_02_lookup_scoped_by_spot(self):
+        cache = SemanticCache()
+        cache.set("node/1", "What are the opening hours?", "9 to 5", cost=1.5)
+        self.assertEqual(cache.get("node/1", "opening hours?"), "9 to 5")
+        self.assertIsNone(cache.get("node/2", "opening hours?"))
+        self.assertIsNone(cache.get("node/1", "Is there parking?"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["seconds_saved"]), (1, 2, 1.5))
+
+    def test_03_eviction(self):
+        """Scopes keep their newest answers, and the least recently used scope goes first"""
+        cache = SemanticCache(max_entries=4, max_per_scope=2)
+        for question in ["opening hours?", "parking?", "ticket price?"]:
+            cache.set("node/1", question, question)
+        self.assertIsNone(cache.get("node/1", "opening hours?"))
+        self.assertEqual(cache.get("node/1", "ticket price?"), "ticket price?")
+        cache.set("node/2", "parking?", "yes")
+        cache.get("node/1", "parking?")
+        cache.set("node/3", "parking?", "no")
+        cache.set("node/3", "toilets?", "no")
+        self.assertIsNone(cache.get("node/2", "parking?"))
+        self.assertEqual(cache.get("node/1", "parking?"), "parking?")
+        self.assertEqual(len(cache), 4)
+
+    def test_04_one_different_word_misses(self):
+        """Long questions differing in one content word share most n-grams but are different questions"""
+        cache = SemanticCache()
+        north = "Is there a car park with free spaces for camper vans on the north side of the lake?"
+        south = "Is there a car park with free spaces for camper vans on the south side of the lake?"
+        cache.set("node/1", north, "Yes, by the harbour")
+        self.assertGreaterEqual(float(hash_embedding(north) @ hash_embedding(south)), cache.threshold)
+        self.assertIsNone(cache.get("node/1", south))
+        self.assertEqual(cache.get("node/1", "On the north side of the lake, is there a car park with free "
+                                             "spaces for camper vans?"), "Yes, by the harbour")
+
+    def test_05_expiry(self):
+        cache = SemanticCache(ttl=0.01)
+        cache.set("node/1", "opening hours?", "9 to 5")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("node/1", "opening hours?"))
+        self.assertEqual(cache.stats()["scopes"], 0)
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Test cases for ask_question answering rephrased questions from the cache"""
+
+    def setUp(self):
+        question_service.answer_cache.clear()
+        self.key_manager = mock.Mock()
+        self.key_manager.chat_completion = mock.AsyncMock(side_effect=[completion("First"), completion("Second")])
+        patcher = mock.patch.object(question_service, "get_key_manager", return_value=self.key_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, spot_id="node/1", spot_name="Louvre", fresh=False):
+        request = AskQuestionRequest(spot_id=spot_id, spot_name=spot_name, spot_category="museum",
+                                     location="Paris", country="France", question=question, fresh=fresh)
+        return asyncio.run(question_service.ask_question(request))
+
+    def test_01_rephrased_question_answered_from_cache(self):
+        self.assertEqual(self.ask("What are the opening hours?"), "First")
+        self.assertEqual(self.ask("Opening hours?"), "First")
+        self.assertEqual(self.ask("Opening hours?", spot_id="node/2"), "Second")
+        self.assertEqual(self.key_manager.chat_completion.await_count, 2)
+
+    def test_02_spots_sharing_an_osm_id_have_separate_answers(self):
+        """A node and a way can have the same numeric id"""
+        self.assertEqual(self.ask("Opening hours?", spot_id="42"), "First")
+        self.assertEqual(self.ask("Opening hours?", spot_id="42", spot_name="Jardin des Plantes"), "Second")
+
+    def test_03_paraphrases_in_other_words_miss(self):
+        self.assertEqual(self.ask("Opening hours?"), "First")
+        self.assertEqual(self.ask("Is it open late?"), "Second")
+
+    def test_04_prompt_built_only_on_miss(self):
+        self.ask("What are the opening hours?")
+        with mock.patch.object(question_service, "question_messages") as question_messages:
+            self.assertEqual(self.ask("Opening hours?"), "First")
+        question_messages.assert_not_called()
+
+    def test_05_fresh_skips_cache_and_replaces_answer(self):
+        self.key_manager.chat_completion.side_effect = [completion("First"), completion("Second"), completion("Third")]
+        self.assertEqual(self.ask("Opening hours?"), "First")
+        self.assertEqual(self.ask("Opening hours?", fresh=True), "Second")
+        self.assertEqual(self.ask("What are the opening hours?"), "Second")
+        self.assertEqual(self.key_manager.chat_completion.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
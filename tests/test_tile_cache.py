@@ -0,0 +1,192 @@
+import unittest
+import asyncio
+import os
+import sys
+from contextlib import aclosing
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.utils.geo import haversine_km, lat_lon_to_tile, tile_bounds, tiles_covering_circle
+from services.spot_searching_page import overpass_service, query_planner
+from services.spot_searching_page.tile_cache import PoiTileCache
+
+
+def node(element_id, lat, lon, name="Spot"):
+    return {"type": "node", "id": element_id, "lat": lat, "lon": lon, "tags": {"tourism": "attraction", "name": name}}
+
+
+def fake_overpass(elements):
+    """Stand-in for stream_overpass_elements that records the queries it receives"""
+    queries = []
+
+    async def stream_elements(query, timeout_seconds):
+        queries.append(query)
+        for element in elements:
+            await asyncio.sleep(0.01)
+            yield element
+
+    return stream_elements, queries
+
+
+class TestTileGeometry(unittest.TestCase):
+    """Test cases for the tile math behind the POI tile cache"""
+
+    def test_01_covering_tiles_contain_circle(self):
+        """Every point of the circle lies in one of the covering tiles"""
+        lat, lon, radius_km, zoom = 48.8566, 2.3522, 5, 13
+        covering = set(tiles_covering_circle(lat, lon, radius_km, zoom))
+        self.assertIn(lat_lon_to_tile(lat, lon, zoom), covering)
+        for dlat, dlon in [(0.044, 0), (-0.044, 0), (0, 0.066), (0, -0.066), (0.03, 0.045)]:
+            point = (lat + dlat, lon + dlon)
+            if haversine_km(lat, lon, *point) <= radius_km:
+                self.assertIn(lat_lon_to_tile(*point, zoom), covering)
+
+    def test_02_tile_bounds_contain_tile_points(self):
+        x, y = lat_lon_to_tile(48.8566, 2.3522, 13)
+        south, west, north, east = tile_bounds(x, y, 13)
+        self.assertTrue(south <= 48.8566 <= north)
+        self.assertTrue(west <= 2.3522 <= east)
+
+    def test_03_circle_across_the_antimeridian_wraps(self):
+        """A circle around Fiji covers tiles on both edges of the map, and is fetched in boxes on each side"""
+        lat, lon, radius_km, zoom = -17.0, 179.98, 10, 13
+        covering = set(tiles_covering_circle(lat, lon, radius_km, zoom))
+        self.assertIn(lat_lon_to_tile(lat, -179.98, zoom), covering)
+        self.assertIn(lat_lon_to_tile(lat, 179.98, zoom), covering)
+        self.assertEqual(covering, set(tiles_covering_circle(lat, -180 + (lon - 180), radius_km, zoom)))
+
+        columns = 1 << zoom
+        center = lat_lon_to_tile(lat, lon, zoom)
+        for density in (1, 200):
+            plan = query_planner.plan_subqueries(center, sorted(covering), density, target=2000, columns=columns)
+            fetched = set().union(*(subquery.tiles for subquery in plan))
+            self.assertTrue(covering <= fetched)
+            for subquery in plan:
+                for min_x, _, max_x, _ in subquery.rectangles:
+                    self.assertTrue(0 <= min_x <= max_x < columns)
+                    # No box spans the map from one edge to the other
+                    self.assertLess(max_x - min_x, columns // 2)
+            self.assertLess(len(fetched), 2 * len(covering))
+
+
+class TestPoiTileCache(unittest.TestCase):
+    """Test cases for Overpass results cached per tile"""
+
+    def setUp(self):
+        overpass_service.poi_tile_cache.clear()
+
+    def test_01_nearby_search_served_from_warm_tiles(self):
+        """A second search a few hundred meters away does not query Overpass again"""
+        elements = [node(1, 48.8566, 2.3522), node(2, 48.8600, 2.3400), node(3, 49.5, 2.35)]
+        stream_elements, queries = fake_overpass(elements)
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            first = asyncio.run(overpass_service.fetch_pois("primary", 48.8566, 2.3522, 3, 25))
+            second = asyncio.run(overpass_service.fetch_pois("primary", 48.8580, 2.3500, 2, 25))
+
+        self.assertEqual(len(queries), 1)
+        # Results are trimmed to the exact radius, so the far element never appears
+        self.assertEqual(sorted(e["id"] for e in first), [1, 2])
+        self.assertEqual(sorted(e["id"] for e in second), [1, 2])
+        self.assertGreater(overpass_service.poi_tile_cache.stats()["tile_hits"], 0)
+
+    def test_02_queries_are_cached_separately(self):
+        stream_elements, queries = fake_overpass([node(1, 48.8566, 2.3522)])
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            asyncio.run(overpass_service.fetch_pois("primary", 48.8566, 2.3522, 1, 25))
+            asyncio.run(overpass_service.fetch_pois("secondary", 48.8566, 2.3522, 1, 25))
+        self.assertEqual(len(queries), 2)
+
+    def test_03_memory_budget_evicts_oldest_tiles(self):
+        cache = PoiTileCache(ttl=60, max_bytes=5000)
+        for i in range(10):
+            cache.set(("primary", str(i)), [node(i, 0, 0)])
+        self.assertLessEqual(cache.bytes, 5000)
+        self.assertIsNone(cache.get(("primary", "0")))
+        self.assertIsNotNone(cache.get(("primary", "9")))
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+
+class TestOverpassCoalescing(unittest.TestCase):
+    """Test cases for sharing in-flight Overpass fetches between concurrent searches"""
+
+    def setUp(self):
+        overpass_service.poi_tile_cache.clear()
+
+    def test_01_concurrent_identical_searches_share_one_request(self):
+        elements = [node(1, 48.8566, 2.3522), node(2, 48.8600, 2.3400)]
+        stream_elements, queries = fake_overpass(elements)
+        coalesced_before = overpass_service.overpass_flights.coalesced
+
+        async def burst():
+            return await asyncio.gather(*[overpass_service.fetch_pois("primary", 48.8566, 2.3522, 3, 25) for _ in range(20)])
+
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            results = asyncio.run(burst())
+
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(all(sorted(e["id"] for e in result) == [1, 2] for result in results))
+        self.assertEqual(overpass_service.overpass_flights.coalesced - coalesced_before, 19)
+        self.assertEqual(overpass_service.overpass_flights.stats()["in_flight"], 0)
+
+    def test_02_overlapping_search_only_fetches_missing_tiles(self):
+        """A larger search joins the flight for the shared tiles and fetches only the outer ring"""
+        elements = [node(1, 48.8566, 2.3522), node(2, 48.90, 2.3522)]
+        stream_elements, queries = fake_overpass(elements)
+
+        async def overlapping():
+            return await asyncio.gather(
+                overpass_service.fetch_pois("primary", 48.8566, 2.3522, 1, 25),
+                overpass_service.fetch_pois("primary", 48.8566, 2.3522, 8, 25),
+            )
+
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            small, large = asyncio.run(overlapping())
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([e["id"] for e in small], [1])
+        self.assertEqual(sorted(e["id"] for e in large), [1, 2])
+
+    def test_03_abandoned_flight_is_cancelled(self):
+        cancelled = asyncio.Event()
+
+        async def slow_stream(query, timeout_seconds):
+            yield node(1, 48.8566, 2.3522)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def first_only():
+            async with aclosing(overpass_service.iter_pois("primary", 48.8566, 2.3522, 1, 25)) as elements:
+                async for element in elements:
+                    break
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return cancelled.is_set()
+
+        with mock.patch.object(overpass_service, "stream_overpass_elements", slow_stream):
+            self.assertTrue(asyncio.run(first_only()))
+        self.assertEqual(overpass_service.overpass_flights.stats()["in_flight"], 0)
+
+    def test_04_batch_merges_destinations_into_shared_requests(self):
+        cities = [(48.8566, 2.3522), (45.7640, 4.8357), (43.2965, 5.3698)]
+        elements = [node(i + 1, lat, lon) for i, (lat, lon) in enumerate(cities)]
+        stream_elements, queries = fake_overpass(elements)
+
+        with mock.patch.object(overpass_service, "stream_overpass_elements", stream_elements):
+            results = asyncio.run(overpass_service.fetch_primary_and_secondary_batch([(lat, lon, 2, 25) for lat, lon in cities]))
+
+        # One merged primary request, then one merged secondary request for the (sparse) destinations
+        self.assertEqual(len(queries), 2)
+        primary_selectors = overpass_service.OVERPASS_QUERIES["primary"]
+        self.assertEqual(queries[0].count(primary_selectors[0]), 3)
+        for i, (primary, secondary) in enumerate(results):
+            self.assertEqual([e["id"] for e in primary], [i + 1])
+        self.assertEqual(overpass_service.overpass_flights.stats()["in_flight"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.spot_searching_page import warmup
+from services.spot_searching_page.search_log import Destination, SearchLog
+
+
+class TestSearchLog(unittest.TestCase):
+    """Test cases for the log of searches the warm-up picks destinations from"""
+
+    def test_01_top_counts_normalized_location_and_radius(self):
+        log = SearchLog()
+        for location in ("Paris", " paris ", "PARIS", "Rome"):
+            log.record(location, 5)
+        log.record("Rome", 10)
+        self.assertEqual(log.top(2), [Destination("paris", 5), Destination("rome", 5)])
+
+    def test_02_file_survives_restart_and_compacts_to_window(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "searches.ndjson")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": time.time() - 30 * 86400, "location": "old", "radius": 5}) + "\n")
+            log = SearchLog(path)
+            log.record("Lisbon", 5)
+            log.record("Lisbon", 5)
+            log.flush()
+
+            restarted = SearchLog(path)
+            self.assertEqual(restarted.top(5), [Destination("lisbon", 5)])
+            restarted.record("Porto", 5)
+            restarted.compact()
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["location"] for line in f], ["lisbon", "lisbon", "porto"])
+
+    def test_03_record_only_buffers_until_flushed(self):
+        """Searches are recorded on the event loop, so the file is only written by flush() and compact()"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "searches.ndjson")
+            log = SearchLog(path)
+            with mock.patch("builtins.open", side_effect=AssertionError("file opened by record()")):
+                log.record("Lisbon", 5)
+            self.assertFalse(os.path.exists(path))
+            log.flush()
+            log.record("Porto", 5)
+            self.assertEqual(SearchLog(path).top(5), [Destination("lisbon", 5)])
+
+            # Entries flushed before the log is first read are not counted twice
+            self.assertEqual(log.top(5), [Destination("lisbon", 5), Destination("porto", 5)])
+            log.compact()
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["location"] for line in f], ["lisbon", "porto"])
+
+
+class TestWarmupScheduler(unittest.TestCase):
+    """Test cases for warming hot destinations with bounded concurrency"""
+
+    def test_01_parse_destinations(self):
+        self.assertEqual(warmup.parse_destinations("Paris, France:10; Rome ;;Kyoto:x"),
+                         [Destination("Paris, France", 10), Destination("Rome"), Destination("Kyoto:x")])
+
+    def test_02_plan_adds_top_searches_without_duplicates(self):
+        log = SearchLog()
+        for location in ("Paris", "Paris", "Oslo"):
+            log.record(location, 5)
+        scheduler = warmup.WarmupScheduler([Destination("Paris", 5)], top_n=2, log=log)
+        self.assertEqual(scheduler.plan(), [Destination("Paris", 5), Destination("oslo", 5)])
+
+    def test_03_run_is_bounded_and_counts_failures(self):
+        active = 0
+        peak = 0
+
+        async def fake_geocode(location):
+            return None if location == "Atlantis" else {"lat": 48.85, "lon": 2.35, "country": "France"}
+
+        async def fake_search(center, radius, limit=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return [object()] * 3
+
+        destinations = [Destination(f"City {i}") for i in range(6)] + [Destination("Atlantis")]
+        scheduler = warmup.WarmupScheduler(destinations, top_n=0, concurrency=2, rate=0, log=SearchLog())
+        with mock.patch.object(warmup, "geocode_location", side_effect=fake_geocode), \
+                mock.patch.object(warmup.poi_engine, "search_pois", side_effect=fake_search), \
+                mock.patch.object(warmup, "get_weather_data") as weather:
+            results = asyncio.run(scheduler.run_once())
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(weather.call_count, 6)
+        self.assertEqual([r.ok for r in results], [True] * 6 + [False])
+        self.assertEqual(results[0].spots, 3)
+        self.assertEqual((scheduler.stats()["warmed"], scheduler.stats()["failures"]), (6, 1))
+
+    def test_04_rate_spaces_destination_starts(self):
+        starts = []
+
+        async def fake_warm(destination):
+            starts.append(time.perf_counter())
+            return warmup.WarmupResult(destination, True, 0.0)
+
+        scheduler = warmup.WarmupScheduler([Destination("A"), Destination("B"), Destination("C")], top_n=0,
+                                           concurrency=3, rate=20, log=SearchLog())
+        with mock.patch.object(scheduler, "warm", side_effect=fake_warm):
+            asyncio.run(scheduler.run_once())
+        self.assertGreaterEqual(starts[2] - starts[0], 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
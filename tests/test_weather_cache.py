@@ -0,0 +1,172 @@
+import unittest
+import asyncio
+import httpx
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.models import WeatherData
+from services.spot_searching_page import weather_service
+from services.utils.cache import StaleWhileRevalidateCache
+from services.utils.circuit_breaker import CircuitBreaker
+
+
+def weather(temperature=20.0):
+    day = {"rain_chance": False, "rain_hours": 0, "max_precipitation": 0.0}
+    return WeatherData(temperature=temperature, description="clear sky",
+                       forecast={"next_48h": dict(day), "day1": dict(day), "day2": dict(day)})
+
+
+def forecast(temperature=20.0):
+    return {"current": {"temperature_2m": temperature, "weather_code": 0},
+            "hourly": {"precipitation": [0.0] * 72, "weather_code": [0] * 72}}
+
+
+class TestWeatherCache(unittest.TestCase):
+    """Test cases for the grid-cell weather cache with forecast-aligned freshness"""
+
+    def setUp(self):
+        weather_service.weather_cache.clear()
+
+    def test_01_nearby_points_share_one_upstream_call(self):
+        with mock.patch.object(weather_service, "fetch_weather_data", return_value=weather()) as fetch:
+            first = asyncio.run(weather_service.get_weather_data(48.8584, 2.2945))
+            second = asyncio.run(weather_service.get_weather_data(48.8530, 2.3130))
+        self.assertEqual(first, second)
+        self.assertEqual(fetch.call_count, 1)
+        # The forecast is fetched for the cell center, not for whichever spot came first
+        self.assertEqual(fetch.call_args.args, weather_service.cell_center(weather_service.weather_cell(48.8584, 2.2945)))
+
+    def test_02_freshness_ends_after_next_full_hour(self):
+        now = datetime(2024, 6, 1, 10, 20, tzinfo=timezone.utc).timestamp()
+        expected = datetime(2024, 6, 1, 11, 0, tzinfo=timezone.utc).timestamp() + weather_service.WEATHER_REFRESH_GRACE
+        self.assertEqual(weather_service.forecast_fresh_until(now), expected)
+
+    def test_03_stale_forecast_served_while_refreshed_once(self):
+        cell = weather_service.weather_cell(48.8566, 2.3522)
+        weather_service.weather_cache.set(cell, weather(10.0), time.time() - 1, time.time() + 600)
+
+        async def serve_stale_then_refresh():
+            stale = await weather_service.get_weather_data(48.8566, 2.3522)
+            await weather_service.get_weather_data(48.8566, 2.3522)
+            self.assertEqual(len(weather_service._refresh_tasks), 1)
+            await asyncio.gather(*weather_service._refresh_tasks)
+            return stale
+
+        with mock.patch.object(weather_service, "fetch_weather_data", return_value=weather(25.0)) as fetch:
+            stale = asyncio.run(serve_stale_then_refresh())
+        self.assertEqual(stale.temperature, 10.0)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(asyncio.run(weather_service.get_weather_data(48.8566, 2.3522)).temperature, 25.0)
+
+    def test_04_entries_past_stale_window_are_misses(self):
+        cache = StaleWhileRevalidateCache(max_size=2)
+        cache.set("a", 1, time.time() - 10, time.time() - 5)
+        cache.set("b", 2, time.time() + 10, time.time() + 20)
+        self.assertEqual(cache.get("a"), (None, False))
+        self.assertEqual(cache.get("b"), (2, True))
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["hit_ratio"], 0.5)
+
+
+class TestWeatherBatch(unittest.TestCase):
+    """Test cases for fetching the weather of many points at once"""
+
+    def setUp(self):
+        weather_service.weather_cache.clear()
+        self.requested = []
+        for patch in (mock.patch.object(weather_service, "weather_breaker", CircuitBreaker()),
+                      mock.patch.object(weather_service, "WEATHER_RETRY_DELAY", 0.0)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def fake_get(self, url, params=None, **kwargs):
+        lats = params["latitude"].split(",")
+        self.requested.append(len(lats))
+        if len(lats) == 1:
+            return httpx.Response(200, json=forecast(float(lats[0])))
+        return httpx.Response(200, json=[forecast(float(lat)) for lat in lats])
+
+    def test_01_points_deduplicated_by_cell_and_fetched_in_chunks(self):
+        # 5 cells, two points each, with the second point of a cell a few hundred meters from the first
+        points = [(45.0 + i * 0.1 + offset, 2.0) for i in range(5) for offset in (0.0, 0.004)]
+        with mock.patch.object(weather_service, "WEATHER_BATCH_SIZE", 2), \
+                mock.patch.object(weather_service, "http_get", side_effect=self.fake_get):
+            results = asyncio.run(weather_service.get_weather_batch(points))
+            self.assertEqual(sorted(self.requested), [1, 2, 2])
+            # The same points again come from the cache
+            asyncio.run(weather_service.get_weather_batch(points))
+            self.assertEqual(len(self.requested), 3)
+
+        self.assertEqual(len(results), len(points))
+        for (lat, lon), result in zip(points, results):
+            center = weather_service.cell_center(weather_service.weather_cell(lat, lon))
+            self.assertEqual(result.temperature, center[0])
+        self.assertEqual(asyncio.run(weather_service.get_weather_data(*points[0])), results[0])
+
+    def test_02_failed_chunk_yields_none(self):
+        async def failing_get(url, params=None, **kwargs):
+            return httpx.Response(503, text="unavailable")
+
+        with mock.patch.object(weather_service, "http_get", side_effect=failing_get):
+            self.assertEqual(asyncio.run(weather_service.get_weather_batch([(48.8566, 2.3522), (40.0, 3.0)])), [None, None])
+
+
+class TestForecastSummary(unittest.TestCase):
+    """Test cases for the vectorized forecast summary"""
+
+    @staticmethod
+    def reference_window(precipitation, codes):
+        # The per-hour Python summary the vectorized one replaced
+        rain_codes = [51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82, 95, 96, 99]
+        return {
+            'rain_chance': any(p > 0.1 for p in precipitation) or any(code in rain_codes for code in codes),
+            'rain_hours': sum(1 for p in precipitation if p > 0.1),
+            'max_precipitation': float(max(precipitation)) if precipitation else 0.0,
+        }
+
+    def test_01_matches_per_hour_python_summary(self):
+        rng = random.Random(7)
+        locations = []
+        for _ in range(50):
+            precipitation = [rng.choice([0.0, 0.0, 0.05, 0.3, 2.5]) for _ in range(72)]
+            codes = [rng.choice([0, 1, 3, 45, 61, 80, 95]) for _ in range(72)]
+            locations.append({"current": {"temperature_2m": 20.0, "weather_code": 0},
+                              "hourly": {"precipitation": precipitation, "weather_code": codes}})
+
+        for location, summary in zip(locations, weather_service.summarize_forecasts(locations)):
+            precipitation, codes = location["hourly"]["precipitation"], location["hourly"]["weather_code"]
+            for name, first, end in (("next_48h", 0, 48), ("day1", 0, 24), ("day2", 24, 48)):
+                expected = self.reference_window(precipitation[first:end], codes[first:end])
+                self.assertEqual({key: summary[name][key] for key in expected}, expected)
+
+    def test_02_probability_bands_max_temperature_and_custom_windows(self):
+        location = {"hourly": {
+            "precipitation": [0.0] * 48,
+            "weather_code": [0] * 48,
+            "temperature_2m": [10.0 + hour % 24 for hour in range(47)] + [None],
+            "precipitation_probability": [10] * 20 + [40] * 3 + [85] * 2 + [0] * 23,
+        }}
+        summary = weather_service.summarize_forecasts([location], [("morning", 6, 12), ("day2", 24, 48), ("day3", 48, 72)])[0]
+        self.assertEqual(summary["morning"]["max_temperature"], 21.0)
+        self.assertEqual(summary["day2"]["max_temperature"], 32.0)
+        self.assertEqual((summary["day2"]["possible_rain_hours"], summary["day2"]["likely_rain_hours"]), (0, 1))
+        self.assertEqual(summary["day2"]["max_rain_probability"], 85)
+        # Hours past the end of the forecast count as dry, and there is no temperature to report
+        self.assertEqual(summary["day3"]["rain_hours"], 0)
+        self.assertNotIn("max_temperature", summary["day3"])
+
+        day1 = weather_service.summarize_forecasts([location])[0]["day1"]
+        self.assertEqual((day1["possible_rain_hours"], day1["likely_rain_hours"]), (3, 1))
+        self.assertFalse(day1["rain_chance"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from services.spot_searching_page import weather_service
+from services.utils.circuit_breaker import CircuitBreaker
+from services.utils.http_client import close_http_client, get_http_client
+
+
+FORECAST = {"current": {"temperature_2m": 18.5, "weather_code": 3},
+            "hourly": {"precipitation": [0.0] * 72, "weather_code": [3] * 72}}
+
+
+class StubOpenMeteo:
+    """Local Open-Meteo stand-in that fails the way it is told to"""
+
+    def __init__(self):
+        self.fail_with = None  # None, an HTTP status code, or "hang" (no answer within the client timeout)
+        self.failures_left = 0  # fail only this many requests, then recover; -1 for an outage
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                failing = stub.fail_with is not None and stub.failures_left != 0
+                if failing and stub.failures_left > 0:
+                    stub.failures_left -= 1
+                if failing and stub.fail_with == "hang":
+                    time.sleep(0.5)
+                    return
+                status = stub.fail_with if failing else 200
+                body = json.dumps(FORECAST if status == 200 else {"error": True}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    def fail(self, fail_with, times=-1):
+        self.fail_with = fail_with
+        self.failures_left = times
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestWeatherFaults(unittest.TestCase):
+    """Fault-injection tests of the async weather client against a local stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = StubOpenMeteo()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.close()
+
+    def setUp(self):
+        self.stub.fail(None)
+        self.stub.requests = 0
+        weather_service.weather_cache.clear()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+        self.patches = [
+            mock.patch.object(weather_service, "OPEN_METEO_URL", self.stub.url),
+            mock.patch.object(weather_service, "weather_breaker", self.breaker),
+            mock.patch.object(weather_service, "WEATHER_RETRY_DELAY", 0.01),
+            mock.patch.object(weather_service, "WEATHER_TIMEOUT", 0.2),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def run_async(self, coroutine):
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await close_http_client()
+        return asyncio.run(run())
+
+    def test_01_transient_errors_retried(self):
+        self.stub.fail(503, times=2)
+        weather = self.run_async(weather_service.fetch_weather_data(48.85, 2.35, retry_delay=0.01))
+        self.assertEqual(weather.temperature, 18.5)
+        self.assertEqual(self.stub.requests, 3)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_02_timeouts_retried_without_blocking_the_loop(self):
+        self.stub.fail("hang", times=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async def fetch_while_ticking():
+            task = asyncio.create_task(ticker())
+            try:
+                return await weather_service.fetch_weather_data(48.85, 2.35, retry_delay=0.01)
+            finally:
+                task.cancel()
+
+        weather = self.run_async(fetch_while_ticking())
+        self.assertEqual(weather.temperature, 18.5)
+        self.assertEqual(self.stub.requests, 2)
+        # The event loop kept running through the 0.2 s timeout
+        self.assertGreaterEqual(ticks, 10)
+
+    def test_03_outage_opens_circuit_and_stops_calls(self):
+        self.stub.fail(503)
+        self.assertIsNone(self.run_async(weather_service.fetch_weather_data(48.85, 2.35, max_retries=5, retry_delay=0.01)))
+        # The third failure opened the breaker; the remaining attempts never reached the server
+        self.assertEqual(self.stub.requests, 3)
+        self.assertEqual(self.breaker.state, "open")
+
+        start = time.perf_counter()
+        self.assertIsNone(self.run_async(weather_service.fetch_weather_data(40.0, 3.0)))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(self.stub.requests, 3)
+        self.assertGreaterEqual(self.breaker.stats()["short_circuits"], 1)
+
+    def test_04_last_known_forecast_served_while_open(self):
+        first = self.run_async(weather_service.get_weather_data(48.85, 2.35))
+        # Age the cached forecast past its stale window
+        cell = weather_service.weather_cell(48.85, 2.35)
+        weather_service.weather_cache.set(cell, first, time.time() - 20, time.time() - 10)
+
+        self.stub.fail(500)
+        for _ in range(3):
+            self.assertEqual(self.run_async(weather_service.get_weather_data(48.85, 2.35)), first)
+        self.assertEqual(self.breaker.state, "open")
+        # Points never fetched before have nothing to fall back on
+        self.assertEqual(self.run_async(weather_service.get_weather_batch([(48.85, 2.35), (10.0, 10.0)])), [first, None])
+
+    def test_05_probe_after_reset_timeout_closes_circuit(self):
+        self.stub.fail(503)
+        self.run_async(weather_service.fetch_weather_data(48.85, 2.35, retry_delay=0.01))
+        self.assertEqual(self.breaker.state, "open")
+
+        self.stub.fail(None)
+        time.sleep(0.25)
+        weather = self.run_async(weather_service.fetch_weather_data(48.85, 2.35))
+        self.assertEqual(weather.temperature, 18.5)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_06_client_errors_not_retried(self):
+        self.stub.fail(400)
+        self.assertIsNone(self.run_async(weather_service.fetch_weather_data(48.85, 2.35)))
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_07_cancelled_probe_releases_half_open_circuit(self):
+        self.stub.fail(503)
+        self.run_async(weather_service.fetch_weather_data(48.85, 2.35, retry_delay=0.01))
+        time.sleep(0.25)
+        self.stub.fail("hang", times=1)
+
+        async def cancel_probe():
+            task = asyncio.create_task(weather_service.fetch_weather_data(48.85, 2.35))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(self.breaker.state, "half_open")
+            # The next call is the new probe, and it closes the circuit
+            return await weather_service.fetch_weather_data(48.85, 2.35)
+
+        weather = self.run_async(cancel_probe())
+        self.assertEqual(weather.temperature, 18.5)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_08_unanswered_probe_expires(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+
+    def test_09_client_of_previous_loop_closed(self):
+        """A new event loop gets a new shared client, and the previous loop's client is closed"""
+        async def fetch_on_new_loop():
+            await weather_service.fetch_weather_data(48.85, 2.35)
+            return get_http_client()
+
+        first = asyncio.run(fetch_on_new_loop())
+        self.assertFalse(first.is_closed)
+
+        async def replace_client():
+            client = get_http_client()
+            await asyncio.sleep(0.05)
+            return client
+
+        second = self.run_async(replace_client())
+        self.assertIsNot(second, first)
+        self.assertTrue(first.is_closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import requests
+from dotenv import load_dotenv
+
+# Add src to path to import modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+# Set up logging
+logging.basicConfig(level=logging.INFO,
+                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("WarmupScript")
+
+
+def print_results(results):
+    for result in results:
+        status = "ok" if result["ok"] else f"failed ({result['detail']})"
+        print(f"{result['location']:<30} {result['radius']:>4} km {result['seconds']:>8.2f}s {result['spots']:>6} spots  {status}")
+
+
+def warm_server(url, token, destinations):
+    """Ask a running server to warm its caches through POST /warmup"""
+    params = {"destinations": destinations} if destinations else {}
+    response = requests.post(f"{url.rstrip('/')}/warmup", params=params, headers={"X-Warmup-Token": token or ""}, timeout=3600)
+    if response.status_code != 200:
+        logger.error(f"Warm-up failed: {response.status_code} - {response.text}")
+        return False
+    print_results(response.json())
+    return True
+
+
+def warm_locally(destinations, top_n):
+    """
+    Run one warm-up pass in this process
+
+    Only caches that outlive the process benefit (GEOCODE_CACHE_PATH); useful to
+    seed those before a deploy and to time the destinations.
+    """
+    from services.spot_searching_page.warmup import WarmupScheduler, parse_destinations
+    from services.utils.http_client import close_http_client
+
+    scheduler = WarmupScheduler(destinations=parse_destinations(destinations) if destinations else None,
+                                **({"top_n": top_n} if top_n is not None else {}))
+
+    async def run():
+        try:
+            return await scheduler.run_once()
+        finally:
+            await close_http_client()
+
+    results = asyncio.run(run())
+    print_results([
+        {"location": r.destination.location, "radius": r.destination.radius, "ok": r.ok,
+         "seconds": r.seconds, "spots": r.spots, "detail": r.detail}
+        for r in results
+    ])
+    return all(r.ok for r in results)
+
+
+def main():
+    """
+    Warm the geocode and POI caches of hot destinations
+
+    By default the running API server does the work (its caches are in memory);
+    --local runs the pass in this process instead.
+    """
+    parser = argparse.ArgumentParser(description='Warm the caches of hot destinations')
+    parser.add_argument('--url', default=os.getenv("WARMUP_URL", "http://localhost:8000"), help='Base URL of the API server')
+    parser.add_argument('--destinations', help='"location[:radius]" separated by ";" (default: WARMUP_DESTINATIONS and the search log)')
+    parser.add_argument('--top', type=int, help='Also warm the N most searched destinations (--local only; default WARMUP_TOP_N)')
+    parser.add_argument('--local', action='store_true', help='Run the warm-up in this process instead of on the server')
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+
+    if args.local:
+        return warm_locally(args.destinations, args.top)
+    return warm_server(args.url, os.getenv("WARMUP_TOKEN"), args.destinations)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)